@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+# Конвейер ассетов. Спрайты врагов описаны рецептами (список примитивов pygame.draw).
+# Готовая картинка уже в нужном размере хранится в кэше под хэшем рецепта, поэтому
+# перерисовка нужна только при изменении рецепта, а PNG не пишется и не декодируется
+# на каждом запуске. Кэш - сырые пиксели RGBA: загрузка без декодирования.
+# Все враги получают общие поверхности, переведенные в формат экрана (convert_alpha).
+# Варианты спрайта задаются оттенком (tint) поверх рецепта. Поверхности в памяти
+# живут в LRU с ограничением по байтам: большой ростер не держит все спрайты сразу.
+
+CACHE_DIR = ".asset_cache"
+PIPELINE_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+MAGIC = b"SWAS"
+SPRITE_CACHE_BYTES = 16 * 1024 * 1024
+
+SPRITE_RECIPES: Dict[str, Dict] = {
+    # Корвет "Молния"
+    "enemy1": {
+        "size": [250, 250],
+        "ops": [
+            ["polygon", [0, 150, 255], [[125, 10], [10, 240], [240, 240]]],  # Основной корпус
+            ["circle", [255, 255, 0], [125, 60], 20],  # Центральный реактор
+            ["line", [255, 0, 0], [50, 100], [200, 100], 3],  # Лазерная пушка
+            ["line", [255, 0, 0], [100, 150], [150, 150], 3]  # Дополнительное оружие
+        ]
+    },
+    # Линкор "Титан"
+    "enemy2": {
+        "size": [250, 250],
+        "ops": [
+            ["rect", [200, 100, 0], [50, 50, 150, 150]],  # Основной корпус
+            ["rect", [150, 150, 150], [80, 80, 90, 90]],  # Центральная часть
+            ["circle", [255, 0, 0], [125, 125], 30],  # Реактор
+            ["rect", [100, 100, 100], [30, 100, 20, 50]],  # Левое оружие
+            ["rect", [100, 100, 100], [200, 100, 20, 50]]  # Правое оружие
+        ]
+    }
+}
+
+
+def draw_recipe(recipe: Dict) -> pygame.Surface:
+    surface = pygame.Surface(recipe["size"], pygame.SRCALPHA)
+    for op, color, *args in recipe["ops"]:
+        if op == "polygon":
+            pygame.draw.polygon(surface, color, args[0])
+        elif op == "circle":
+            pygame.draw.circle(surface, color, args[0], args[1])
+        elif op == "line":
+            pygame.draw.line(surface, color, args[0], args[1], args[2])
+        elif op == "rect":
+            pygame.draw.rect(surface, color, args[0])
+        else:
+            raise ValueError(f"неизвестный примитив рецепта: {op}")
+    return surface
+
+
+class AssetPipeline:
+    def __init__(self, cache_dir: str = CACHE_DIR, recipes: Optional[Dict[str, Dict]] = None,
+                 max_bytes: int = SPRITE_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.recipes = SPRITE_RECIPES if recipes is None else recipes
+        self.max_bytes = max_bytes
+        self._surfaces: "OrderedDict[Tuple, pygame.Surface]" = OrderedDict()
+        self._bytes = 0
+        self.built = 0
+        self.loaded = 0
+        self.shared = 0
+        self.evicted = 0
+
+    def key(self, name: str, size: Tuple[int, int], tint: Optional[Tuple[int, int, int]] = None) -> str:
+        parts = [PIPELINE_VERSION, self.recipes[name], list(size)]
+        if tint is not None:
+            parts.append(list(tint))
+        blob = json.dumps(parts, sort_keys=True)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+    def sprite(self, name: str, size: Tuple[int, int], tint: Optional[Tuple[int, int, int]] = None) -> pygame.Surface:
+        size = tuple(size)
+        tint = None if tint is None else tuple(tint)
+        cache_key = (name, size, tint)
+        surface = self._surfaces.get(cache_key)
+        if surface is not None:
+            self._surfaces.move_to_end(cache_key)
+            self.shared += 1
+            return surface
+
+        path = os.path.join(self.cache_dir, f"{name}-{self.key(name, size, tint)}.rgba")
+        surface = self._load(path, size)
+        if surface is None:
+            surface = self._build(name, size, tint, path)
+        # Формат экрана - чтобы blit не конвертировал пиксели на каждом кадре
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self._surfaces[cache_key] = surface
+        self._bytes += self._size_of(surface)
+        # Вытесняем давно не нужные; враг в бою держит свою ссылку и не пострадает
+        while self._bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, old = self._surfaces.popitem(last=False)
+            self._bytes -= self._size_of(old)
+            self.evicted += 1
+        return surface
+
+    @staticmethod
+    def _size_of(surface: pygame.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def _load(self, path: str, size: Tuple[int, int]) -> Optional[pygame.Surface]:
+        # Любой непригодный файл (нет, обрезан, чужой размер) - промах, спрайт пересоберется
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER.size)
+                if len(header) != HEADER.size:
+                    return None
+                magic, width, height = HEADER.unpack(header)
+                if magic != MAGIC or (width, height) != size:
+                    return None
+                # Пиксели читаются сразу в буфер поверхности, без промежуточных копий
+                pixels = bytearray(width * height * 4)
+                if f.readinto(pixels) != len(pixels) or f.read(1):
+                    return None
+        except OSError:
+            return None
+        self.loaded += 1
+        return pygame.image.frombuffer(pixels, size, "RGBA")
+
+    def _build(self, name: str, size: Tuple[int, int], tint: Optional[Tuple[int, int, int]],
+               path: str) -> pygame.Surface:
+        surface = draw_recipe(self.recipes[name])
+        if surface.get_size() != size:
+            surface = pygame.transform.smoothscale(surface, size)
+        if tint is not None:
+            surface.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+        self.built += 1
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, *size))
+            f.write(pygame.image.tobytes(surface, "RGBA"))
+        os.replace(tmp_path, path)
+        return surface
+
+    def stats(self) -> Dict[str, int]:
+        return {"built": self.built, "loaded": self.loaded, "shared": self.shared,
+                "evicted": self.evicted, "bytes": self._bytes}
+
+
+# Общий конвейер игры
+assets = AssetPipeline()
+
+
+def measure_startup(variants: List[Tuple[str, Optional[Tuple[int, int, int]]]], size: Tuple[int, int] = (250, 250),
+                    repeats: int = 20) -> Dict[str, float]:
+    # Холодный старт - пустой кэш, теплый - кэш на диске, но новый процесс (пустая память).
+    # variants - пары (рецепт, оттенок), как у противников первой страницы меню
+    cold, warm = [], []
+    cache_dir = tempfile.mkdtemp(prefix="asset_cache_")
+    try:
+        for _ in range(repeats):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            start = time.perf_counter()
+            pipeline = AssetPipeline(cache_dir)
+            for name, tint in variants:
+                pipeline.sprite(name, size, tint)
+            cold.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            pipeline = AssetPipeline(cache_dir)
+            for name, tint in variants:
+                pipeline.sprite(name, size, tint)
+            warm.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {"cold_ms": 1000 * min(cold), "warm_ms": 1000 * min(warm)}
+
+def measure_legacy_startup(names: List[str], size: Tuple[int, int] = (250, 250), repeats: int = 20) -> float:
+    # Прежний путь: нарисовать, сохранить PNG, прочитать PNG и масштабировать без convert
+    best = float("inf")
+    directory = tempfile.mkdtemp(prefix="legacy_assets_")
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for name in names:
+                path = os.path.join(directory, f"{name}.png")
+                pygame.image.save(draw_recipe(SPRITE_RECIPES[name]), path)
+                pygame.transform.scale(pygame.image.load(path), size)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 1000 * best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сборка и замер кэша спрайтов")
+    parser.add_argument("--bench", action="store_true", help="замерить холодный и теплый старт")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    names = list(SPRITE_RECIPES)
+    if args.bench:
+        from roster import ROSTER_PATH, EnemyRoster
+        variants = [(definition.sprite, definition.tint) for definition in EnemyRoster.load(ROSTER_PATH).page(0, 6)]
+        timings = measure_startup(variants)
+        print(f"прежний путь (PNG): {measure_legacy_startup(names):.2f} мс")
+        print(f"холодный старт: {timings['cold_ms']:.2f} мс, теплый старт: {timings['warm_ms']:.2f} мс")
+    else:
+        for name in names:
+            assets.sprite(name, (250, 250))
+        print(assets.stats())
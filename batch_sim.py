@@ -0,0 +1,180 @@
+import argparse
+import time
+from typing import Dict, Iterable
+
+import numpy as np
+
+from battle_core import (
+    ACTIONS, DODGE_FAIL_DAMAGE, ENEMY_DAMAGE, ENEMY_TYPES, IGNORE_DAMAGE,
+    PLAYER_MAX_HP, WEAPONS
+)
+
+# Пакетный симулятор: N боев одновременно в виде массивов NumPy.
+# Один раунд (ход игрока + ход врага) - один векторный шаг по всем еще идущим боям.
+# Тип атаки врага влияет только на реплику, поэтому здесь не разыгрывается.
+
+ACTION_NAMES = list(ACTIONS)
+WEAPON_NAMES = list(WEAPONS)
+DODGE, ATTACK, IGNORE = (ACTION_NAMES.index(name) for name in ("dodge", "attack", "ignore"))
+
+WEAPON_DAMAGE = np.array([WEAPONS[name]["damage"] for name in WEAPON_NAMES], dtype=np.int16)
+WEAPON_CHANCE = np.array([WEAPONS[name]["chance"] for name in WEAPON_NAMES])
+DODGE_CHANCE = ACTIONS["dodge"]["chance"]
+
+DEFAULT_CHUNK = 1 << 21
+MAX_ROUNDS = 1000
+
+
+# Векторные политики: (player_hp, enemy_hp, rng) -> (коды действий, коды оружия)
+def _fixed_policy(action: str, weapon: str):
+    action_code, weapon_code = ACTION_NAMES.index(action), WEAPON_NAMES.index(weapon)
+
+    def policy(player_hp, enemy_hp, rng):
+        n = len(player_hp)
+        return np.full(n, action_code, np.int8), np.full(n, weapon_code, np.int8)
+    return policy
+
+def _random_policy(player_hp, enemy_hp, rng):
+    n = len(player_hp)
+    return (rng.integers(0, len(ACTION_NAMES), n, dtype=np.int8),
+            rng.integers(0, len(WEAPON_NAMES), n, dtype=np.int8))
+
+POLICIES = {
+    "laser": _fixed_policy("attack", "laser"),
+    "ion": _fixed_policy("attack", "ion"),
+    "shield": _fixed_policy("attack", "shield"),
+    "random": _random_policy
+}
+
+
+class BatchResult:
+    def __init__(self, enemy_key: str, policy: str):
+        self.enemy_key = enemy_key
+        self.policy = policy
+        self.battles = 0
+        self.wins = 0
+        self.unfinished = 0
+        # Гистограммы: индекс - число раундов / остаток HP
+        self.rounds_hist = np.zeros(MAX_ROUNDS + 1, dtype=np.int64)
+        self.player_hp_hist = np.zeros(PLAYER_MAX_HP + 1, dtype=np.int64)
+        self.enemy_hp_hist = np.zeros(ENEMY_TYPES[enemy_key]["max_hp"] + 1, dtype=np.int64)
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.battles if self.battles else 0.0
+
+    @property
+    def mean_rounds(self) -> float:
+        # Среднее только по завершенным боям: упершиеся в MAX_ROUNDS считаются в unfinished
+        rounds = np.arange(len(self.rounds_hist))
+        finished = self.battles - self.unfinished
+        return float(rounds @ self.rounds_hist) / finished if finished else 0.0
+
+    def trimmed(self, hist: np.ndarray) -> np.ndarray:
+        nonzero = np.flatnonzero(hist)
+        return hist[:nonzero[-1] + 1] if len(nonzero) else hist[:0]
+
+    def to_dict(self) -> Dict:
+        return {
+            "enemy": self.enemy_key,
+            "policy": self.policy,
+            "battles": self.battles,
+            "win_rate": self.win_rate,
+            "mean_rounds": self.mean_rounds,
+            "unfinished": self.unfinished,
+            "rounds_hist": self.trimmed(self.rounds_hist).tolist(),
+            "player_hp_hist": self.player_hp_hist.tolist(),
+            "enemy_hp_hist": self.enemy_hp_hist.tolist()
+        }
+
+
+def _simulate_chunk(result: BatchResult, n: int, policy, rng):
+    player_hp = np.full(n, PLAYER_MAX_HP, dtype=np.int16)
+    enemy_hp = np.full(n, ENEMY_TYPES[result.enemy_key]["max_hp"], dtype=np.int16)
+
+    for rounds in range(1, MAX_ROUNDS + 1):
+        if not len(player_hp):
+            break
+        m = len(player_hp)
+        actions, weapons = policy(player_hp, enemy_hp, rng)
+        roll = rng.random(m)
+
+        # Ход игрока
+        hit = (actions == ATTACK) & (roll < WEAPON_CHANCE[weapons])
+        enemy_hp -= np.where(hit, WEAPON_DAMAGE[weapons], 0).astype(np.int16)
+
+        dodge_fail = (actions == DODGE) & (roll >= DODGE_CHANCE)
+        ignore = actions == IGNORE
+        self_damage = np.where(
+            dodge_fail, rng.integers(DODGE_FAIL_DAMAGE[0], DODGE_FAIL_DAMAGE[1] + 1, m, dtype=np.int16), 0)
+        self_damage = np.where(
+            ignore, rng.integers(IGNORE_DAMAGE[0], IGNORE_DAMAGE[1] + 1, m, dtype=np.int16), self_damage)
+        player_hp -= self_damage.astype(np.int16)
+
+        # Ход врага - только в боях, где оба еще живы
+        both_alive = (player_hp > 0) & (enemy_hp > 0)
+        player_hp -= np.where(
+            both_alive, rng.integers(ENEMY_DAMAGE[0], ENEMY_DAMAGE[1] + 1, m, dtype=np.int16), 0).astype(np.int16)
+
+        finished = (player_hp <= 0) | (enemy_hp <= 0)
+        if finished.any():
+            won = finished & (player_hp > 0)
+            lost = finished & ~won
+            result.rounds_hist[rounds] += int(finished.sum())
+            result.wins += int(won.sum())
+            result.player_hp_hist += np.bincount(player_hp[won], minlength=PLAYER_MAX_HP + 1)
+            result.enemy_hp_hist += np.bincount(
+                np.maximum(enemy_hp[lost], 0), minlength=len(result.enemy_hp_hist))
+            # Уплотняем массивы, оставляя только идущие бои
+            running = ~finished
+            player_hp = player_hp[running]
+            enemy_hp = enemy_hp[running]
+
+    result.unfinished += len(player_hp)
+    result.battles += n
+
+def simulate_batch(n: int, enemy_key: str, policy: str = "laser", seed=None,
+                   chunk: int = DEFAULT_CHUNK) -> BatchResult:
+    rng = np.random.default_rng(seed)
+    result = BatchResult(enemy_key, policy)
+    left = n
+    while left > 0:
+        count = min(chunk, left)
+        _simulate_chunk(result, count, POLICIES[policy], rng)
+        left -= count
+    return result
+
+def compare_policies(n: int, enemies: Iterable[str] = tuple(ENEMY_TYPES),
+                     policies: Iterable[str] = tuple(POLICIES), seed=None) -> Dict:
+    # Один поток случайных чисел на все пары, чтобы seed задавал весь отчет
+    rng = np.random.default_rng(seed)
+    results = {}
+    for enemy_key in enemies:
+        for policy in policies:
+            sub_seed = rng.integers(0, 2**63)
+            results[(enemy_key, policy)] = simulate_batch(n, enemy_key, policy, sub_seed)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетная симуляция боев на NumPy")
+    parser.add_argument("-n", "--battles", type=int, default=10**7)
+    parser.add_argument("-e", "--enemy", action="append", choices=list(ENEMY_TYPES))
+    parser.add_argument("-p", "--policy", action="append", choices=list(POLICIES))
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = compare_policies(args.battles, args.enemy or list(ENEMY_TYPES),
+                               args.policy or list(POLICIES), args.seed)
+    elapsed = time.perf_counter() - start
+
+    total = 0
+    for (enemy_key, policy), result in results.items():
+        total += result.battles
+        wins = result.player_hp_hist[1:]
+        mean_hp = float(np.arange(1, len(wins) + 1) @ wins) / result.wins if result.wins else 0.0
+        print(f"{enemy_key:<6} {policy:<7} побед {100 * result.win_rate:6.2f}%  "
+              f"раундов {result.mean_rounds:5.2f}  HP при победе {mean_hp:6.1f}  "
+              f"не завершено {result.unfinished}")
+    print(f"Всего боев: {total} за {elapsed:.2f} с ({total / elapsed:.0f} боев/с)")
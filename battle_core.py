@@ -0,0 +1,178 @@
+import bisect
+import itertools
+import random
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Правила боя без pygame: таблицы параметров, броски кубиков и headless-бой.
+# Источник случайности передается явно (rng), по умолчанию - глобальный модуль random,
+# поэтому игра ведет себя как раньше, а симуляции можно воспроизводить по seed.
+
+PLAYER_MAX_HP = 150
+
+WEAPONS = {
+    "laser": {"damage": 35, "chance": 0.85},
+    "ion": {"damage": 25, "chance": 0.9},
+    "shield": {"damage": 15, "chance": 0.75}
+}
+
+ACTIONS = {
+    "dodge": {"text": "УВОРОТ", "chance": 0.7},
+    "attack": {"text": "ПРЯМОЙ УДАР", "chance": 0.85},
+    "ignore": {"text": "ИГНОРИРОВАТЬ"}
+}
+
+# Диапазоны урона (включительно, как в random.randint)
+DODGE_FAIL_DAMAGE = (10, 20)
+IGNORE_DAMAGE = (20, 30)
+ENEMY_DAMAGE = (15, 25)
+
+ATTACK_TYPES = ["tentacle", "laser", "missile"]
+
+# Фазы хода врага, секунды игрового времени от хода игрока: атака выбрана не позже
+# ENEMY_THINK_TIME (тактическому поиску дается время подумать), урон в ENEMY_DAMAGE_AT,
+# ход возвращается игроку в ENEMY_TURN_END
+ENEMY_THINK_TIME = 1.0
+ENEMY_DAMAGE_AT = 1.5
+ENEMY_TURN_END = 2.5
+
+# Результаты хода игрока, при которых урон получает сам игрок
+PLAYER_HURT_RESULTS = ("dodge_fail", "ignore")
+
+
+# Паттерн Стратегия для выбора атаки врагом
+class AttackStrategy(ABC):
+    @abstractmethod
+    def choose_attack(self, rng=random) -> str:
+        pass
+
+    # Стратегии, которым нужно время на раздумье, начинают его в plan() и сообщают
+    # о готовности в ready(); остальные выбирают сразу
+    def plan(self, player_hp: int, enemy_hp: int):
+        pass
+
+    def ready(self) -> bool:
+        return True
+
+    def roll_damage(self, attack: str, rng=random) -> int:
+        return roll_enemy_damage(rng)
+
+class WeightedAttackStrategy(AttackStrategy):
+    weights: List[float] = []
+
+    def __init__(self, weights: Optional[List[float]] = None, cum_weights: Optional[List[float]] = None):
+        # Накопленные веса считаются один раз (или приходят готовыми из данных ростера);
+        # выбор - тот же bisect, что и в random.choices, с тем же расходом случайных чисел
+        if weights is not None:
+            self.weights = list(weights)
+        self.cum_weights = list(cum_weights) if cum_weights is not None else list(itertools.accumulate(self.weights))
+
+    def choose_attack(self, rng=random) -> str:
+        return ATTACK_TYPES[bisect.bisect(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+class FastAttackStrategy(WeightedAttackStrategy):
+    weights = [0.5, 0.3, 0.2]
+
+class HeavyAttackStrategy(WeightedAttackStrategy):
+    weights = [0.3, 0.4, 0.3]
+
+
+# Противники, доступные в меню
+ENEMY_TYPES = {
+    "fast": {"name": "КОРВЕТ 'МОЛНИЯ'", "max_hp": 120, "strategy": FastAttackStrategy},
+    "heavy": {"name": "ЛИНКОР 'ТИТАН'", "max_hp": 200, "strategy": HeavyAttackStrategy}
+}
+
+
+def roll_player_action(action: str, weapon: str, weapons: Dict = WEAPONS,
+                       actions: Dict = ACTIONS, rng=random) -> Tuple[str, int]:
+    # Возвращает (результат, урон). Урон по врагу - только при "attack_success",
+    # при результатах из PLAYER_HURT_RESULTS урон получает игрок.
+    if action == "dodge":
+        if rng.random() < actions["dodge"]["chance"]:
+            return "dodge_success", 0
+        return "dodge_fail", rng.randint(*DODGE_FAIL_DAMAGE)
+
+    elif action == "attack":
+        if rng.random() < weapons[weapon]["chance"]:
+            return "attack_success", weapons[weapon]["damage"]
+        return "attack_fail", 0
+
+    elif action == "ignore":
+        return "ignore", rng.randint(*IGNORE_DAMAGE)
+
+    return "none", 0
+
+def roll_enemy_damage(rng=random) -> int:
+    return rng.randint(*ENEMY_DAMAGE)
+
+
+# Политики игрока для headless-боев: (player_hp, enemy_hp, rng) -> (действие, оружие).
+# Хранятся по имени, чтобы их можно было передавать в другие процессы.
+def _fixed_policy(action: str, weapon: str) -> Callable:
+    def policy(player_hp, enemy_hp, rng):
+        return action, weapon
+    return policy
+
+def _random_policy(player_hp, enemy_hp, rng):
+    return rng.choice(list(ACTIONS)), rng.choice(list(WEAPONS))
+
+POLICIES = {
+    "laser": _fixed_policy("attack", "laser"),
+    "ion": _fixed_policy("attack", "ion"),
+    "shield": _fixed_policy("attack", "shield"),
+    "random": _random_policy
+}
+
+
+class BattleResult:
+    __slots__ = ("won", "rounds", "player_hp", "enemy_hp")
+
+    def __init__(self, won: bool, rounds: int, player_hp: int, enemy_hp: int):
+        self.won = won
+        self.rounds = rounds
+        self.player_hp = player_hp
+        self.enemy_hp = enemy_hp
+
+
+# Бой без отрисовки и таймеров: раунд = ход игрока + ход врага
+class HeadlessBattle:
+    def __init__(self, enemy_key: str, policy: str = "laser", rng=None, seed=None):
+        enemy = ENEMY_TYPES[enemy_key]
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.policy = POLICIES[policy]
+        self.strategy = enemy["strategy"]()
+        self.player_hp = PLAYER_MAX_HP
+        self.enemy_hp = enemy["max_hp"]
+        self.rounds = 0
+
+    def is_over(self) -> bool:
+        return self.player_hp <= 0 or self.enemy_hp <= 0
+
+    def play_round(self) -> str:
+        rng = self.rng
+        self.rounds += 1
+        action, weapon = self.policy(self.player_hp, self.enemy_hp, rng)
+        result, damage = roll_player_action(action, weapon, rng=rng)
+        if result == "attack_success":
+            self.enemy_hp = max(0, self.enemy_hp - damage)
+        elif result in PLAYER_HURT_RESULTS:
+            self.player_hp = max(0, self.player_hp - damage)
+
+        if self.is_over():
+            return result
+
+        # Ход врага: атака выбирается стратегией, урон бросает она же (обычно 15-25)
+        attack = self.strategy.choose_attack(rng)
+        self.player_hp = max(0, self.player_hp - self.strategy.roll_damage(attack, rng))
+        return result
+
+    def run(self, max_rounds: int = 10000) -> BattleResult:
+        while not self.is_over() and self.rounds < max_rounds:
+            self.play_round()
+        return BattleResult(self.enemy_hp <= 0 < self.player_hp, self.rounds,
+                            self.player_hp, self.enemy_hp)
+
+
+def simulate_battle(enemy_key: str, policy: str = "laser", seed=None) -> BattleResult:
+    return HeadlessBattle(enemy_key, policy, seed=seed).run()
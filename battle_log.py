@@ -0,0 +1,321 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from battle_core import (
+    ACTIONS, ATTACK_TYPES, PLAYER_HURT_RESULTS, PLAYER_MAX_HP, WEAPONS, WeightedAttackStrategy,
+    roll_player_action
+)
+from roster import ROSTER_PATH, EnemyRoster
+
+# Журнал боев: каждый ход игрока, каждая атака врага и итог боя - запись фиксированного
+# размера в конце двоичного файла. Записи копятся в буфере и уходят на диск пачкой
+# (при заполнении буфера и в конце боя), файл сменяется по размеру. Читатель отображает
+# файлы в память (mmap) и считает сводку кусками через NumPy, не загружая историю целиком.
+
+BATTLE_LOG_DIR = "battle_log"
+MAX_FILE_BYTES = 64 * 1024 * 1024
+BUFFER_RECORDS = 512
+CHUNK_RECORDS = 1 << 20
+
+MAGIC = b"KKSBLOG\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHH4x")
+# время, бой, раунд, вид записи, действие, оружие, результат, урон, hp игрока, hp врага
+RECORD = struct.Struct("<dIHBBBBhhh")
+DTYPE = np.dtype([
+    ("time", "<f8"), ("battle", "<u4"), ("round", "<u2"), ("kind", "u1"), ("action", "u1"),
+    ("weapon", "u1"), ("result", "u1"), ("damage", "<i2"), ("player_hp", "<i2"), ("enemy_hp", "<i2")
+])
+assert DTYPE.itemsize == RECORD.size
+
+# Виды записей. У атаки врага в поле action - номер атаки в ATTACK_TYPES,
+# у итога боя - 1 при победе игрока, а в round - число раундов
+PLAYER, ENEMY, END = range(3)
+ACTION_CODES = tuple(ACTIONS)
+WEAPON_CODES = tuple(WEAPONS)
+NO_WEAPON = 255
+# Результаты BattleSystem.player_action и попадание врага
+RESULT_CODES = ("none", "dodge_success", "dodge_fail", "attack_success", "attack_fail", "ignore", "enemy_hit")
+
+_action_index = {name: i for i, name in enumerate(ACTION_CODES)}
+_weapon_index = {name: i for i, name in enumerate(WEAPON_CODES)}
+_attack_index = {name: i for i, name in enumerate(ATTACK_TYPES)}
+_result_index = {name: i for i, name in enumerate(RESULT_CODES)}
+
+
+def log_files(directory: str) -> List[str]:
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.startswith("battles-") and name.endswith(".bin"))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def _read_header(f) -> bool:
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        return False
+    magic, version, record_size = HEADER.unpack(data)
+    return magic == MAGIC and version == VERSION and record_size == RECORD.size
+
+
+class BattleLog:
+    def __init__(self, directory: str = BATTLE_LOG_DIR, max_bytes: int = MAX_FILE_BYTES,
+                 buffer_records: int = BUFFER_RECORDS):
+        self.directory = directory
+        self.max_bytes = max(max_bytes, HEADER.size + RECORD.size * buffer_records)
+        self._buffer = bytearray(RECORD.size * buffer_records)
+        self._pending = 0
+        self._file = None
+        self._size = 0
+        self.battle = 0
+        self.round = 0
+        self.records_written = 0
+        self.rotations = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open_last()
+
+    def _open_last(self):
+        files = log_files(self.directory)
+        self._index = 0
+        if files:
+            path = files[-1]
+            self._index = int(os.path.basename(path)[8:-4])
+            with open(path, "r+b") as f:
+                valid = _read_header(f)
+                # Недописанная запись после сбоя отрезается, чтобы следующие легли ровно
+                records = (os.path.getsize(path) - HEADER.size) // RECORD.size if valid else 0
+                if valid:
+                    f.truncate(HEADER.size + records * RECORD.size)
+                    if records:
+                        f.seek(HEADER.size + (records - 1) * RECORD.size)
+                        self.battle = RECORD.unpack(f.read(RECORD.size))[1]
+            if valid and HEADER.size + records * RECORD.size < self.max_bytes:
+                self._file = open(path, "ab")
+                self._size = HEADER.size + records * RECORD.size
+                return
+            if not valid:
+                # Чужой или битый файл не трогаем - пишем в следующий
+                self.battle = 0
+        self._rotate()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self.rotations += 1
+        self._index += 1
+        self._file = open(os.path.join(self.directory, f"battles-{self._index:05d}.bin"), "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._size = HEADER.size
+
+    def _append(self, kind: int, action: int, weapon: int, result: int, damage: int, player_hp: int,
+                enemy_hp: int):
+        RECORD.pack_into(self._buffer, self._pending * RECORD.size, time.time(), self.battle, self.round,
+                         kind, action, weapon, result, damage, player_hp, enemy_hp)
+        self._pending += 1
+        if self._pending * RECORD.size == len(self._buffer):
+            self.flush()
+
+    def begin(self) -> int:
+        self.battle += 1
+        self.round = 0
+        return self.battle
+
+    def player_round(self, action: str, weapon: str, result: str, damage: int, player_hp: int, enemy_hp: int):
+        self.round += 1
+        self._append(PLAYER, _action_index[action], _weapon_index.get(weapon, NO_WEAPON), _result_index[result],
+                     damage, player_hp, enemy_hp)
+
+    def enemy_attack(self, attack: str, damage: int, player_hp: int, enemy_hp: int):
+        self._append(ENEMY, _attack_index[attack], NO_WEAPON, _result_index["enemy_hit"], damage, player_hp, enemy_hp)
+
+    def end(self, won: bool, player_hp: int, enemy_hp: int):
+        self._append(END, int(won), NO_WEAPON, 0, 0, player_hp, enemy_hp)
+        # Бой - естественная граница пачки: при сбое теряется только текущий бой
+        self.flush()
+
+    def flush(self):
+        if not self._pending or self._file is None:
+            return
+        size = self._pending * RECORD.size
+        if self._size + size > self.max_bytes:
+            self._rotate()
+        self._file.write(memoryview(self._buffer)[:size])
+        self._file.flush()
+        self._size += size
+        self.records_written += self._pending
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def map_records(path: str) -> np.ndarray:
+    # Массив поверх mmap: страницы читает ОС по мере обращения. Отображение живет,
+    # пока жив массив или его срезы
+    with open(path, "rb") as f:
+        if not _read_header(f):
+            return np.zeros(0, DTYPE)
+        count = (os.fstat(f.fileno()).st_size - HEADER.size) // RECORD.size
+        if not count:
+            return np.zeros(0, DTYPE)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return np.frombuffer(mapped, DTYPE, count, HEADER.size)
+
+
+def iter_chunks(directory: str = BATTLE_LOG_DIR, chunk_records: int = CHUNK_RECORDS) -> Iterator[np.ndarray]:
+    for path in log_files(directory):
+        records = map_records(path)
+        for start in range(0, len(records), chunk_records):
+            yield records[start:start + chunk_records]
+
+
+class LogSummary:
+    def __init__(self):
+        self.records = 0
+        self.bytes = 0
+        self.battles = 0
+        self.wins = 0
+        self.battle_rounds = 0
+        self.first_time: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.actions = np.zeros(len(ACTION_CODES), np.int64)
+        self.dodges = np.zeros(2, np.int64)
+        self.shots = np.zeros(len(WEAPON_CODES), np.int64)
+        self.hits = np.zeros(len(WEAPON_CODES), np.int64)
+        self.attacks = np.zeros(len(ATTACK_TYPES), np.int64)
+        self.attack_damage = np.zeros(len(ATTACK_TYPES), np.int64)
+
+    def add(self, chunk: np.ndarray):
+        if not len(chunk):
+            return
+        self.records += len(chunk)
+        self.bytes += chunk.nbytes
+        first, last = float(chunk["time"][0]), float(chunk["time"][-1])
+        self.first_time = first if self.first_time is None else min(self.first_time, first)
+        self.last_time = last if self.last_time is None else max(self.last_time, last)
+
+        kind, action, result = chunk["kind"], chunk["action"], chunk["result"]
+        player = kind == PLAYER
+        self.actions += np.bincount(action[player], minlength=len(ACTION_CODES))[:len(ACTION_CODES)]
+        dodges = player & (action == _action_index["dodge"])
+        self.dodges += (np.count_nonzero(dodges & (result == _result_index["dodge_success"])),
+                        np.count_nonzero(dodges))
+
+        shots = player & (action == _action_index["attack"])
+        weapon = chunk["weapon"]
+        self.shots += np.bincount(weapon[shots], minlength=len(WEAPON_CODES))[:len(WEAPON_CODES)]
+        self.hits += np.bincount(weapon[shots & (result == _result_index["attack_success"])],
+                                 minlength=len(WEAPON_CODES))[:len(WEAPON_CODES)]
+
+        enemy = kind == ENEMY
+        self.attacks += np.bincount(action[enemy], minlength=len(ATTACK_TYPES))[:len(ATTACK_TYPES)]
+        self.attack_damage += np.bincount(action[enemy], weights=chunk["damage"][enemy],
+                                          minlength=len(ATTACK_TYPES))[:len(ATTACK_TYPES)].astype(np.int64)
+
+        ends = kind == END
+        self.battles += int(np.count_nonzero(ends))
+        self.wins += int(np.count_nonzero(action[ends]))
+        self.battle_rounds += int(chunk["round"][ends].sum(dtype=np.int64))
+
+    def report(self) -> Dict:
+        def rate(numerator, denominator):
+            return float(numerator) / denominator if denominator else 0.0
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "battles": self.battles,
+            "win_rate": rate(self.wins, self.battles),
+            "average_rounds": rate(self.battle_rounds, self.battles),
+            "actions": {name: int(count) for name, count in zip(ACTION_CODES, self.actions)},
+            "dodge_rate": rate(*self.dodges),
+            "hit_rate": {name: rate(hits, shots) for name, hits, shots in zip(WEAPON_CODES, self.hits, self.shots)},
+            "shots": {name: int(shots) for name, shots in zip(WEAPON_CODES, self.shots)},
+            "enemy_attacks": {name: int(count) for name, count in zip(ATTACK_TYPES, self.attacks)},
+            "enemy_damage": {name: rate(damage, count) for name, damage, count
+                             in zip(ATTACK_TYPES, self.attack_damage, self.attacks)},
+            "first_time": self.first_time,
+            "last_time": self.last_time
+        }
+
+
+def summarize(directory: str = BATTLE_LOG_DIR, chunk_records: int = CHUNK_RECORDS) -> Dict:
+    summary = LogSummary()
+    for chunk in iter_chunks(directory, chunk_records):
+        summary.add(chunk)
+    return summary.report()
+
+
+def generate(directory: str, battles: int, max_bytes: int = MAX_FILE_BYTES, seed: int = 0) -> BattleLog:
+    # История для замеров: случайные ходы против противников ростера (по весам атак)
+    rng = random.Random(seed)
+    enemies = [(definition.max_hp, WeightedAttackStrategy(definition.weights))
+               for definition in EnemyRoster.load(ROSTER_PATH)]
+    actions, weapons = list(ACTION_CODES), list(WEAPON_CODES)
+    log = BattleLog(directory, max_bytes)
+    for _ in range(battles):
+        enemy_hp, strategy = rng.choice(enemies)
+        player_hp = PLAYER_MAX_HP
+        log.begin()
+        while True:
+            action = rng.choices(actions, weights=(1, 8, 1))[0]
+            weapon = rng.choice(weapons)
+            result, damage = roll_player_action(action, weapon, rng=rng)
+            if result == "attack_success":
+                enemy_hp = max(0, enemy_hp - damage)
+            elif result in PLAYER_HURT_RESULTS:
+                player_hp = max(0, player_hp - damage)
+            log.player_round(action, weapon, result, damage, player_hp, enemy_hp)
+            if player_hp and enemy_hp:
+                attack = strategy.choose_attack(rng)
+                damage = strategy.roll_damage(attack, rng)
+                player_hp = max(0, player_hp - damage)
+                log.enemy_attack(attack, damage, player_hp, enemy_hp)
+            if not player_hp or not enemy_hp:
+                break
+        log.end(player_hp > 0, player_hp, enemy_hp)
+    log.close()
+    return log
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сводка по журналу боев")
+    parser.add_argument("directory", nargs="?", default=BATTLE_LOG_DIR)
+    parser.add_argument("--generate", type=int, metavar="N", help="сначала дописать N случайных боев")
+    parser.add_argument("--max-mb", type=float, default=MAX_FILE_BYTES / 2 ** 20, help="размер файла журнала, МБ")
+    parser.add_argument("--chunk", type=int, default=CHUNK_RECORDS, help="записей в куске при чтении")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.generate:
+        start = time.perf_counter()
+        log = generate(args.directory, args.generate, int(args.max_mb * 2 ** 20), args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"запись: {log.records_written} записей за {elapsed:.2f} с "
+              f"({log.records_written / elapsed:.0f}/с), смен файла: {log.rotations}")
+
+    start = time.perf_counter()
+    report = summarize(args.directory, args.chunk)
+    elapsed = time.perf_counter() - start
+    print(f"чтение: {report['records']} записей, {report['bytes'] / 2 ** 20:.1f} МБ за {elapsed:.2f} с "
+          f"({report['bytes'] / 2 ** 20 / elapsed if elapsed else 0:.0f} МБ/с)")
+    print(f"боев: {report['battles']}, побед: {100 * report['win_rate']:.1f}%, "
+          f"в среднем раундов: {report['average_rounds']:.2f}")
+    print("действия: " + ", ".join(f"{name} {count}" for name, count in report["actions"].items())
+          + f"; уворот удается в {100 * report['dodge_rate']:.1f}%")
+    for name, rate in report["hit_rate"].items():
+        print(f"  {name:8s} выстрелов {report['shots'][name]:10d}, попаданий {100 * rate:5.1f}%")
+    for name, count in report["enemy_attacks"].items():
+        print(f"  враг {name:8s} атак {count:10d}, средний урон {report['enemy_damage'][name]:.1f}")
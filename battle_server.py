@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from battle_core import (
+    ATTACK_TYPES, ENEMY_DAMAGE_AT, ENEMY_THINK_TIME, ENEMY_TURN_END, PLAYER_HURT_RESULTS,
+    AttackStrategy, roll_player_action
+)
+from battle_state import (
+    ATTACK_CHOSEN, DAMAGE_DEALT, ENEMY_TURN, IDLE, NO_ATTACK, OVER, PLAYER_TURN, BattleTable, intern_rules
+)
+from leaderboard_store import IndexedLeaderboard
+from roster import ROSTER_PATH, EnemyRoster
+from search_ai import SearchWorker
+
+# Сервер боев: правила игры без pygame для многих удаленных сессий в одном процессе.
+# Протокол - JSON-строки по TCP. Запросы клиента:
+#   {"op": "hello", "nickname": "..."}              -> {"event": "hello", "session": N}
+#   {"op": "start", "enemy": "<key>"}               -> {"event": "battle", ...}
+#   {"op": "act", "action": "...", "weapon": "..."} -> {"event": "player", ...}
+#   {"op": "top", "n": 10}                          -> {"event": "top", "rows": [...]}
+#   {"op": "quit"}
+# Ход врага сервер присылает сам: "enemy_attack", "enemy_damage", затем "turn" или "over".
+# Фазы хода врага - таймеры цикла событий (call_later), а не опрос каждый кадр, поэтому
+# тысячи сессий, ждущих своих фаз, не стоят процессора. Результаты боев копятся и
+# пишутся в общую таблицу лидеров пачками, одной транзакцией в рабочем потоке.
+# Состояние боев - массивы battle_state.BattleTable, правила - общие интернированные таблицы.
+# Тактические противники думают в своем рабочем потоке сервера: задачи сессий встают в
+# очередь и друг друга не отменяют (общий поток игры держит только последнюю задачу).
+
+DEFAULT_PORT = 8765
+FLUSH_INTERVAL = 0.5
+BACKLOG = 4096
+MAX_TOP = 100
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class BattleSession:
+    # Соединение и таймер; поля боя - в общей таблице BattleTable под номером battle
+    __slots__ = ("server", "writer", "id", "nickname", "battle", "strategy", "_timer")
+
+    def __init__(self, server: "BattleServer", writer: asyncio.StreamWriter, session_id: int):
+        self.server = server
+        self.writer = writer
+        self.id = session_id
+        self.nickname: Optional[str] = None
+        self.battle: Optional[int] = None
+        self.strategy: Optional[AttackStrategy] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def send(self, message: Dict):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def hello(self, nickname) -> Dict:
+        if not isinstance(nickname, str) or not 0 < len(nickname) <= 15:
+            raise ProtocolError("никнейм - строка от 1 до 15 символов")
+        self.nickname = nickname
+        if self.battle is None:
+            self.battle = self.server.table.allocate()
+        return {"event": "hello", "session": self.id}
+
+    def start(self, key) -> Dict:
+        if self.battle is None:
+            raise ProtocolError("сначала hello")
+        if not isinstance(key, str):
+            raise ProtocolError("противник - строка-ключ")
+        if self.server.table.turn[self.battle] == OVER:
+            # Итог прошлого боя еще не записан - новый бой затер бы его hp
+            raise ProtocolError("бой еще не подведен")
+        enemy = self.server.rules.enemy_index.get(key)
+        if enemy is None:
+            raise ProtocolError(f"неизвестный противник: {key}")
+        self.cancel_timer()
+        table = self.server.table
+        table.start(self.battle, enemy)
+        self.strategy = self.server.rules.strategy(enemy, self.server.search)
+        return {"event": "battle", "enemy": self.server.rules.enemies[enemy].name,
+                "player_hp": int(table.player_hp[self.battle]), "enemy_hp": int(table.enemy_hp[self.battle])}
+
+    def act(self, action, weapon) -> Optional[Dict]:
+        table, battle, rules = self.server.table, self.battle, self.server.rules
+        if battle is None or table.turn[battle] != PLAYER_TURN:
+            raise ProtocolError("сейчас не ваш ход")
+        if not isinstance(action, str) or not (weapon is None or isinstance(weapon, str)):
+            raise ProtocolError("ход и оружие - строки")
+        if action not in rules.actions or (action == "attack" and weapon not in rules.weapons):
+            raise ProtocolError(f"неизвестный ход: {action} {weapon}")
+        result, damage = roll_player_action(action, weapon or "laser", rules.weapons, rules.actions,
+                                            rng=self.server.rng)
+        player_hp, enemy_hp = int(table.player_hp[battle]), int(table.enemy_hp[battle])
+        if result == "attack_success":
+            enemy_hp = table.enemy_hp[battle] = max(0, enemy_hp - damage)
+        elif result in PLAYER_HURT_RESULTS:
+            player_hp = table.player_hp[battle] = max(0, player_hp - damage)
+        self.server.rounds += 1
+        reply = {"event": "player", "result": result, "damage": damage, "player_hp": player_hp, "enemy_hp": enemy_hp}
+
+        if player_hp <= 0 or enemy_hp <= 0:
+            # Итог подводится сразу, до следующего запроса; ответ на ход уходит раньше итога
+            table.turn[battle] = OVER
+            self.send(reply)
+            self.finish()
+            return None
+        # Ход врага: поиск (если он есть) думает, пока идут таймеры фаз
+        table.turn[battle] = ENEMY_TURN
+        table.phase[battle] = 0
+        table.turn_started[battle] = self.server.loop.time()
+        self.strategy.plan(player_hp, enemy_hp)
+        delay = 0.0 if self.strategy.ready() else ENEMY_THINK_TIME
+        self._timer = self.server.schedule(delay, self.enemy_attack)
+        return reply
+
+    def enemy_attack(self):
+        table, battle = self.server.table, self.battle
+        attack = self.strategy.choose_attack(self.server.rng)
+        table.attack[battle] = ATTACK_TYPES.index(attack)
+        table.phase[battle] |= ATTACK_CHOSEN
+        self.send({"event": "enemy_attack", "attack": attack})
+        self._timer = self.server.schedule_at(table.turn_started[battle], ENEMY_DAMAGE_AT, self.enemy_damage)
+
+    def enemy_damage(self):
+        table, battle = self.server.table, self.battle
+        damage = self.strategy.roll_damage(ATTACK_TYPES[table.attack[battle]], self.server.rng)
+        player_hp = table.player_hp[battle] = max(0, int(table.player_hp[battle]) - damage)
+        table.phase[battle] |= DAMAGE_DEALT
+        self.send({"event": "enemy_damage", "damage": damage, "player_hp": player_hp})
+        self._timer = self.server.schedule_at(table.turn_started[battle], ENEMY_TURN_END, self.end_enemy_turn)
+
+    def end_enemy_turn(self):
+        table, battle = self.server.table, self.battle
+        self._timer = None
+        table.phase[battle] = 0
+        table.attack[battle] = NO_ATTACK
+        if table.player_hp[battle] <= 0:
+            table.turn[battle] = OVER
+            self.finish()
+            return
+        table.turn[battle] = PLAYER_TURN
+        self.send({"event": "turn"})
+
+    def finish(self):
+        table, battle = self.server.table, self.battle
+        if battle is None:
+            # Клиент отключился до итога, слот уже освобожден
+            return
+        won = bool(table.player_hp[battle] > 0)
+        if won:
+            table.wins[battle] += 1
+            self.server.report_result(self.nickname, int(table.wins[battle]))
+        # Итог записан: слот свободен для нового боя
+        table.turn[battle] = IDLE
+        self.server.battles += 1
+        self.strategy = None
+        self.send({"event": "over", "won": won, "wins": int(table.wins[battle])})
+
+    def cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def close(self):
+        self.cancel_timer()
+        if self.battle is not None:
+            self.server.table.release(self.battle)
+            self.battle = None
+
+
+class BattleServer:
+    def __init__(self, roster: EnemyRoster, leaderboard: IndexedLeaderboard, speed: float = 1.0,
+                 flush_interval: float = FLUSH_INTERVAL, seed: Optional[int] = None):
+        if speed <= 0:
+            raise ValueError(f"множитель скорости должен быть положительным: {speed}")
+        self.rules = intern_rules(roster)
+        self.table = BattleTable(self.rules)
+        self.search = SearchWorker(supersede=False)
+        self.leaderboard = leaderboard
+        # speed ускоряет фазы хода врага, как --speed у игры
+        self.speed = speed
+        self.flush_interval = flush_interval
+        self.rng = random.Random(seed)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sessions: Dict[int, BattleSession] = {}
+        self._next_id = 0
+        self._results: List[Tuple[str, int]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # Задачи соединений: закрытие сервера дожидается их, а не бросает отмененными
+        self._handlers = set()
+
+        self.rounds = 0
+        self.battles = 0
+        self.peak_sessions = 0
+        self.flushes = 0
+
+    def schedule(self, delay: float, callback) -> asyncio.TimerHandle:
+        return self.loop.call_later(delay / self.speed, callback)
+
+    def schedule_at(self, start: float, offset: float, callback) -> asyncio.TimerHandle:
+        # Фазы отсчитываются от хода игрока, а не от предыдущей фазы - без накопления опозданий
+        return self.loop.call_at(start + offset / self.speed, callback)
+
+    def report_result(self, nickname: str, wins: int):
+        self._results.append((nickname, wins))
+
+    async def flush(self):
+        if not self._results:
+            return
+        results, self._results = self._results, []
+        # SQLite блокирует - пишем в рабочем потоке, цикл событий продолжает обслуживать сессии
+        await asyncio.to_thread(self.leaderboard.record_many, results)
+        self.flushes += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        self.loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=BACKLOG)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self._server
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for session in list(self.sessions.values()):
+            session.close()
+            session.writer.close()
+        # Закрытый сокет дает обработчику конец потока, и он завершается сам
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        self._flusher.cancel()
+        await self.flush()
+
+    async def _dispatch(self, session: BattleSession, request: Dict) -> Optional[Dict]:
+        op = request.get("op")
+        if op == "hello":
+            return session.hello(request.get("nickname"))
+        if op == "start":
+            return session.start(request.get("enemy"))
+        if op == "act":
+            return session.act(request.get("action"), request.get("weapon"))
+        if op == "top":
+            # Чтение тоже в потоке: база может быть занята записью пачки.
+            # Только что выигранные бои видны после ближайшего сброса
+            n = request.get("n", 10)
+            if not isinstance(n, int) or isinstance(n, bool):
+                raise ProtocolError("n - целое число")
+            n = min(max(n, 1), MAX_TOP)
+            return {"event": "top", "rows": await asyncio.to_thread(self.leaderboard.top, n)}
+        raise ProtocolError(f"неизвестная операция: {op}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._next_id += 1
+        session = BattleSession(self, writer, self._next_id)
+        self.sessions[session.id] = session
+        self._handlers.add(asyncio.current_task())
+        self.peak_sessions = max(self.peak_sessions, len(self.sessions))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ProtocolError("запрос - JSON-объект")
+                    if request.get("op") == "quit":
+                        break
+                    reply = await self._dispatch(session, request)
+                except (ProtocolError, ValueError) as e:
+                    reply = {"error": str(e)}
+                if reply is not None:
+                    session.send(reply)
+                # Медленный клиент не раздувает буфер записи бесконечно
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            session.close()
+            del self.sessions[session.id]
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self.sessions),
+            "peak_sessions": self.peak_sessions,
+            "rounds": self.rounds,
+            "battles": self.battles,
+            "live_battles": self.table.live,
+            "battle_table_bytes": self.table.nbytes(),
+            "leaderboard_flushes": self.flushes,
+            **self.leaderboard.stats()
+        }
+
+
+async def serve(host: str, port: int, speed: float, db_path: str, stats_every: float):
+    server = BattleServer(EnemyRoster.load(ROSTER_PATH), IndexedLeaderboard(db_path), speed)
+    await server.start(host, port)
+    print(f"сервер боев слушает {host}:{server.port}")
+    try:
+        while True:
+            await asyncio.sleep(stats_every)
+            print(time.strftime("%H:%M:%S"), server.stats())
+    finally:
+        await server.close()
+        server.leaderboard.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервер боев для удаленных сессий")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speed", type=float, default=1.0, help="множитель скорости фаз хода врага")
+    parser.add_argument("--db", default="leaderboard.db")
+    parser.add_argument("--stats-every", type=float, default=10.0, help="период вывода статистики, с")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.speed, args.db, args.stats_every))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,225 @@
+import argparse
+import gc
+import json
+import os
+import time
+import tracemalloc
+from array import array
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from battle_core import ACTIONS, ATTACK_TYPES, PLAYER_MAX_HP, WEAPONS, AttackStrategy
+from roster import ROSTER_PATH, EnemyDefinition, EnemyRoster
+from search_ai import SearchWorker
+
+# Компактное состояние боев для сервера. Правила (оружие, действия, противники) -
+# неизменяемые таблицы, общие для всех боев: одинаковые правила интернируются в один
+# объект Rules. Поля самого боя (hp, чей ход, фаза хода врага, время) лежат в
+# типизированных массивах NumPy по номеру боя - struct of arrays вместо объекта
+# Player + Enemy со своими словарями на каждый бой. Номера освобожденных боев
+# переиспользуются, массивы растут удвоением.
+
+# Чей ход
+IDLE, PLAYER_TURN, ENEMY_TURN, OVER = range(4)
+# Флаги фазы хода врага; те же флаги у Enemy.phase в игре
+ATTACK_CHOSEN = 1
+DAMAGE_DEALT = 2
+NO_ATTACK = -1
+
+FIELDS: List[Tuple[str, type]] = [
+    ("player_hp", np.int16),
+    ("enemy_hp", np.int16),
+    # Номер противника в Rules.enemies
+    ("enemy", np.int16),
+    ("wins", np.int32),
+    ("turn", np.uint8),
+    ("phase", np.uint8),
+    # Номер атаки в ATTACK_TYPES или NO_ATTACK
+    ("attack", np.int8),
+    ("turn_started", np.float64)
+]
+
+
+def freeze(value):
+    # Глубокая неизменяемая копия: словари - MappingProxyType, списки - кортежи
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Rules:
+    __slots__ = ("weapons", "actions", "attack_types", "enemies", "enemy_index", "_strategies")
+
+    def __init__(self, weapons: Dict, actions: Dict, enemies: Tuple[EnemyDefinition, ...]):
+        self.weapons = freeze(weapons)
+        self.actions = freeze(actions)
+        self.attack_types = tuple(ATTACK_TYPES)
+        self.enemies = enemies
+        self.enemy_index = MappingProxyType({definition.key: i for i, definition in enumerate(enemies)})
+        self._strategies: Dict[int, AttackStrategy] = {}
+
+    def strategy(self, enemy: int, worker: Optional[SearchWorker] = None) -> AttackStrategy:
+        # Стратегия по весам не хранит состояния боя - одна на противника для всех боев;
+        # тактическому поиску нужна своя на бой
+        definition = self.enemies[enemy]
+        if definition.tactical:
+            return definition.strategy(worker)
+        strategy = self._strategies.get(enemy)
+        if strategy is None:
+            strategy = self._strategies[enemy] = definition.strategy()
+        return strategy
+
+
+_interned: Dict[Tuple, Rules] = {}
+
+def intern_rules(roster: EnemyRoster, weapons: Dict = WEAPONS, actions: Dict = ACTIONS) -> Rules:
+    # Одинаковые правила - один объект, даже если ростер загружен повторно
+    key = (json.dumps(weapons, sort_keys=True), json.dumps(actions, sort_keys=True),
+           tuple((d.key, d.max_hp, tuple(d.weights), d.sprite, d.tint, d.ai) for d in roster))
+    rules = _interned.get(key)
+    if rules is None:
+        rules = _interned[key] = Rules(weapons, actions, tuple(roster))
+    return rules
+
+
+class BattleTable:
+    def __init__(self, rules: Rules, capacity: int = 1024):
+        self.rules = rules
+        self.capacity = 0
+        for name, dtype in FIELDS:
+            setattr(self, name, np.zeros(0, dtype))
+        # Стек свободных номеров; сверху - меньшие, чтобы занятые номера шли плотно
+        self._free = array("i")
+        self.live = 0
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int):
+        for name, dtype in FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def allocate(self) -> int:
+        if not self._free:
+            self._grow(self.capacity * 2)
+        battle = self._free.pop()
+        self.player_hp[battle] = PLAYER_MAX_HP
+        self.enemy_hp[battle] = 0
+        self.enemy[battle] = 0
+        self.wins[battle] = 0
+        self.turn[battle] = IDLE
+        self.phase[battle] = 0
+        self.attack[battle] = NO_ATTACK
+        self.turn_started[battle] = 0.0
+        self.live += 1
+        return battle
+
+    def release(self, battle: int):
+        self.turn[battle] = IDLE
+        self._free.append(battle)
+        self.live -= 1
+
+    def start(self, battle: int, enemy: int):
+        # Новый бой в том же слоте: победы игрока сохраняются
+        self.player_hp[battle] = PLAYER_MAX_HP
+        self.enemy_hp[battle] = self.rules.enemies[enemy].max_hp
+        self.enemy[battle] = enemy
+        self.turn[battle] = PLAYER_TURN
+        self.phase[battle] = 0
+        self.attack[battle] = NO_ATTACK
+
+    def row(self, battle: int) -> Dict:
+        return {name: getattr(self, name)[battle].item() for name, _ in FIELDS}
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name, _ in FIELDS) + self._free.itemsize * len(self._free)
+
+
+def _measure(build) -> Tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, kept
+
+def benchmark(battles: int, legacy_battles: int) -> Dict:
+    roster = EnemyRoster.load(ROSTER_PATH)
+    rules = intern_rules(roster)
+    count = len(rules.enemies)
+
+    def build_table():
+        table = BattleTable(rules, battles)
+        for i in range(battles):
+            battle = table.allocate()
+            table.start(battle, i % count)
+        return table
+    start = time.perf_counter()
+    table_bytes, table = _measure(build_table)
+    table_time = time.perf_counter() - start
+
+    # Прежнее представление: пара Player + Enemy из игры на бой. Пиксели поверхностей
+    # (общий спрайт, облачко из атласа) живут в SDL и в замер не входят
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import kks
+    from speech_atlas import speech_atlas
+    from startup import ensure_subsystems
+    ensure_subsystems("display", "font")
+    pygame.display.set_mode((1, 1))
+    kks.init_fonts()
+    speech_atlas.build(kks.font_small, kks.speech_texts())
+    page = roster.page(0, kks.ENEMY_PAGE_SIZE)
+    for definition in page:
+        kks.assets.sprite(definition.sprite, (250, 250), definition.tint)
+
+    def build_objects():
+        pairs = []
+        for i in range(legacy_battles):
+            definition = page[i % len(page)]
+            player = kks.Player(f"P{i}")
+            enemy = kks.Enemy(definition.name, definition.max_hp, definition.strategy(), definition.sprite,
+                              definition.tint)
+            enemy.speech_text = kks.ENEMY_DIALOGUES["laser"][0]
+            enemy.update_speech_bubble(enemy.speech_text)
+            enemy.phase = ATTACK_CHOSEN
+            pairs.append((player, enemy))
+        return pairs
+    start = time.perf_counter()
+    objects_bytes, pairs = _measure(build_objects)
+    objects_time = time.perf_counter() - start
+
+    return {
+        "battles": battles,
+        "table_bytes_per_battle": table_bytes / battles,
+        "table_array_bytes": table.nbytes(),
+        "table_build_s": table_time,
+        "legacy_battles": len(pairs),
+        "legacy_bytes_per_battle": objects_bytes / legacy_battles,
+        "legacy_build_s": objects_time
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Память на бой: массивы состояния против объектов игры")
+    parser.add_argument("-n", "--battles", type=int, default=100000)
+    parser.add_argument("--legacy", type=int, default=20000, help="боев в прежнем представлении")
+    args = parser.parse_args()
+
+    report = benchmark(args.battles, args.legacy)
+    table, legacy = report["table_bytes_per_battle"], report["legacy_bytes_per_battle"]
+    print(f"массивы:   {table:8.1f} байт на бой ({report['battles']} боев, "
+          f"массивы {report['table_array_bytes'] / 1e6:.1f} МБ, {report['table_build_s']:.2f} с)")
+    print(f"объекты:   {legacy:8.1f} байт на бой ({report['legacy_battles']} боев, "
+          f"{report['legacy_build_s']:.2f} с; без пикселей общих поверхностей)")
+    print(f"экономия:  x{legacy / table:.1f}, 100000 боев: {100000 * table / 1e6:.1f} МБ "
+          f"против {100000 * legacy / 1e6:.1f} МБ")
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+# Бенчмарк отрисовки всех экранов игры без окна (SDL dummy).
+# Игра проводится по каждому состоянию, мышь водится по заранее заданному маршруту,
+# для каждого состояния пишутся FPS, перцентили времени кадра, выделения памяти
+# Python за кадр (tracemalloc, отдельный проход) и пиксели, отправленные на экран.
+# Результат сравнивается с сохраненной базой, регрессии дают код выхода 1.
+# База зависит от машины, поэтому в репозитории ее нет: сначала снимается своя -
+#   python bench_render.py --save-baseline
+# затем обычные прогоны сравниваются с ней. Без базы прогон завершается с кодом 2.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import kks
+
+DEFAULT_RESULTS = "bench_results.json"
+DEFAULT_BASELINE = "bench_baseline.json"
+STATES = ["loading", "nickname", "menu", "battle", "stats", "game_over"]
+
+# Маршруты мыши: точки над кнопками и пустыми местами, чтобы менялась подсветка
+MOUSE_PATHS: Dict[str, List[Tuple[int, int]]] = {
+    "loading": [(400, 300)],
+    "nickname": [(400, 320), (10, 10)],
+    "menu": [(210, 140), (210, 250), (330, 490), (710, 35), (10, 10)],
+    "battle": [(190, 525), (400, 525), (610, 525), (710, 170), (710, 220), (110, 35), (400, 200)],
+    "stats": [(110, 35), (400, 300)],
+    "game_over": [(400, 375), (10, 10)]
+}
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RenderBenchmark:
+    def __init__(self, frames: int = 300, warmup: int = 30, players: int = 1000, seed: int = 0):
+        self.frames = frames
+        self.warmup = warmup
+        self.players = players
+        self.seed = seed
+        self.mouse_pos = (0, 0)
+        self.game = None
+
+    def _setup_game(self):
+        random.seed(self.seed)
+        game = kks.SpaceWarGame()
+        # Ждем и необязательные задачи, чтобы фоновый поток не искажал замеры
+        while not game.loader.done():
+            time.sleep(0.001)
+        game.leaderboard_store.record_many((f"PILOT{i}", random.randint(0, 50)) for i in range(self.players))
+        game.player = kks.Player("BENCH")
+        game.player.wins = 3
+        game.leaderboard_store.record("BENCH", 3)
+        self.game = game
+
+    def _enter(self, state: str):
+        game = self.game
+        if state in ("battle", "game_over"):
+            game.state = "menu"
+            game.handle_click(game.enemy_buttons[1].rect.center)
+            if state == "game_over":
+                game.current_enemy.current_hp = 0
+                game.current_enemy.speech_text = f"ПОБЕДА ЗА {game.player.name}!"
+                game.current_enemy.update_speech_bubble(game.current_enemy.speech_text)
+        elif state == "stats":
+            game.open_stats()
+        elif state == "nickname":
+            game.nickname = "BENCH"
+        game.state = state
+
+    def _frame(self, state: str, index: int):
+        game = self.game
+        path = MOUSE_PATHS[state]
+        # Мышь в dummy-драйвере не двигается: движение подается событием, как от SDL
+        pos = path[(index // 10) % len(path)]
+        if pos != self.mouse_pos:
+            self.mouse_pos = pos
+            pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+        if state == "stats" and index % 5 == 0:
+            # Таблица все время листается: колесо вниз, каждые 600 кадров - обратно
+            step = -1 if (index // 300) % 2 == 0 else 1
+            pygame.event.post(pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=step, flipped=False))
+        game.frame_time = game.sim_clock.tick()
+        game.handle_events()
+        # На экране загрузки update сразу ушел бы дальше - его там не зовем
+        if state != "loading":
+            game.update()
+        game.draw()
+        game.present()
+
+    def run_state(self, state: str) -> Dict:
+        self._enter(state)
+        renderer = self.game.renderer
+        for i in range(self.warmup):
+            self._frame(state, i)
+
+        times = []
+        pixels_before = renderer.pixels_pushed
+        for i in range(self.frames):
+            start = time.perf_counter()
+            self._frame(state, i)
+            times.append(time.perf_counter() - start)
+        pixels = (renderer.pixels_pushed - pixels_before) / self.frames
+
+        # Отдельный проход для памяти: tracemalloc сильно замедляет кадр
+        tracemalloc.start()
+        peaks = []
+        for i in range(min(self.frames, 100)):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self._frame(state, i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+        total = sum(times)
+        return {
+            "frames": self.frames,
+            "fps": self.frames / total if total else 0.0,
+            "p50_ms": 1000 * _percentile(times, 0.5),
+            "p95_ms": 1000 * _percentile(times, 0.95),
+            "p99_ms": 1000 * _percentile(times, 0.99),
+            "max_ms": 1000 * max(times),
+            "alloc_bytes_per_frame": sum(peaks) / len(peaks),
+            "pixels_per_frame": pixels
+        }
+
+    def run(self, states: List[str]) -> Dict:
+        self._setup_game()
+        results = {}
+        for state in states:
+            results[state] = self.run_state(state)
+        self.game.leaderboard_store.close()
+        return {
+            "meta": {
+                "time": time.time(),
+                "python": sys.version.split()[0],
+                "pygame": pygame.version.ver,
+                "frames": self.frames,
+                "players": self.players
+            },
+            "states": results
+        }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    # Регрессия: медиана или p99 кадра, либо выделения памяти выросли больше допуска
+    regressions = []
+    for state, current in results["states"].items():
+        base = baseline.get("states", {}).get(state)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p99_ms", "alloc_bytes_per_frame"):
+            slack = 1024 if metric == "alloc_bytes_per_frame" else 0.05
+            if current[metric] > base[metric] * (1 + tolerance) + slack:
+                regressions.append(f"{state}.{metric}: {base[metric]:.3f} -> {current[metric]:.3f}")
+    return regressions
+
+def format_table(results: Dict) -> str:
+    lines = [f"{'СОСТОЯНИЕ':<10} {'FPS':>8} {'P50 МС':>8} {'P95 МС':>8} {'P99 МС':>8} "
+             f"{'БАЙТ/КАДР':>10} {'ПИКС/КАДР':>10}"]
+    for state, data in results["states"].items():
+        lines.append(f"{state:<10} {data['fps']:>8.0f} {data['p50_ms']:>8.3f} {data['p95_ms']:>8.3f} "
+                     f"{data['p99_ms']:>8.3f} {data['alloc_bytes_per_frame']:>10.0f} "
+                     f"{data['pixels_per_frame']:>10.0f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки экранов игры")
+    parser.add_argument("-s", "--state", action="append", choices=STATES)
+    parser.add_argument("-n", "--frames", type=int, default=300)
+    parser.add_argument("--players", type=int, default=1000, help="игроков в таблице лидеров")
+    parser.add_argument("-o", "--output", default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", "--update-baseline", dest="save_baseline", action="store_true",
+                        help="сохранить этот прогон как базу для сравнения")
+    parser.add_argument("--no-compare", action="store_true", help="только замер, без сравнения с базой")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый относительный рост")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+    # Игра пишет базу лидеров и журналы запуска в текущий каталог - уводим их во временный
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    os.chdir(workdir)
+
+    results = RenderBenchmark(args.frames, players=args.players).run(args.state or STATES)
+    print(format_table(results))
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"база обновлена: {baseline_path}")
+    elif args.no_compare:
+        pass
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("РЕГРЕССИИ:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("регрессий нет")
+    else:
+        print(f"ОШИБКА: базы нет ({baseline_path}). Снимите ее на этой машине: "
+              f"python bench_render.py --save-baseline")
+        sys.exit(2)
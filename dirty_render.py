@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import pygame
+
+from profiler import profiler
+
+# Отрисовка по грязным прямоугольникам.
+# Для каждого экрана один раз собирается статический слой (фон, рамки, заголовки).
+# Динамические элементы регистрируются как регионы: (id, прямоугольник, сигнатура, функция
+# отрисовки). Регион перерисовывается, только если его сигнатура или прямоугольник
+# изменились с прошлого кадра; на экран отправляются только затронутые прямоугольники.
+# Фон (background) рисуется между слоем и регионами и сообщает измененные пиксели;
+# если их слишком много, экран отправляется целиком.
+# Каждый регион помнит владельца (owner) - метод, который его зарегистрировал; время
+# отрисовки регионов профайлер записывает по владельцам.
+
+DEBUG_COLOR = (255, 0, 255)
+MAX_BACKGROUND_RECTS = 1024
+# Слой - полный кадр в памяти; при сотнях противников храним только последние
+MAX_LAYERS = 8
+
+
+class DirtyRenderer:
+    def __init__(self, screen: pygame.Surface):
+        self.screen = screen
+        self.layers: "OrderedDict[Hashable, pygame.Surface]" = OrderedDict()
+        self.layer_key: Optional[Hashable] = None
+        self.debug = False
+        # Объект с методом render(screen, layer, occupied, full) -> список прямоугольников,
+        # например Starfield
+        self.background = None
+        # Владелец регионов, регистрируемых сейчас (например, "draw_battle")
+        self.owner: Optional[str] = None
+
+        self._previous: Dict[Hashable, Tuple[pygame.Rect, Hashable]] = {}
+        self._regions: List[Tuple[Hashable, pygame.Rect, Hashable, Callable, Optional[str]]] = []
+        self._full_redraw = True
+        self._debug_rects: List[pygame.Rect] = []
+
+        # Счетчики для замера: сколько пикселей реально отправлено на экран
+        self.frames = 0
+        self.pixels_pushed = 0
+        self.last_pixels = 0
+        self.last_rects: List[pygame.Rect] = []
+
+    def layer(self, key: Hashable, builder: Callable[[pygame.Surface], None]) -> pygame.Surface:
+        surface = self.layers.get(key)
+        if surface is None:
+            with profiler.section("layer_build"):
+                surface = pygame.Surface(self.screen.get_size()).convert()
+                builder(surface)
+            self.layers[key] = surface
+            while len(self.layers) > MAX_LAYERS:
+                self.layers.popitem(last=False)
+        else:
+            self.layers.move_to_end(key)
+        return surface
+
+    def begin(self, key: Hashable, builder: Callable[[pygame.Surface], None]):
+        self.layer(key, builder)
+        if key != self.layer_key:
+            self.layer_key = key
+            self._full_redraw = True
+        self._regions = []
+
+    def add(self, region_id: Hashable, rect, signature: Hashable, draw: Callable[[], None]):
+        self._regions.append((region_id, pygame.Rect(rect), signature, draw, self.owner))
+
+    def invalidate(self):
+        self._full_redraw = True
+
+    def drop_layers(self):
+        self.layers.clear()
+        self.layer_key = None
+        self._full_redraw = True
+
+    def _dirty_rects(self, extra: List[pygame.Rect]) -> Tuple[List[pygame.Rect], List[int]]:
+        dirty = list(extra)
+        current_ids = set()
+        for region_id, rect, signature, _, _ in self._regions:
+            current_ids.add(region_id)
+            previous = self._previous.get(region_id)
+            if previous is None:
+                dirty.append(rect)
+            elif previous[0] != rect or previous[1] != signature:
+                # Старое и новое место - отдельно: их объединение может накрыть пол-экрана
+                dirty.append(previous[0])
+                dirty.append(rect)
+        for region_id, (rect, _) in self._previous.items():
+            if region_id not in current_ids:
+                dirty.append(rect)
+
+        # Регион, задетый восстановлением фона, перерисовывается целиком,
+        # а его прямоугольник тоже становится грязным - до неподвижной точки
+        redraw = set()
+        changed = True
+        while changed:
+            changed = False
+            for i, (_, rect, _, _, _) in enumerate(self._regions):
+                if i not in redraw and rect.collidelist(dirty) != -1:
+                    redraw.add(i)
+                    dirty.append(rect)
+                    changed = True
+        return dirty, sorted(redraw)
+
+    @staticmethod
+    def _clip(rects: List[pygame.Rect], bounds: pygame.Rect) -> List[pygame.Rect]:
+        # Один регион попадает в список и старым, и новым местом, и при перерисовке -
+        # одинаковые прямоугольники восстанавливаются и отправляются один раз
+        unique = []
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if rect.width and rect.height and rect not in unique:
+                unique.append(rect)
+        return unique
+
+    def _draw_regions(self, indices: List[int]):
+        if not profiler.enabled:
+            for i in indices:
+                self._regions[i][3]()
+            return
+        # Регионы одного владельца идут подряд - замеряем их одной секцией
+        position = 0
+        while position < len(indices):
+            owner = self._regions[indices[position]][4]
+            with profiler.section(owner or "regions"):
+                while position < len(indices) and self._regions[indices[position]][4] == owner:
+                    self._regions[indices[position]][3]()
+                    position += 1
+
+    def present(self):
+        layer = self.layers[self.layer_key]
+        screen_rect = self.screen.get_rect()
+
+        if self._full_redraw:
+            self.screen.blit(layer, (0, 0))
+            if self.background is not None:
+                with profiler.section("background"):
+                    self.background.render(self.screen, layer, [region[1] for region in self._regions], True)
+            self._draw_regions(list(range(len(self._regions))))
+            rects = [screen_rect]
+        else:
+            with profiler.section("dirty_rects"):
+                dirty, redraw = self._dirty_rects(self._debug_rects)
+                rects = self._clip(dirty, screen_rect)
+            with profiler.section("restore"):
+                for rect in rects:
+                    self.screen.blit(layer, rect, rect)
+            if self.background is not None:
+                with profiler.section("background"):
+                    changed = self.background.render(self.screen, layer, [region[1] for region in self._regions],
+                                                     False)
+                    rects = rects + changed if len(changed) <= MAX_BACKGROUND_RECTS else [screen_rect]
+            self._draw_regions(redraw)
+
+        # Отладочные рамки обводят только настоящие изменения; место, где рамки
+        # были на прошлом кадре, восстанавливается, но само уже не обводится
+        self._debug_rects = []
+        if self.debug and not self._full_redraw:
+            outlined = self._clip(self._dirty_rects([])[0], screen_rect)
+            for rect in outlined:
+                pygame.draw.rect(self.screen, DEBUG_COLOR, rect, 1)
+            self._debug_rects = outlined
+
+        self._previous = {region_id: (rect, signature)
+                          for region_id, rect, signature, _, _ in self._regions}
+        self._full_redraw = False
+
+        if rects:
+            with profiler.section("display.update"):
+                pygame.display.update(rects)
+        self.frames += 1
+        self.last_rects = rects
+        self.last_pixels = sum(rect.width * rect.height for rect in rects)
+        self.pixels_pushed += self.last_pixels
+
+    def stats(self) -> Dict[str, float]:
+        full = self.screen.get_width() * self.screen.get_height()
+        average = self.pixels_pushed / self.frames if self.frames else 0.0
+        return {
+            "frames": self.frames,
+            "pixels_pushed": self.pixels_pushed,
+            "pixels_per_frame": average,
+            "full_frame_pixels": full,
+            "fraction_of_full": average / full if full else 0.0
+        }
@@ -1,14 +1,39 @@
+import time
+
+# Момент запуска процесса - точка отсчета для отчета о старте и времени до интерактивности
+LAUNCH_TIME = time.perf_counter()
+
 import pygame
 import sys
 import random
-import time
-import json
-from abc import ABC, abstractmethod
 from typing import Dict, List, Tuple
 
-# Инициализация Pygame
-pygame.init()
-pygame.font.init()
+from battle_core import (
+    AttackStrategy, PLAYER_MAX_HP, ENEMY_THINK_TIME, ENEMY_DAMAGE_AT, ENEMY_TURN_END,
+    WEAPONS, ACTIONS, PLAYER_HURT_RESULTS, roll_player_action
+)
+from solver import solve, solve_worker
+from leaderboard_store import IndexedLeaderboard
+from text_cache import render_text
+from dirty_render import DirtyRenderer
+from assets import assets
+from loader import BackgroundLoader, record_launch
+from startup import FontResolver, StartupTimer, ensure_subsystems
+from profiler import profiler
+from replay import SessionRecorder, logic_signature
+from sim_clock import SimClock
+from pacing import FramePacer
+from starfield import Starfield, DEFAULT_STARS
+from speech_atlas import speech_atlas
+from roster import EnemyRoster, ROSTER_PATH
+from widgets import WidgetLayer
+from battle_log import BattleLog, BATTLE_LOG_DIR
+from battle_state import ATTACK_CHOSEN, DAMAGE_DEALT
+from snapshot import SNAPSHOT_PATH, SnapshotWriter, capture, load as load_snapshot
+from leaderboard_view import LeaderboardView, WHEEL_ROWS
+
+startup_timer = StartupTimer(LAUNCH_TIME)
+startup_timer.mark("imports")
 
 # Константы
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
@@ -23,30 +48,70 @@ PURPLE = (128, 0, 128)
 CYAN = (0, 255, 255)
 ORANGE = (255, 165, 0)
 
-# Шрифты
-font_small = pygame.font.SysFont('Courier New', 18, bold=True)
-font_medium = pygame.font.SysFont('Courier New', 22, bold=True)
-font_large = pygame.font.SysFont('Courier New', 32, bold=True)
+# Ограничение частоты кадров по состояниям: статичным экранам 60 FPS не нужны.
+# В простое (ничего не анимируется) цикл ждет событий и просыпается с частотой IDLE_FPS.
+# Звездный фон движется сам: первые STARFIELD_LINGER секунд простоя кадры идут с частотой
+# STARFIELD_FPS, иначе звезды прыгают; потом звезды замирают, и цикл ждет событий.
+STATE_FPS = {"loading": 60, "nickname": 30, "menu": 30, "battle": 60, "stats": 30, "game_over": 30}
+IDLE_FPS = 2
+STARFIELD_FPS = 20
+STARFIELD_LINGER = 10.0
 
-# Паттерн Стратегия для выбора атаки врагом
-class AttackStrategy(ABC):
-    @abstractmethod
-    def choose_attack(self) -> str:
-        pass
+# Противников на странице меню
+ENEMY_PAGE_SIZE = 6
 
-class FastAttackStrategy(AttackStrategy):
-    def choose_attack(self) -> str:
-        return random.choices(
-            ["tentacle", "laser", "missile"],
-            weights=[0.5, 0.3, 0.2]
-        )[0]
+# Прокрутка таблицы лидеров с клавиатуры
+STATS_KEYS = {
+    pygame.K_UP: lambda view: view.scroll(-1),
+    pygame.K_DOWN: lambda view: view.scroll(1),
+    pygame.K_PAGEUP: lambda view: view.page(-1),
+    pygame.K_PAGEDOWN: lambda view: view.page(1),
+    pygame.K_HOME: lambda view: view.home(),
+    pygame.K_END: lambda view: view.end()
+}
 
-class HeavyAttackStrategy(AttackStrategy):
-    def choose_attack(self) -> str:
-        return random.choices(
-            ["tentacle", "laser", "missile"],
-            weights=[0.3, 0.4, 0.3]
-        )[0]
+# Скорости перемотки времени по F6
+WARP_SPEEDS = (1, 2, 4, 8)
+
+def cli_option(name: str, default=None):
+    # Значение параметра вида "--name VALUE" из командной строки
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+# Реплики врагов; все они заранее попадают в атлас облачков
+ENEMY_DIALOGUES = {
+    "win": ["ХА! ТЕБЕ НЕ ПОБЕДИТЬ!", "МОЯ ОЧЕРЕДЬ ТЕБЯ УНИЧТОЖИТЬ!"],
+    "lose": ["АРГХ! КРИТИЧЕСКИЕ ПОВРЕЖДЕНИЯ!", "СИСТЕМЫ ОТКАЗЫВАЮТ!"],
+    "draw": ["НИЧЬЯ? НЕВЕРОЯТНО!", "ТВОЯ ЗАЩИТА НЕПЛОХА..."],
+    "dodge": ["ТЫ ДЕРЕШЬСЯ ИЛИ В ИГРЫ ИГРАЕМ?", "БЕГСТВО - ТВОЕ ЕДИНСТВЕННОЕ СПАСЕНИЕ!"],
+    "attack": ["ПРИНИМАЙ УДАР!", "ЭТО БУДЕТ БОЛЬНО!"],
+    "ignore": ["ТЫ СЛИШКОМ УВЕРЕН В СЕБЕ!", "ПОСМОТРИМ, КАК ТЫ ВЫКРУТИШЬСЯ!"],
+    "tentacle": ["ЩУПАЛЬЦА ОПЛЕТАЮТ ТВОЙ КОРАБЛЬ!", "ПОПРОБУЙ УКЛОНИТЬСЯ ОТ ЭТОГО!"],
+    "laser": ["ЛАЗЕРНЫЙ ЗАРЯД ЗАПУЩЕН!", "ОЧЕНЬ БОЛЬНО, ДА?"],
+    "missile": ["РАКЕТЫ В ПУТИ!", "ПОДАРОК ДЛЯ ТЕБЯ!"]
+}
+DODGE_FAIL_SPEECH = "ПОПАДАНИЕ! ПРИНИМАЙ УДАР!"
+ATTACK_FAIL_SPEECH = "ПРОМАХ! ПОПРОБУЙ ЕЩЕ РАЗ!"
+
+def speech_texts() -> List[str]:
+    texts = [line for lines in ENEMY_DIALOGUES.values() for line in lines]
+    return texts + [DODGE_FAIL_SPEECH, ATTACK_FAIL_SPEECH]
+
+# Шрифты создаются в init_fonts(), когда модуль font уже включен
+font_small = None
+font_medium = None
+font_large = None
+
+def init_fonts():
+    global font_small, font_medium, font_large
+    resolver = FontResolver()
+    font_small = resolver.font('Courier New', 18, bold=True)
+    font_medium = resolver.font('Courier New', 22, bold=True)
+    font_large = resolver.font('Courier New', 32, bold=True)
+    resolver.save()
 
 # Базовый класс корабля
 class Spaceship:
@@ -80,97 +145,71 @@ class Spaceship:
 # Класс игрока
 class Player(Spaceship):
     def __init__(self, nickname: str):
-        super().__init__(nickname, 150)
+        super().__init__(nickname, PLAYER_MAX_HP)
         self.wins = 0
+        weapon_colors = {"laser": RED, "ion": CYAN, "shield": BLUE}
         self.weapons = {
-            "laser": {"damage": 35, "color": RED, "chance": 0.85},
-            "ion": {"damage": 25, "color": CYAN, "chance": 0.9},
-            "shield": {"damage": 15, "color": BLUE, "chance": 0.75}
-        }
-        self.actions = {
-            "dodge": {"text": "УВОРОТ", "chance": 0.7},
-            "attack": {"text": "ПРЯМОЙ УДАР", "chance": 0.85},
-            "ignore": {"text": "ИГНОРИРОВАТЬ"}
+            name: dict(weapon, color=weapon_colors[name]) for name, weapon in WEAPONS.items()
         }
+        self.actions = {name: dict(action) for name, action in ACTIONS.items()}
 
 # Класс врага
 class Enemy(Spaceship):
-    def __init__(self, name: str, max_hp: int, strategy: AttackStrategy, image_path: str):
+    def __init__(self, name: str, max_hp: int, strategy: AttackStrategy, sprite: str, tint=None):
         super().__init__(name, max_hp)
         self.strategy = strategy
-        self.original_image = pygame.image.load(image_path)
-        self.image = pygame.transform.scale(self.original_image, (250, 250))
-        self.speech_bubble = pygame.Surface((300, 100), pygame.SRCALPHA)
+        # Общая поверхность из кэша ассетов, уже в формате экрана
+        self.image = assets.sprite(sprite, (250, 250), tint)
+        # Облачко - подповерхность общего атласа реплик
+        self.speech_bubble = None
+        # Пройденные фазы хода врага - битовые флаги, их сохраняет снимок
+        self.phase = 0
         self.attack_names = {
             "tentacle": "ЩУПАЛЬЦЕ",
             "laser": "ЛАЗЕР",
             "missile": "РАКЕТА"
         }
-        self.dialogues = {
-            "win": ["ХА! ТЕБЕ НЕ ПОБЕДИТЬ!", "МОЯ ОЧЕРЕДЬ ТЕБЯ УНИЧТОЖИТЬ!"],
-            "lose": ["АРГХ! КРИТИЧЕСКИЕ ПОВРЕЖДЕНИЯ!", "СИСТЕМЫ ОТКАЗЫВАЮТ!"],
-            "draw": ["НИЧЬЯ? НЕВЕРОЯТНО!", "ТВОЯ ЗАЩИТА НЕПЛОХА..."],
-            "dodge": ["ТЫ ДЕРЕШЬСЯ ИЛИ В ИГРЫ ИГРАЕМ?", "БЕГСТВО - ТВОЕ ЕДИНСТВЕННОЕ СПАСЕНИЕ!"],
-            "attack": ["ПРИНИМАЙ УДАР!", "ЭТО БУДЕТ БОЛЬНО!"],
-            "ignore": ["ТЫ СЛИШКОМ УВЕРЕН В СЕБЕ!", "ПОСМОТРИМ, КАК ТЫ ВЫКРУТИШЬСЯ!"],
-            "tentacle": ["ЩУПАЛЬЦА ОПЛЕТАЮТ ТВОЙ КОРАБЛЬ!", "ПОПРОБУЙ УКЛОНИТЬСЯ ОТ ЭТОГО!"],
-            "laser": ["ЛАЗЕРНЫЙ ЗАРЯД ЗАПУЩЕН!", "ОЧЕНЬ БОЛЬНО, ДА?"],
-            "missile": ["РАКЕТЫ В ПУТИ!", "ПОДАРОК ДЛЯ ТЕБЯ!"]
-        }
+        self.dialogues = ENEMY_DIALOGUES
     
     def choose_attack(self) -> str:
         return self.strategy.choose_attack()
     
+    def plan_attack(self, player):
+        # Тактическая стратегия начинает поиск в фоне, остальные выбирают сразу
+        self.strategy.plan(player.current_hp, self.current_hp)
+    
     def get_dialogue(self, result: str) -> str:
         return random.choice(self.dialogues[result])
     
     def update_speech_bubble(self, text: str):
-        self.speech_bubble.fill((0, 0, 0, 0))
-        pygame.draw.rect(self.speech_bubble, (50, 50, 100, 200), (0, 0, 300, 100), border_radius=10)
-        pygame.draw.rect(self.speech_bubble, CYAN, (0, 0, 300, 100), 2, border_radius=10)
-        
-        words = text.split()
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            test_line = current_line + word + " "
-            if font_small.size(test_line)[0] < 280:
-                current_line = test_line
-            else:
-                lines.append(current_line)
-                current_line = word + " "
-        
-        if current_line:
-            lines.append(current_line)
-        
-        for i, line in enumerate(lines[:2]):
-            text_surface = font_small.render(line, True, WHITE)
-            self.speech_bubble.blit(text_surface, (10, 10 + i * 25))
-    
-    def perform_enemy_turn(self, player):
+        self.speech_bubble = speech_atlas.bubble(text)
+    
+    def perform_enemy_turn(self, player, current_time: float, log=None):
         if not self.turn:
             return False
-            
-        current_time = time.time()
         
         # Фаза 1: Показ сообщения о ходе противника (первые 1.5 секунды)
-        if current_time - self.action_time < 1.5:
-            if not hasattr(self, 'attack_chosen'):
+        if current_time - self.action_time < ENEMY_DAMAGE_AT:
+            if not self.phase & ATTACK_CHOSEN:
+                # Пока поиск думает, на экране еще итог хода игрока; кадр его не ждет
+                if not self.strategy.ready() and current_time - self.action_time < ENEMY_THINK_TIME:
+                    return True
                 self.attack = self.choose_attack()
                 attack_name = self.attack_names.get(self.attack, self.attack.upper())
                 self.action_text = f"{self.name} ИСПОЛЬЗУЕТ {attack_name}!"
                 self.speech_text = self.get_dialogue(self.attack)
                 self.update_speech_bubble(self.speech_text)
-                self.attack_chosen = True
+                self.phase |= ATTACK_CHOSEN
             return True
         
         # Фаза 2: Нанесение урона (между 1.5 и 2.5 секундами)
-        elif current_time - self.action_time < 2.5:
-            if not hasattr(self, 'damage_dealt'):
-                damage = random.randint(15, 25)
+        elif current_time - self.action_time < ENEMY_TURN_END:
+            if not self.phase & DAMAGE_DEALT:
+                damage = self.strategy.roll_damage(self.attack)
                 player.take_damage(damage)
-                self.damage_dealt = True
+                if log is not None:
+                    log.enemy_attack(self.attack, damage, player.current_hp, self.current_hp)
+                self.phase |= DAMAGE_DEALT
                 attack_name = self.attack_names.get(self.attack, self.attack.upper())
                 self.action_text = f"{attack_name} НАНЕС {damage} УРОНА!"
             return True
@@ -179,87 +218,139 @@ class Enemy(Spaceship):
         else:
             self.turn = False
             player.turn = True
-            if hasattr(self, 'attack_chosen'):
-                del self.attack_chosen
-            if hasattr(self, 'damage_dealt'):
-                del self.damage_dealt
+            self.phase = 0
             return False
 
 # Система боя
 class BattleSystem:
     @staticmethod
-    def player_action(player, enemy, action: str, weapon: str):
-        if action == "dodge":
-            if random.random() < player.actions["dodge"]["chance"]:
-                enemy.speech_text = enemy.get_dialogue("dodge")
-                enemy.update_speech_bubble(enemy.speech_text)
-                enemy.speech_time = time.time()
-                return "dodge_success", 0
-            else:
-                damage = random.randint(10, 20)
-                player.take_damage(damage)
-                enemy.speech_text = "ПОПАДАНИЕ! ПРИНИМАЙ УДАР!"
-                enemy.update_speech_bubble(enemy.speech_text)
-                enemy.speech_time = time.time()
-                return "dodge_fail", damage
-                
-        elif action == "attack":
-            if random.random() < player.weapons[weapon]["chance"]:
-                damage = player.weapons[weapon]["damage"]
-                enemy.take_damage(damage)
-                enemy.speech_text = enemy.get_dialogue("attack")
-                enemy.update_speech_bubble(enemy.speech_text)
-                enemy.speech_time = time.time()
-                return "attack_success", damage
-            else:
-                enemy.speech_text = "ПРОМАХ! ПОПРОБУЙ ЕЩЕ РАЗ!"
-                enemy.update_speech_bubble(enemy.speech_text)
-                enemy.speech_time = time.time()
-                return "attack_fail", 0
-                
-        elif action == "ignore":
-            damage = random.randint(20, 30)
+    def player_action(player, enemy, action: str, weapon: str, now: float):
+        result, damage = roll_player_action(action, weapon, player.weapons, player.actions)
+        if result == "none":
+            return result, damage
+
+        if result == "attack_success":
+            enemy.take_damage(damage)
+        elif result in PLAYER_HURT_RESULTS:
             player.take_damage(damage)
-            enemy.speech_text = enemy.get_dialogue("ignore")
-            enemy.update_speech_bubble(enemy.speech_text)
-            enemy.speech_time = time.time()
-            return "ignore", damage
-            
-        return "none", 0
+
+        if result == "dodge_fail":
+            enemy.speech_text = DODGE_FAIL_SPEECH
+        elif result == "attack_fail":
+            enemy.speech_text = ATTACK_FAIL_SPEECH
+        else:
+            enemy.speech_text = enemy.get_dialogue(action)
+        enemy.update_speech_bubble(enemy.speech_text)
+        enemy.speech_time = now
+        return result, damage
 
 # Класс игры
 class SpaceWarGame:
     def __init__(self):
+        # Только нужные подсистемы: окно с событиями и шрифты
+        ensure_subsystems("display", "font")
+        startup_timer.mark("subsystems")
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("КОСМИЧЕСКАЯ ВОЙНА v1.3")
+        startup_timer.mark("window")
+        init_fonts()
+        startup_timer.mark("fonts")
+        self.renderer = DirtyRenderer(self.screen)
         self.clock = pygame.time.Clock()
+        # Игровое время: --speed множитель, --timestep фиксированный шаг на кадр,
+        # --max-speed - фиксированный шаг без ожидания между кадрами
+        timestep = cli_option("--timestep")
+        max_speed = "--max-speed" in sys.argv
+        if timestep is None and max_speed:
+            timestep = 1 / FPS
+        self.sim_clock = SimClock(float(cli_option("--speed", 1)), None if timestep is None else float(timestep),
+                                  max_speed)
+        # Ожидание событий в простое только при реальном времени: с фиксированным шагом
+        # каждый кадр двигает игровое время, и паузы между кадрами его бы растянули
+        self.pacer = FramePacer(FPS, STATE_FPS, IDLE_FPS, ambient_fps=STARFIELD_FPS, ambient_linger=STARFIELD_LINGER,
+                                adaptive="--fixed-fps" not in sys.argv and self.sim_clock.timestep is None,
+                                verbose="--pacing-report" in sys.argv)
         self.state = "loading"
         self.loading_progress = 0
-        self.loading_start_time = time.time()
-        
-        # Создаем игрока и врагов
+        self.launch_recorded = False
+        if "--profile" in sys.argv:
+            profiler.start()
+        
+        # Время кадра: вся логика кадра читает одно значение, поэтому запись сессии
+        # воспроизводится точно
+        self.frame_time = self.sim_clock.now()
+        
+        # Звездное небо: свой генератор NumPy, игровую последовательность случайных чисел
+        # не трогает; --stars 0 выключает фон
+        star_count = int(cli_option("--stars", DEFAULT_STARS))
+        self.starfield = Starfield((SCREEN_WIDTH, SCREEN_HEIGHT), star_count) if star_count else None
+        self.renderer.background = self.starfield
+        self.star_time = self.frame_time
+        self.recorder = None
+        if "--record" in sys.argv:
+            self.recorder = SessionRecorder(f"session-{int(time.time())}.jsonl")
+            random.seed(self.recorder.seed)
+        
+        # Игрок и враги; ростер грузит загрузчик, объект Enemy создается при выборе
         self.player = None
-        self.enemies = [
-            Enemy("КОРВЕТ 'МОЛНИЯ'", 120, FastAttackStrategy(), "enemy1.png"),
-            Enemy("ЛИНКОР 'ТИТАН'", 200, HeavyAttackStrategy(), "enemy2.png")
-        ]
+        self.roster = None
+        self.enemy_page = 0
+        self.preview = None
         self.current_enemy = None
         self.selected_weapon = "laser"
+        self.odds = None
+        # hp врага, для которого ждем таблицы шансов; None - ждать нечего
+        self.odds_hp = None
         
         # Для ввода никнейма
         self.nickname = ""
         self.input_active = True
         self.nickname_rect = pygame.Rect(300, 300, 200, 40)
         
-        # Статистика
-        self.leaderboard = []
-        self.load_leaderboard()
-        
-        # Создаем ретро-стиль
-        self.create_retro_assets()
-        
-        # Инициализация UI
-        self.init_ui()
+        # Виджеты экранов строит init_ui; наведение берется из событий мыши
+        self.widgets = {}
+        self.mouse_pos = (-1, -1)
+        self.hover_state = None
+        
+        # Статистика: прокручиваемое окно таблицы лидеров строит загрузчик вместе с базой
+        self.leaderboard_store = None
+        self.stats_view = None
+        self.player_rank = None
+        self.battle_log = None
+        
+        # Снимок для продолжения боя после выхода или сбоя: пишется после каждого хода,
+        # удаляется, когда бой кончился; при запуске незаконченный бой продолжается
+        # (--no-resume - начать заново; при записи сессии снимок не читается,
+        # чтобы запись начиналась с чистой игры)
+        self.snapshots = SnapshotWriter(cli_option("--snapshot", SNAPSHOT_PATH))
+        self.snapshot_key = None
+        self.resume_snapshot = None
+        self.enemy_definition = None
+        
+        # Ассеты, враги, таблица лидеров и UI грузятся в фоне, пока крутится экран загрузки.
+        # Один рабочий поток выполняет задачи по приоритету, поэтому UI строится после врагов.
+        self.loader = BackgroundLoader()
+        self.loader.add("retro_assets", self.create_retro_assets, priority=0)
+        self.loader.add("roster", self.load_roster, priority=1, weight=2)
+        self.loader.add("leaderboard", self.load_leaderboard, priority=1)
+        self.loader.add("battle_log", self.open_battle_log, priority=1)
+        if "--no-resume" not in sys.argv and self.recorder is None:
+            self.loader.add("snapshot", self.read_snapshot, priority=1)
+        self.loader.add("speech_atlas", lambda: speech_atlas.build(font_small, speech_texts()), priority=1)
+        self.loader.add("ui", self.init_ui, priority=2)
+        self.loader.add("solver_tables", self.warm_up_solver, priority=9, required=False)
+        self.loader.start()
+    
+    def load_roster(self):
+        self.roster = EnemyRoster.load(ROSTER_PATH)
+    
+    def create_enemy(self, definition) -> Enemy:
+        return Enemy(definition.name, definition.max_hp, definition.strategy(), definition.sprite, definition.tint)
+    
+    def warm_up_solver(self):
+        # Таблицы шансов для первой страницы готовим заранее, чтобы начало боя их не ждало
+        for max_hp in sorted({definition.max_hp for definition in self.roster.page(0, ENEMY_PAGE_SIZE)}):
+            solve(max_hp)
     
     def create_retro_assets(self):
         # Ретро-фон для диалогового окна
@@ -277,143 +368,308 @@ class SpaceWarGame:
         self.button_hover.fill((0, 40, 80))
         pygame.draw.rect(self.button_hover, (0, 200, 200), (0, 0, 180, 50), 2)
         
+        # Масштабированные копии кнопок готовятся один раз, а не на каждом кадре
+        self.button_small_normal = pygame.transform.scale(self.button_normal, (120, 30))
+        self.button_small_hover = pygame.transform.scale(self.button_hover, (120, 30))
+        self.button_wide_normal = pygame.transform.scale(self.button_normal, (200, 50))
+        self.button_wide_hover = pygame.transform.scale(self.button_hover, (200, 50))
+        self.button_list_normal = pygame.transform.scale(self.button_normal, (300, 40))
+        self.button_list_hover = pygame.transform.scale(self.button_hover, (300, 40))
+        self.button_page_normal = pygame.transform.scale(self.button_normal, (60, 40))
+        self.button_page_hover = pygame.transform.scale(self.button_hover, (60, 40))
+        
         # Ретро-панель здоровья
         self.health_bar_bg = pygame.Surface((202, 22))
         self.health_bar_bg.fill((0, 0, 60))
         pygame.draw.rect(self.health_bar_bg, (0, 200, 200), (0, 0, 202, 22), 2)
     
     def load_leaderboard(self):
+        self.leaderboard_store = IndexedLeaderboard("leaderboard.db")
+        if not len(self.leaderboard_store):
+            # Первый запуск с базой: переносим старую таблицу из leaderboard.json
+            self.leaderboard_store.import_json("leaderboard.json")
+        self.stats_view = LeaderboardView(self.leaderboard_store, pygame.Rect(150, 220, 520, 300), font_medium,
+                                          CYAN, YELLOW)
+        self.refresh_stats()
+    
+    def open_battle_log(self):
+        # Журнал ходов для аналитики: --battle-log DIR, по умолчанию battle_log/
+        self.battle_log = BattleLog(cli_option("--battle-log", BATTLE_LOG_DIR))
+    
+    def read_snapshot(self):
+        # Продолжается только незаконченный бой; снимок без боя - с никнейма, как без снимка
+        snapshot = load_snapshot(self.snapshots.path)
+        if snapshot is not None and snapshot.state == "battle":
+            self.resume_snapshot = snapshot
+    
+    def resume(self, snapshot):
+        # Продолжение боя с того же места: игрок, страница меню, затем сам бой
+        self.nickname = snapshot.nickname
+        self.player = Player(snapshot.nickname)
+        self.player.wins = snapshot.wins
+        self.enemy_page = min(snapshot.enemy_page, self.roster.pages(ENEMY_PAGE_SIZE) - 1)
+        self.build_enemy_page()
+        self.state = "menu"
         try:
-            with open("leaderboard.json", "r") as f:
-                data = json.load(f)
-                if isinstance(data, list) and all(isinstance(item, dict) for item in data):
-                    self.leaderboard = data
-                else:
-                    self.leaderboard = []
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.leaderboard = []
+            definition = self.roster.find(snapshot.enemy)
+        except KeyError:
+            # Противника уже нет в ростере - остаемся в меню
+            return
+        self.start_battle(definition, snapshot.weapon)
+        self.battle_log.round = snapshot.round
+        now = self.frame_time
+        player, enemy = self.player, self.current_enemy
+        player.current_hp = snapshot.player_hp
+        player.turn = snapshot.player_turn
+        player.action_text = snapshot.player_text
+        player.action_time = now - snapshot.player_age
+        enemy.current_hp = snapshot.enemy_hp
+        enemy.turn = snapshot.enemy_turn
+        enemy.phase = snapshot.phase
+        enemy.attack = snapshot.attack
+        enemy.action_text = snapshot.enemy_text
+        enemy.action_time = now - snapshot.enemy_age
+        enemy.speech_text = snapshot.speech_text
+        enemy.speech_time = now - snapshot.speech_age
+        if enemy.speech_text:
+            enemy.update_speech_bubble(enemy.speech_text)
+        # Атака еще не выбрана - тактический поиск начинается заново
+        if enemy.turn and not enemy.phase & ATTACK_CHOSEN:
+            enemy.plan_attack(player)
+    
+    def autosave(self):
+        # Снимок - только посреди боя и только когда ход что-то изменил; кодирование в кадре,
+        # запись в фоне. Вне боя (итог боя, меню, выход из меню) снимок удаляется.
+        player, enemy = self.player, self.current_enemy
+        if player is None or self.state in ("loading", "nickname"):
+            return
+        if self.state != "battle":
+            if self.snapshot_key != ():
+                self.snapshot_key = ()
+                self.snapshots.clear()
+            return
+        key = (player.wins, self.selected_weapon, self.enemy_page,
+               player.current_hp, player.turn, enemy.current_hp, enemy.turn, enemy.phase)
+        if key != self.snapshot_key:
+            self.snapshot_key = key
+            self.snapshots.save(capture(self))
     
     def save_leaderboard(self):
-        with open("leaderboard.json", "w") as f:
-            json.dump(self.leaderboard, f)
+        self.leaderboard_store.flush()
     
     def add_to_leaderboard(self, nickname: str, wins: int):
-        existing = next((item for item in self.leaderboard if item["nickname"] == nickname), None)
-        if existing:
-            if wins > existing["wins"]:
-                existing["wins"] = wins
-        else:
-            self.leaderboard.append({"nickname": nickname, "wins": wins})
-        
-        self.leaderboard.sort(key=lambda x: x["wins"], reverse=True)
-        self.leaderboard = self.leaderboard[:10]
-        self.save_leaderboard()
+        self.leaderboard_store.record(nickname, wins)
+        self.refresh_stats()
+    
+    def refresh_stats(self):
+        # Место игрока - по индексу; окна таблицы перечитываются, когда до них дойдет экран
+        self.player_rank = self.leaderboard_store.rank_of(self.player.name) if self.player else None
+        self.stats_view.invalidate(self.player.name if self.player else None)
     
     def init_ui(self):
-        # Кнопки действий игрока
+        # У каждого экрана свой слой виджетов с сеткой для попадания мыши
+        widgets = {state: WidgetLayer((SCREEN_WIDTH, SCREEN_HEIGHT)) for state in ("menu", "battle", "stats", "game_over")}
+        menu, battle = widgets["menu"], widgets["battle"]
+        
+        # Кнопки действий игрока; нажимаются только во время хода игрока
         self.action_buttons = [
-            {"rect": pygame.Rect(100, 500, 180, 50), "action": "dodge", "text": "УВОРОТ"},
-            {"rect": pygame.Rect(310, 500, 180, 50), "action": "attack", "text": "ПРЯМОЙ УДАР"},
-            {"rect": pygame.Rect(520, 500, 180, 50), "action": "ignore", "text": "ИГНОРИРОВАТЬ"}
+            battle.add(("action", i), pygame.Rect(100 + i * 210, 500, 180, 50), text,
+                       lambda action=action: self.play_round(action), lambda: self.player.turn, action=action)
+            for i, (action, text) in enumerate([("dodge", "УВОРОТ"), ("attack", "ПРЯМОЙ УДАР"), ("ignore", "ИГНОРИРОВАТЬ")])
         ]
         
         # Кнопки выбора оружия
         self.weapon_buttons = [
-            {"rect": pygame.Rect(650, 150, 120, 40), "weapon": "laser", "text": "ЛАЗЕР (35)"},
-            {"rect": pygame.Rect(650, 200, 120, 40), "weapon": "ion", "text": "ИОН (25)"},
-            {"rect": pygame.Rect(650, 250, 120, 40), "weapon": "shield", "text": "ЩИТ (15)"}
+            battle.add(("weapon", i), pygame.Rect(650, 150 + i * 50, 120, 40), text,
+                       lambda weapon=weapon: self.select_weapon(weapon), weapon=weapon)
+            for i, (weapon, text) in enumerate([("laser", "ЛАЗЕР (35)"), ("ion", "ИОН (25)"), ("shield", "ЩИТ (15)")])
         ]
         
-        # Кнопка выбора противника
+        # Кнопки противников: постоянные ячейки, при листании меняется только их содержимое
         self.enemy_buttons = [
-            {"rect": pygame.Rect(200, 300, 180, 50), "enemy": self.enemies[0], "text": "КОРВЕТ 'МОЛНИЯ'"},
-            {"rect": pygame.Rect(450, 300, 180, 50), "enemy": self.enemies[1], "text": "ЛИНКОР 'ТИТАН'"}
+            menu.add(("enemy", i), pygame.Rect(60, 120 + i * 55, 300, 40), "",
+                     lambda i=i: self.start_battle(self.enemy_buttons[i].data["enemy"]), enemy=None)
+            for i in range(ENEMY_PAGE_SIZE)
         ]
+        self.page_prev_button = menu.add("page_prev", pygame.Rect(60, 470, 60, 40), "<", lambda: self.turn_page(-1))
+        self.page_next_button = menu.add("page_next", pygame.Rect(300, 470, 60, 40), ">", lambda: self.turn_page(1))
         
         # Кнопка для статистики
-        self.stats_button = {"rect": pygame.Rect(650, 20, 120, 30), "text": "СТАТИСТИКА"}
+        self.stats_button = menu.add("stats", pygame.Rect(650, 20, 120, 30), "СТАТИСТИКА", self.open_stats)
         
-        # Кнопка возврата в меню
-        self.back_button = {"rect": pygame.Rect(50, 20, 120, 30), "text": "В МЕНЮ"}
+        # Кнопки возврата в меню из боя и статистики
+        self.back_buttons = {
+            state: widgets[state].add("back", pygame.Rect(50, 20, 120, 30), "В МЕНЮ", lambda: self.set_state("menu"))
+            for state in ("battle", "stats")
+        }
         
         # Кнопка в game_over
-        self.menu_button = {"rect": pygame.Rect(300, 350, 200, 50), "text": "В ГЛАВНОЕ МЕНЮ"}
+        self.menu_button = widgets["game_over"].add("menu", pygame.Rect(300, 350, 200, 50), "В ГЛАВНОЕ МЕНЮ",
+                                                    lambda: self.set_state("menu"))
+        self.widgets = widgets
+        self.build_enemy_page()
+    
+    def build_enemy_page(self):
+        # Ячейкам достается видимая страница; объекты Enemy здесь не создаются
+        page = self.roster.page(self.enemy_page, ENEMY_PAGE_SIZE)
+        for i, widget in enumerate(self.enemy_buttons):
+            definition = page[i] if i < len(page) else None
+            widget.data["enemy"] = definition
+            widget.text = definition.name if definition else ""
+            widget.enabled = definition is not None
+        self.preview = page[0] if page else None
+        if self.state == "menu":
+            self.update_hover(self.mouse_pos)
+    
+    def turn_page(self, step: int):
+        self.enemy_page = (self.enemy_page + step) % self.roster.pages(ENEMY_PAGE_SIZE)
+        self.build_enemy_page()
+    
+    def select_weapon(self, weapon: str):
+        self.selected_weapon = weapon
+    
+    def set_state(self, state: str):
+        self.state = state
+    
+    def open_stats(self):
+        self.refresh_stats()
+        self.stats_view.open(self.player.name if self.player else None)
+        self.state = "stats"
+    
+    def start_battle(self, definition, weapon="laser"):
+        self.current_enemy = self.create_enemy(definition)
+        self.enemy_definition = definition
+        if self.player is None:
+            self.player = Player("ИГРОК")
+        self.player.reset()
+        self.player.turn = True
+        self.selected_weapon = weapon
+        # Таблицы считает поток решателя; бой начинается сразу, шанс появится, когда они будут готовы
+        self.odds = None
+        self.odds_hp = self.current_enemy.max_hp
+        self.battle_log.begin()
+        self.state = "battle"
     
     def run(self):
         running = True
         while running:
-            self.clock.tick(FPS)
+            events = self.pacer.next_frame(self.clock, self.state, self.is_animating(), not self.sim_clock.max_speed,
+                                           self.starfield is not None)
+            profiler.begin_frame()
+            self.frame_time = self.sim_clock.tick()
+            if self.recorder:
+                self.recorder.record_frame(self.frame_time, events, logic_signature(self))
             
             # Обработка событий
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_click(event.pos)
-                elif event.type == pygame.KEYDOWN and self.state == "nickname":
-                    if event.key == pygame.K_RETURN and self.nickname:
-                        self.player = Player(self.nickname)
-                        self.state = "menu"
-                    elif event.key == pygame.K_BACKSPACE:
-                        self.nickname = self.nickname[:-1]
-                    elif len(self.nickname) < 15 and event.unicode.isprintable():
-                        self.nickname += event.unicode
+            with profiler.section("events"):
+                running = self.handle_events(events)
             
             # Обновление состояния игры
-            self.update()
+            with profiler.section("update"):
+                self.update()
             
-            # Отрисовка
-            self.draw()
-            
-            pygame.display.flip()
-        
+            # Отрисовка: на экран уходят только изменившиеся прямоугольники
+            with profiler.section("draw"):
+                self.draw()
+            with profiler.section("present"):
+                self.present()
+            profiler.end_frame()
+        
+        if "--profile" in sys.argv:
+            profiler.export_chrome_trace(f"trace-{int(time.time())}.json")
+        if self.recorder:
+            self.recorder.close(logic_signature(self))
+        if "--pacing-report" in sys.argv:
+            print(self.pacer.report())
+        if self.leaderboard_store:
+            self.leaderboard_store.close()
+        if self.battle_log:
+            self.battle_log.close()
+        # Выход посреди хода: снимок с точными временами фаз, продолжение - с того же места;
+        # выход вне боя снимок удаляет
+        self.snapshot_key = None
+        self.autosave()
+        self.snapshots.flush()
         pygame.quit()
         sys.exit()
     
+    def is_animating(self) -> bool:
+        # Меняется ли что-то на экране без участия игрока
+        if self.state == "loading" or profiler.overlay or self.renderer.debug:
+            return True
+        if self.state == "stats":
+            return self.stats_view.scrolling or self.stats_view.pending
+        if self.state == "battle":
+            enemy = self.current_enemy
+            now = self.sim_clock.now()
+            return (enemy.turn or self.odds_hp is not None or now - enemy.speech_time < 3 or now - self.player.action_time < 2
+                    or now - enemy.action_time < 2)
+        return False
+    
+    def handle_events(self, events=None):
+        running = True
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.renderer.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                # Отладка: обвести прямоугольники, отправленные на экран
+                self.renderer.debug = not self.renderer.debug
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                # Оверлей профайлера: время кадра, p50/p99, число вызовов
+                profiler.toggle_overlay()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler.enabled:
+                profiler.export_chrome_trace(f"trace-{int(time.time())}.json")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F6:
+                # Перемотка: следующая скорость игрового времени по кругу
+                speeds = WARP_SPEEDS if self.sim_clock.speed in WARP_SPEEDS else (self.sim_clock.speed,) + WARP_SPEEDS
+                self.sim_clock.set_speed(speeds[(speeds.index(self.sim_clock.speed) + 1) % len(speeds)])
+            elif event.type == pygame.MOUSEMOTION:
+                self.update_hover(event.pos)
+            elif event.type == pygame.MOUSEWHEEL and self.state == "stats":
+                self.stats_view.scroll(-event.y * WHEEL_ROWS)
+            elif event.type == pygame.KEYDOWN and self.state == "stats" and event.key in STATS_KEYS:
+                STATS_KEYS[event.key](self.stats_view)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                # Клик без предшествующего движения (сенсорный экран) тоже обновляет наведение
+                self.update_hover(event.pos)
+                self.handle_click(event.pos)
+            elif event.type == pygame.KEYDOWN and self.state == "menu" and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                self.turn_page(-1 if event.key == pygame.K_LEFT else 1)
+            elif event.type == pygame.KEYDOWN and self.state == "nickname":
+                if event.key == pygame.K_RETURN and self.nickname:
+                    self.player = Player(self.nickname)
+                    self.state = "menu"
+                elif event.key == pygame.K_BACKSPACE:
+                    self.nickname = self.nickname[:-1]
+                elif len(self.nickname) < 15 and event.unicode.isprintable():
+                    self.nickname += event.unicode
+        return running
+    
     def handle_click(self, pos):
-        if self.state == "menu":
-            for button in self.enemy_buttons:
-                if button["rect"].collidepoint(pos):
-                    self.current_enemy = button["enemy"]
-                    self.current_enemy.reset()
-                    if self.player is None:
-                        self.player = Player("ИГРОК")
-                    self.player.reset()
-                    self.player.turn = True
-                    self.selected_weapon = "laser"
-                    self.state = "battle"
-                    return
-            
-            if self.stats_button["rect"].collidepoint(pos):
-                self.state = "stats"
-        
-        elif self.state == "battle":
-            # Обработка выбора оружия
-            for button in self.weapon_buttons:
-                if button["rect"].collidepoint(pos):
-                    self.selected_weapon = button["weapon"]
-                    return
-            
-            # Обработка действий игрока
-            if self.player.turn:
-                for button in self.action_buttons:
-                    if button["rect"].collidepoint(pos):
-                        self.play_round(button["action"])
-                        return
-            
-            if self.back_button["rect"].collidepoint(pos):
-                self.state = "menu"
-        
-        elif self.state == "stats":
-            if self.back_button["rect"].collidepoint(pos):
-                self.state = "menu"
-        
-        elif self.state == "game_over":
-            if self.menu_button["rect"].collidepoint(pos):
-                self.state = "menu"
+        layer = self.widgets.get(self.state)
+        if layer is not None:
+            layer.click(pos)
+    
+    def update_hover(self, pos):
+        self.mouse_pos = pos
+        layer = self.widgets.get(self.state)
+        if layer is None:
+            return
+        layer.mouse_move(pos)
+        # В меню наведенный противник показывается в предпросмотре
+        hovered = layer.hovered
+        if self.state == "menu" and hovered is not None and hovered.data.get("enemy") is not None:
+            self.preview = hovered.data["enemy"]
     
     def play_round(self, player_action: str):
-        result, damage = BattleSystem.player_action(self.player, self.current_enemy, player_action, self.selected_weapon)
+        result, damage = BattleSystem.player_action(self.player, self.current_enemy, player_action, self.selected_weapon,
+                                                   self.frame_time)
+        self.battle_log.player_round(player_action, self.selected_weapon, result, damage,
+                                     self.player.current_hp, self.current_enemy.current_hp)
         
         # Устанавливаем текст действия
         if result == "dodge_success":
@@ -428,321 +684,360 @@ class SpaceWarGame:
             action_text = f"ПРОТИВНИК АТАКУЕТ! -{damage} HP"
         
         self.player.action_text = action_text
-        self.player.action_time = time.time()
+        self.player.action_time = self.frame_time
         
         # Меняем ход
         self.player.turn = False
         self.current_enemy.turn = True
-        self.current_enemy.action_time = time.time()
+        self.current_enemy.action_time = self.frame_time
         
         # Проверка конца игры
         if not self.player.is_alive():
-            self.state = "game_over"
-            self.current_enemy.speech_text = f"ПОБЕДА ЗА {self.current_enemy.name}!"
-            self.current_enemy.update_speech_bubble(self.current_enemy.speech_text)
-            self.current_enemy.speech_time = time.time()
+            self.end_battle()
         elif not self.current_enemy.is_alive():
             self.player.wins += 1
-            self.state = "game_over"
-            self.current_enemy.speech_text = f"ПОБЕДА ЗА {self.player.name}!"
-            self.current_enemy.update_speech_bubble(self.current_enemy.speech_text)
-            self.current_enemy.speech_time = time.time()
+            self.add_to_leaderboard(self.player.name, self.player.wins)
+            self.end_battle()
+        else:
+            self.current_enemy.plan_attack(self.player)
+    
+    def end_battle(self):
+        won = self.player.is_alive()
+        self.battle_log.end(won, self.player.current_hp, self.current_enemy.current_hp)
+        self.state = "game_over"
+        self.current_enemy.speech_text = f"ПОБЕДА ЗА {self.player.name if won else self.current_enemy.name}!"
+        self.current_enemy.update_speech_bubble(self.current_enemy.speech_text)
+        self.current_enemy.speech_time = self.frame_time
     
     def update(self):
+        # Смена экрана: наведение на новом экране считается по последней позиции мыши
+        if self.state != self.hover_state:
+            self.hover_state = self.state
+            self.update_hover(self.mouse_pos)
+        
         if self.state == "loading":
-            if time.time() - self.loading_start_time > 3:
+            self.loading_progress = self.loader.progress
+            if self.loader.ready():
+                startup_timer.mark("loading")
                 self.state = "nickname"
+                if self.resume_snapshot is not None:
+                    self.resume(self.resume_snapshot)
+        
+        elif self.state == "stats":
+            self.stats_view.update(self.frame_time)
         
         elif self.state == "battle":
+            # Таблицы шансов пришли из потока решателя
+            if self.odds_hp is not None:
+                self.odds = solve_worker.request(self.odds_hp)
+                if self.odds is not None:
+                    self.odds_hp = None
             # Обработка хода противника
             if self.current_enemy.turn:
-                if not self.current_enemy.perform_enemy_turn(self.player):
+                if not self.current_enemy.perform_enemy_turn(self.player, self.frame_time, self.battle_log):
                     # Если действие врага завершено, проверяем конец игры
                     if not self.player.is_alive():
-                        self.state = "game_over"
-                        self.current_enemy.speech_text = f"ПОБЕДА ЗА {self.current_enemy.name}!"
-                        self.current_enemy.update_speech_bubble(self.current_enemy.speech_text)
-                        self.current_enemy.speech_time = time.time()
+                        self.end_battle()
+        
+        self.autosave()
     
     def draw(self):
-        self.screen.fill(BLACK)
+        # Статический слой текущего экрана собирается один раз, дальше - только регионы
+        if self.state == "battle":
+            self.renderer.begin(("battle", self.current_enemy.name), self.draw_battle_layer)
+        elif self.state == "game_over":
+            self.renderer.begin(("game_over", self.player.is_alive()), self.draw_game_over_layer)
+        else:
+            self.renderer.begin(self.state, getattr(self, f"draw_{self.state}_layer"))
         
-        # Ретро-звездный фон
-        for _ in range(5):
-            pygame.draw.circle(self.screen, WHITE, 
-                             (random.randint(0, SCREEN_WIDTH), random.randint(0, SCREEN_HEIGHT)), 
-                             1)
+        # Звездный фон с параллаксом движется по игровому времени; в долгом простое стоит
+        if self.starfield and not self.pacer.frozen:
+            self.starfield.update(self.frame_time - self.star_time)
+        self.star_time = self.frame_time
         
         if self.state == "loading":
-            self.draw_loading_screen()
+            draw_state = self.draw_loading_screen
         elif self.state == "nickname":
-            self.draw_nickname_input()
+            draw_state = self.draw_nickname_input
         elif self.state == "menu":
-            self.draw_menu()
+            draw_state = self.draw_menu
         elif self.state == "battle":
-            self.draw_battle()
+            draw_state = self.draw_battle
         elif self.state == "stats":
-            self.draw_stats()
+            draw_state = self.draw_stats
         elif self.state == "game_over":
-            self.draw_game_over()
+            draw_state = self.draw_game_over
+        # Сами регионы рисуются позже, в renderer.present(); их время записывается
+        # по имени draw_*, который их зарегистрировал
+        self.renderer.owner = draw_state.__name__
+        draw_state()
+        self.renderer.owner = None
+        
+        # Индикатор перемотки времени
+        if self.sim_clock.speed != 1:
+            text = f"ВРЕМЯ x{self.sim_clock.speed:g}"
+            self.add_text("warp", render_text(font_small, text, True, ORANGE), (SCREEN_WIDTH - 130, SCREEN_HEIGHT - 25), text)
+        
+        # Оверлей профайлера - самый верхний регион
+        if profiler.overlay:
+            overlay = profiler.overlay_surface(font_small)
+            pos = (5, SCREEN_HEIGHT - overlay.get_height() - 5)
+            self.renderer.add("profiler", overlay.get_rect(topleft=pos), profiler.overlay_signature(),
+                              lambda: self.screen.blit(overlay, pos))
+    
+    def present(self):
+        self.renderer.present()
+        startup_timer.mark("first_frame")
+        if not self.launch_recorded and self.state != "loading":
+            self.finish_startup()
+    
+    def finish_startup(self):
+        # Первый кадр, на котором можно играть: фиксируем время до интерактивности
+        startup_timer.mark("interactive_frame")
+        self.launch_recorded = True
+        record_launch("launch_times.jsonl", time.perf_counter() - LAUNCH_TIME,
+                      self.loader.timings(), startup_timer.phases())
+        if "--startup-report" in sys.argv:
+            print(startup_timer.report())
+    
+    def blit_centered(self, surface, text_surface, y):
+        surface.blit(text_surface, (SCREEN_WIDTH//2 - text_surface.get_width()//2, y))
+    
+    def add_text(self, region_id, text_surface, pos, signature):
+        rect = text_surface.get_rect(topleft=pos)
+        self.renderer.add(region_id, rect, signature, lambda: self.screen.blit(text_surface, pos))
+    
+    def draw_button(self, rect, text, font, hovered, normal, hover):
+        self.screen.blit(hover if hovered else normal, rect.topleft)
+        text_surface = render_text(font, text, True, CYAN)
+        self.screen.blit(text_surface, (
+            rect.x + rect.width//2 - text_surface.get_width()//2,
+            rect.y + rect.height//2 - text_surface.get_height()//2
+        ))
+    
+    def add_button(self, widget, font, normal, hover):
+        # Кнопка перерисовывается, только если сменились ее текст или наведение
+        rect, text, hovered = widget.rect, widget.text, widget.hovered
+        self.renderer.add(widget.id, rect, (text, hovered),
+                          lambda: self.draw_button(rect, text, font, hovered, normal, hover))
+    
+    def draw_loading_layer(self, surface):
+        surface.fill(BLACK)
+        self.blit_centered(surface, render_text(font_large, "КОСМИЧЕСКАЯ ВОЙНА", True, CYAN), 200)
     
     def draw_loading_screen(self):
-        progress = min(1.0, (time.time() - self.loading_start_time) / 3)
-        
-        # Текст
-        title = font_large.render("КОСМИЧЕСКАЯ ВОЙНА", True, CYAN)
-        self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 200))
+        progress = self.loading_progress
         
         # Ретро-прогресс бар
-        pygame.draw.rect(self.screen, (0, 0, 60), (200, 300, 400, 20))
-        pygame.draw.rect(self.screen, (0, 200, 200), (200, 300, 400 * progress, 20))
-        pygame.draw.rect(self.screen, CYAN, (200, 300, 400, 20), 2)
+        def draw_bar():
+            pygame.draw.rect(self.screen, (0, 0, 60), (200, 300, 400, 20))
+            pygame.draw.rect(self.screen, (0, 200, 200), (200, 300, 400 * progress, 20))
+            pygame.draw.rect(self.screen, CYAN, (200, 300, 400, 20), 2)
+        self.renderer.add("progress", (200, 300, 400, 20), int(400 * progress), draw_bar)
         
         # Текст загрузки
-        loading_text = font_medium.render(f"ЗАГРУЗКА... {int(progress * 100)}%", True, CYAN)
-        self.screen.blit(loading_text, (SCREEN_WIDTH//2 - loading_text.get_width()//2, 330))
+        text = f"ЗАГРУЗКА... {int(progress * 100)}%"
+        loading_text = render_text(font_medium, text, True, CYAN)
+        self.add_text("loading_text", loading_text, (SCREEN_WIDTH//2 - loading_text.get_width()//2, 330), text)
     
-    def draw_nickname_input(self):
-        # Текст
-        title = font_large.render("ВВЕДИТЕ ВАШ НИКНЕЙМ", True, CYAN)
-        self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 200))
+    def draw_nickname_layer(self, surface):
+        surface.fill(BLACK)
+        self.blit_centered(surface, render_text(font_large, "ВВЕДИТЕ ВАШ НИКНЕЙМ", True, CYAN), 200)
         
         # Ретро-поле ввода
-        pygame.draw.rect(self.screen, (0, 0, 60), self.nickname_rect)
-        pygame.draw.rect(self.screen, CYAN, self.nickname_rect, 2)
+        pygame.draw.rect(surface, (0, 0, 60), self.nickname_rect)
+        pygame.draw.rect(surface, CYAN, self.nickname_rect, 2)
         
+        # Подсказка
+        self.blit_centered(surface, render_text(font_small, "НАЖМИТЕ ENTER ДЛЯ ПОДТВЕРЖДЕНИЯ", True, CYAN), 360)
+    
+    def draw_nickname_input(self):
         # Текст в поле ввода
         if self.nickname:
-            nickname_text = font_medium.render(self.nickname, True, CYAN)
+            nickname_text = render_text(font_medium, self.nickname, True, CYAN)
         else:
-            nickname_text = font_medium.render("ВВЕДИТЕ НИК", True, (100, 100, 180))
+            nickname_text = render_text(font_medium, "ВВЕДИТЕ НИК", True, (100, 100, 180))
         
-        self.screen.blit(nickname_text, (self.nickname_rect.x + 10, self.nickname_rect.y + 10))
+        self.add_text("nickname", nickname_text, (self.nickname_rect.x + 10, self.nickname_rect.y + 10), self.nickname)
+    
+    def draw_menu_layer(self, surface):
+        surface.fill(BLACK)
+        self.blit_centered(surface, render_text(font_large, "ВЫБЕРИТЕ ПРОТИВНИКА", True, CYAN), 60)
         
-        # Подсказка
-        hint = font_small.render("НАЖМИТЕ ENTER ДЛЯ ПОДТВЕРЖДЕНИЯ", True, CYAN)
-        self.screen.blit(hint, (SCREEN_WIDTH//2 - hint.get_width()//2, 360))
+        # Панель предпросмотра противника
+        pygame.draw.rect(surface, (0, 0, 60), (440, 110, 320, 360))
+        pygame.draw.rect(surface, CYAN, (440, 110, 320, 360), 2)
     
     def draw_menu(self):
-        # Текст
-        title = font_large.render("ВЫБЕРИТЕ ПРОТИВНИКА", True, CYAN)
-        self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 150))
-        
-        # Кнопки выбора противника
-        for button in self.enemy_buttons:
-            mouse_pos = pygame.mouse.get_pos()
-            if button["rect"].collidepoint(mouse_pos):
-                self.screen.blit(self.button_hover, button["rect"].topleft)
-            else:
-                self.screen.blit(self.button_normal, button["rect"].topleft)
-            
-            text = font_small.render(button["text"], True, CYAN)
-            self.screen.blit(text, (
-                button["rect"].x + button["rect"].width//2 - text.get_width()//2,
-                button["rect"].y + button["rect"].height//2 - text.get_height()//2
-            ))
+        # Кнопки противников текущей страницы; наведенный показывается в предпросмотре
+        for widget in self.enemy_buttons:
+            if widget.enabled:
+                self.add_button(widget, font_small, self.button_list_normal, self.button_list_hover)
+        
+        # Листание ростера
+        self.add_button(self.page_prev_button, font_medium, self.button_page_normal, self.button_page_hover)
+        self.add_button(self.page_next_button, font_medium, self.button_page_normal, self.button_page_hover)
+        text = f"{self.enemy_page + 1}/{self.roster.pages(ENEMY_PAGE_SIZE)}"
+        page_text = render_text(font_medium, text, True, CYAN)
+        self.add_text("page", page_text, (210 - page_text.get_width()//2, 478), text)
+        
+        # Предпросмотр: спрайт грузится только сейчас и живет в LRU кэша ассетов
+        definition = self.preview
+        if definition is not None:
+            self.renderer.add("preview", (442, 112, 316, 356), definition.key,
+                              lambda: self.draw_preview(definition))
         
         # Кнопка статистики
-        mouse_pos = pygame.mouse.get_pos()
-        if self.stats_button["rect"].collidepoint(mouse_pos):
-            self.screen.blit(pygame.transform.scale(self.button_hover, (120, 30)), self.stats_button["rect"].topleft)
+        self.add_button(self.stats_button, font_small, self.button_small_normal, self.button_small_hover)
+    
+    def draw_preview(self, definition):
+        self.screen.blit(assets.sprite(definition.sprite, (250, 250), definition.tint), (475, 120))
+        info = render_text(font_small, f"HP {definition.max_hp}", True, CYAN)
+        self.screen.blit(info, (600 - info.get_width()//2, 385))
+        if definition.tactical:
+            info = render_text(font_small, "ТАКТИЧЕСКИЙ ИИ", True, ORANGE)
         else:
-            self.screen.blit(pygame.transform.scale(self.button_normal, (120, 30)), self.stats_button["rect"].topleft)
-        
-        text = font_small.render(self.stats_button["text"], True, CYAN)
-        self.screen.blit(text, (
-            self.stats_button["rect"].x + self.stats_button["rect"].width//2 - text.get_width()//2,
-            self.stats_button["rect"].y + self.stats_button["rect"].height//2 - text.get_height()//2
-        ))
+            attacks = "/".join(f"{weight * 100:.0f}" for weight in definition.weights)
+            info = render_text(font_small, f"АТАКИ {attacks}%", True, CYAN)
+        self.screen.blit(info, (600 - info.get_width()//2, 415))
     
-    def draw_battle(self):
+    def draw_battle_layer(self, surface):
+        surface.fill(BLACK)
+        
         # Информация о противнике
-        enemy_info = font_medium.render(f"ПРОТИВНИК: {self.current_enemy.name}", True, CYAN)
-        self.screen.blit(enemy_info, (50, 50))
+        enemy_info = render_text(font_medium, f"ПРОТИВНИК: {self.current_enemy.name}", True, CYAN)
+        surface.blit(enemy_info, (50, 50))
         
         # Изображение противника
-        self.screen.blit(self.current_enemy.image, (SCREEN_WIDTH//2 - 125, 80))
+        surface.blit(self.current_enemy.image, (SCREEN_WIDTH//2 - 125, 80))
+        
+        # Диалоговое окно
+        surface.blit(self.dialog_bg, (50, 350))
+        pygame.draw.rect(surface, CYAN, (50, 350, 700, 120), 2)
+        
+        # Панель выбора оружия
+        pygame.draw.rect(surface, (0, 0, 60), (640, 140, 140, 170))
+        pygame.draw.rect(surface, CYAN, (640, 140, 140, 170), 2)
+        surface.blit(render_text(font_medium, "ОРУЖИЕ:", True, CYAN), (650, 110))
+    
+    def draw_battle(self):
+        enemy = self.current_enemy
         
         # Облачко реплики врага (если есть и не старше 3 секунд)
-        if self.current_enemy.speech_text and time.time() - self.current_enemy.speech_time < 3:
-            self.screen.blit(self.current_enemy.speech_bubble, (SCREEN_WIDTH//2 - 150, 30))
+        if enemy.speech_text and self.frame_time - enemy.speech_time < 3:
+            self.renderer.add("speech", (SCREEN_WIDTH//2 - 150, 30, 300, 100), enemy.speech_text,
+                              lambda: self.screen.blit(enemy.speech_bubble, (SCREEN_WIDTH//2 - 150, 30)))
         
         # Полоски HP
-        self.draw_health_bar(50, 80, 200, 20, self.player.current_hp / self.player.max_hp, GREEN)
-        self.draw_health_bar(550, 80, 200, 20, self.current_enemy.current_hp / self.current_enemy.max_hp, RED)
-        
-        # Диалоговое окно
-        self.screen.blit(self.dialog_bg, (50, 350))
-        pygame.draw.rect(self.screen, CYAN, (50, 350, 700, 120), 2)
+        player_ratio = self.player.current_hp / self.player.max_hp
+        enemy_ratio = enemy.current_hp / enemy.max_hp
+        self.renderer.add("player_hp", (49, 79, 202, 22), player_ratio,
+                          lambda: self.draw_health_bar(50, 80, 200, 20, player_ratio, GREEN))
+        self.renderer.add("enemy_hp", (549, 79, 202, 22), enemy_ratio,
+                          lambda: self.draw_health_bar(550, 80, 200, 20, enemy_ratio, RED))
+        
+        # Точный шанс победы из таблиц решателя
+        if self.odds and self.player.turn:
+            chance = self.odds.win_probability(self.player.current_hp, enemy.current_hp)
+            text = f"ШАНС ПОБЕДЫ: {chance * 100:.0f}%"
+            self.add_text("odds", render_text(font_small, text, True, CYAN), (50, 110), text)
         
         # Текст действия (игрока или врага)
-        if self.player.action_text and time.time() - self.player.action_time < 2:
-            action_text = font_medium.render(self.player.action_text, True, YELLOW)
-            self.screen.blit(action_text, (60, 380))
-        elif self.current_enemy.action_text and time.time() - self.current_enemy.action_time < 2:
-            action_text = font_medium.render(self.current_enemy.action_text, True, YELLOW)
-            self.screen.blit(action_text, (60, 380))
+        if self.player.action_text and self.frame_time - self.player.action_time < 2:
+            text = self.player.action_text
+        elif enemy.action_text and self.frame_time - enemy.action_time < 2:
+            text = enemy.action_text
         elif not self.player.turn:
-            wait_text = font_medium.render("ХОД ПРОТИВНИКА...", True, YELLOW)
-            self.screen.blit(wait_text, (60, 380))
+            text = "ХОД ПРОТИВНИКА..."
+        else:
+            text = None
+        if text:
+            self.add_text("action_text", render_text(font_medium, text, True, YELLOW), (60, 380), text)
         
         # Индикатор чей ход
-        turn_text = font_medium.render("ВАШ ХОД" if self.player.turn else "ХОД ПРОТИВНИКА", True, YELLOW)
-        self.screen.blit(turn_text, (SCREEN_WIDTH//2 - turn_text.get_width()//2, 320))
+        text = "ВАШ ХОД" if self.player.turn else "ХОД ПРОТИВНИКА"
+        turn_text = render_text(font_medium, text, True, YELLOW)
+        self.add_text("turn", turn_text, (SCREEN_WIDTH//2 - turn_text.get_width()//2, 320), text)
         
         # Кнопки действий (только во время хода игрока)
         if self.player.turn:
-            for button in self.action_buttons:
-                mouse_pos = pygame.mouse.get_pos()
-                if button["rect"].collidepoint(mouse_pos):
-                    self.screen.blit(self.button_hover, button["rect"].topleft)
-                else:
-                    self.screen.blit(self.button_normal, button["rect"].topleft)
-                
-                text = font_small.render(button["text"], True, CYAN)
-                self.screen.blit(text, (
-                    button["rect"].x + button["rect"].width//2 - text.get_width()//2,
-                    button["rect"].y + button["rect"].height//2 - text.get_height()//2
-                ))
+            for widget in self.action_buttons:
+                self.add_button(widget, font_small, self.button_normal, self.button_hover)
         
-        # Панель выбора оружия
-        pygame.draw.rect(self.screen, (0, 0, 60), (640, 140, 140, 170))
-        pygame.draw.rect(self.screen, CYAN, (640, 140, 140, 170), 2)
-        weapon_title = font_medium.render("ОРУЖИЕ:", True, CYAN)
-        self.screen.blit(weapon_title, (650, 110))
-        
-        for button in self.weapon_buttons:
-            color = YELLOW if self.selected_weapon == button["weapon"] else CYAN
-            mouse_pos = pygame.mouse.get_pos()
-            if button["rect"].collidepoint(mouse_pos):
-                pygame.draw.rect(self.screen, (0, 40, 80), button["rect"])
-            else:
-                pygame.draw.rect(self.screen, (0, 0, 60), button["rect"])
-            pygame.draw.rect(self.screen, color, button["rect"], 2)
-            
-            text = font_small.render(button["text"], True, color)
-            self.screen.blit(text, (
-                button["rect"].x + button["rect"].width//2 - text.get_width()//2,
-                button["rect"].y + button["rect"].height//2 - text.get_height()//2
-            ))
+        # Кнопки выбора оружия
+        for widget in self.weapon_buttons:
+            selected = self.selected_weapon == widget.data["weapon"]
+            self.renderer.add(widget.id, widget.rect, (selected, widget.hovered),
+                              lambda widget=widget, selected=selected, hovered=widget.hovered:
+                                  self.draw_weapon_button(widget, selected, hovered))
         
         # Кнопка возврата
-        mouse_pos = pygame.mouse.get_pos()
-        if self.back_button["rect"].collidepoint(mouse_pos):
-            self.screen.blit(pygame.transform.scale(self.button_hover, (120, 30)), self.back_button["rect"].topleft)
-        else:
-            self.screen.blit(pygame.transform.scale(self.button_normal, (120, 30)), self.back_button["rect"].topleft)
+        self.add_button(self.back_buttons[self.state], font_small, self.button_small_normal, self.button_small_hover)
+    
+    def draw_weapon_button(self, widget, selected, hovered):
+        color = YELLOW if selected else CYAN
+        pygame.draw.rect(self.screen, (0, 40, 80) if hovered else (0, 0, 60), widget.rect)
+        pygame.draw.rect(self.screen, color, widget.rect, 2)
         
-        text = font_small.render(self.back_button["text"], True, CYAN)
+        text = render_text(font_small, widget.text, True, color)
         self.screen.blit(text, (
-            self.back_button["rect"].x + self.back_button["rect"].width//2 - text.get_width()//2,
-            self.back_button["rect"].y + self.back_button["rect"].height//2 - text.get_height()//2
+            widget.rect.x + widget.rect.width//2 - text.get_width()//2,
+            widget.rect.y + widget.rect.height//2 - text.get_height()//2
         ))
     
-    def draw_stats(self):
-        # Заголовок
-        title = font_large.render("ТАБЛИЦА ЛИДЕРОВ", True, CYAN)
-        self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 50))
+    def draw_stats_layer(self, surface):
+        surface.fill(BLACK)
+        self.blit_centered(surface, render_text(font_large, "ТАБЛИЦА ЛИДЕРОВ", True, CYAN), 50)
         
+        # Заголовки таблицы
+        for i, header in enumerate(["МЕСТО", "ИГРОК", "ПОБЕД"]):
+            surface.blit(render_text(font_medium, header, True, YELLOW), (150 + i * 200, 180))
+        self.blit_centered(surface, render_text(font_small, "КОЛЕСО МЫШИ, СТРЕЛКИ, PGUP/PGDN, HOME/END", True, CYAN), 540)
+    
+    def draw_stats(self):
         # Статистика игрока
         if self.player:
-            player_stats = font_medium.render(f"ИГРОК: {self.player.name} | ПОБЕД: {self.player.wins}", True, CYAN)
-            self.screen.blit(player_stats, (SCREEN_WIDTH//2 - player_stats.get_width()//2, 120))
-        
-        # Таблица лидеров
-        headers = ["МЕСТО", "ИГРОК", "ПОБЕД"]
-        y_pos = 180
+            place = self.player_rank if self.player_rank is not None else "-"
+            text = f"ИГРОК: {self.player.name} | ПОБЕД: {self.player.wins} | МЕСТО: {place}"
+            player_stats = render_text(font_medium, text, True, CYAN)
+            self.add_text("player_stats", player_stats, (SCREEN_WIDTH//2 - player_stats.get_width()//2, 120), text)
         
-        # Заголовки таблицы
-        for i, header in enumerate(headers):
-            text = font_medium.render(header, True, YELLOW)
-            self.screen.blit(text, (150 + i * 200, y_pos))
-        
-        y_pos += 40
-        
-        # Данные таблицы
-        for i, record in enumerate(self.leaderboard[:10]):
-            place = font_medium.render(str(i+1), True, CYAN)
-            nickname = font_medium.render(record["nickname"], True, CYAN)
-            wins = font_medium.render(str(record["wins"]), True, CYAN)
-            
-            self.screen.blit(place, (150, y_pos))
-            self.screen.blit(nickname, (350, y_pos))
-            self.screen.blit(wins, (550, y_pos))
-            
-            y_pos += 30
+        # Видимые строки таблицы; открывается на строке игрока, листается колесом и клавишами
+        self.stats_view.draw(self.renderer, self.screen)
         
         # Кнопка возврата
-        mouse_pos = pygame.mouse.get_pos()
-        if self.back_button["rect"].collidepoint(mouse_pos):
-            self.screen.blit(pygame.transform.scale(self.button_hover, (120, 30)), self.back_button["rect"].topleft)
-        else:
-            self.screen.blit(pygame.transform.scale(self.button_normal, (120, 30)), self.back_button["rect"].topleft)
-        
-        text = font_small.render(self.back_button["text"], True, CYAN)
-        self.screen.blit(text, (
-            self.back_button["rect"].x + self.back_button["rect"].width//2 - text.get_width()//2,
-            self.back_button["rect"].y + self.back_button["rect"].height//2 - text.get_height()//2
-        ))
+        self.add_button(self.back_buttons[self.state], font_small, self.button_small_normal, self.button_small_hover)
     
-    def draw_game_over(self):
+    def draw_game_over_layer(self, surface):
+        surface.fill(BLACK)
+        
         # Результат игры
         if self.player.is_alive():
-            result_text = font_large.render("ПОБЕДА!", True, GREEN)
-            self.add_to_leaderboard(self.player.name, self.player.wins)
+            result_text = render_text(font_large, "ПОБЕДА!", True, GREEN)
         else:
-            result_text = font_large.render("ПОРАЖЕНИЕ", True, RED)
-        
-        self.screen.blit(result_text, (SCREEN_WIDTH//2 - result_text.get_width()//2, 200))
-        
+            result_text = render_text(font_large, "ПОРАЖЕНИЕ", True, RED)
+        self.blit_centered(surface, result_text, 200)
+    
+    def draw_game_over(self):
         # Статистика
-        stats_text = font_medium.render(f"ПОБЕД: {self.player.wins}", True, CYAN)
-        self.screen.blit(stats_text, (SCREEN_WIDTH//2 - stats_text.get_width()//2, 260))
+        text = f"ПОБЕД: {self.player.wins}"
+        stats_text = render_text(font_medium, text, True, CYAN)
+        self.add_text("wins", stats_text, (SCREEN_WIDTH//2 - stats_text.get_width()//2, 260), text)
         
         # Облачко реплики врага
-        if self.current_enemy.speech_text:
-            self.screen.blit(self.current_enemy.speech_bubble, (SCREEN_WIDTH//2 - 150, 300))
+        enemy = self.current_enemy
+        if enemy.speech_text:
+            self.renderer.add("speech", (SCREEN_WIDTH//2 - 150, 300, 300, 100), enemy.speech_text,
+                              lambda: self.screen.blit(enemy.speech_bubble, (SCREEN_WIDTH//2 - 150, 300)))
         
         # Кнопка возврата
-        mouse_pos = pygame.mouse.get_pos()
-        if self.menu_button["rect"].collidepoint(mouse_pos):
-            self.screen.blit(pygame.transform.scale(self.button_hover, (200, 50)), self.menu_button["rect"].topleft)
-        else:
-            self.screen.blit(pygame.transform.scale(self.button_normal, (200, 50)), self.menu_button["rect"].topleft)
-        
-        text = font_medium.render(self.menu_button["text"], True, CYAN)
-        self.screen.blit(text, (
-            self.menu_button["rect"].x + self.menu_button["rect"].width//2 - text.get_width()//2,
-            self.menu_button["rect"].y + self.menu_button["rect"].height//2 - text.get_height()//2
-        ))
+        self.add_button(self.menu_button, font_medium, self.button_wide_normal, self.button_wide_hover)
     
     def draw_health_bar(self, x, y, width, height, ratio, color):
         self.screen.blit(self.health_bar_bg, (x-1, y-1))
         pygame.draw.rect(self.screen, color, (x, y, width * ratio, height))
 
-# Создаем более интересные изображения врагов
-def create_enemy_images():
-    # Корвет "Молния"
-    enemy1_img = pygame.Surface((250, 250), pygame.SRCALPHA)
-    pygame.draw.polygon(enemy1_img, (0, 150, 255), [(125, 10), (10, 240), (240, 240)])  # Основной корпус
-    pygame.draw.circle(enemy1_img, (255, 255, 0), (125, 60), 20)  # Центральный реактор
-    pygame.draw.line(enemy1_img, (255, 0, 0), (50, 100), (200, 100), 3)  # Лазерная пушка
-    pygame.draw.line(enemy1_img, (255, 0, 0), (100, 150), (150, 150), 3)  # Дополнительное оружие
-    
-    # Линкор "Титан"
-    enemy2_img = pygame.Surface((250, 250), pygame.SRCALPHA)
-    pygame.draw.rect(enemy2_img, (200, 100, 0), (50, 50, 150, 150))  # Основной корпус
-    pygame.draw.rect(enemy2_img, (150, 150, 150), (80, 80, 90, 90))  # Центральная часть
-    pygame.draw.circle(enemy2_img, (255, 0, 0), (125, 125), 30)  # Реактор
-    pygame.draw.rect(enemy2_img, (100, 100, 100), (30, 100, 20, 50))  # Левое оружие
-    pygame.draw.rect(enemy2_img, (100, 100, 100), (200, 100, 20, 50))  # Правое оружие
-    
-    # Сохраняем изображения
-    pygame.image.save(enemy1_img, "enemy1.png")
-    pygame.image.save(enemy2_img, "enemy2.png")
-
 # Запуск игры
 if __name__ == "__main__":
-    create_enemy_images()
     game = SpaceWarGame()
     game.run()
@@ -0,0 +1,290 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Счетчики игроков по числу побед в дереве Фенвика: "сколько игроков набрало больше w"
+# за O(log W), где W - максимальное число побед. Дерево растет удвоением.
+class _WinsIndex:
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.counts = [0] * size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+
+    def _grow(self, wins: int):
+        size = self.size
+        while size <= wins:
+            size *= 2
+        counts = self.counts + [0] * (size - self.size)
+        self.size, self.counts, self.tree = size, [0] * size, [0] * (size + 1)
+        self.total = 0
+        for value, count in enumerate(counts):
+            if count:
+                self.add(value, count)
+
+    def add(self, wins: int, delta: int = 1):
+        if wins >= self.size:
+            self._grow(wins)
+        self.counts[wins] += delta
+        self.total += delta
+        i = wins + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def count_at_most(self, wins: int) -> int:
+        i = min(wins, self.size - 1) + 1
+        result = 0
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def count_greater(self, wins: int) -> int:
+        return self.total - self.count_at_most(wins)
+
+
+# Таблица лидеров без ограничения на число игроков: SQLite с индексом по (wins, nickname)
+# для выборок окон и дерево Фенвика в памяти для номера места.
+# Место считается "спортивно": игроки с равным числом побед делят место.
+# Запись отложенная: результат сразу попадает в открытую транзакцию (чтения того же
+# соединения его видят), а фиксирует ее фоновый поток, когда поток результатов затихнет
+# на debounce секунд, - одна фиксация на пачку. Чтобы сбой до фиксации ничего не терял,
+# каждый результат до возврата из record дописывается в журнал (JSON-строка, fsync);
+# после фиксации журнал обнуляется, при открытии - применяется заново. Обновление
+# "максимум побед" идемпотентно, так что повтор уже зафиксированных строк безопасен.
+# Журнал - свой файл рядом с базой (path + ".journal"), не служебный "-journal" SQLite.
+class IndexedLeaderboard:
+    def __init__(self, path: str = "leaderboard.db", debounce: float = 0.5, journal_path: Optional[str] = None):
+        self.path = path
+        self.journal_path = journal_path or path + ".journal"
+        self.debounce = debounce
+        self._journal = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._dirty = False
+        self._closed = False
+        self._last_change = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS players ("
+            "nickname TEXT PRIMARY KEY, wins INTEGER NOT NULL) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS players_rank ON players (wins DESC, nickname)")
+        self._db.commit()
+        self._index = _WinsIndex()
+        self._rebuild_index()
+
+        # Счетчики: сколько результатов принято, сколько фиксаций выполнено
+        # и сколько изменений поглотила уже запланированная фиксация
+        self.results_recorded = 0
+        self.writes_issued = 0
+        self.writes_coalesced = 0
+        self.journal_replayed = self._replay_journal()
+
+    def _replay_journal(self) -> int:
+        # Результаты, не дождавшиеся фиксации до сбоя, - сразу в базу
+        replayed = 0
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная последняя строка после сбоя
+                        break
+                    if (isinstance(item, dict) and isinstance(item.get("nickname"), str)
+                            and isinstance(item.get("wins"), int)):
+                        self._upsert(item["nickname"], item["wins"])
+                        replayed += 1
+        except FileNotFoundError:
+            return 0
+        if replayed:
+            with self._lock:
+                self._commit_locked()
+        return replayed
+
+    def _append_journal(self, rows: List[Tuple[str, int]]):
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        self._journal.write("".join(json.dumps({"nickname": nickname, "wins": wins}) + "\n"
+                                    for nickname, wins in rows))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _rebuild_index(self):
+        # Агрегат по индексу: строк столько, сколько различных значений побед
+        index = _WinsIndex()
+        for wins, count in self._db.execute("SELECT wins, COUNT(*) FROM players GROUP BY wins"):
+            index.add(wins, count)
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.total
+
+    def _upsert(self, nickname: str, wins: int) -> bool:
+        row = self._db.execute("SELECT wins FROM players WHERE nickname = ?", (nickname,)).fetchone()
+        if row is not None and row[0] >= wins:
+            return False
+        self._db.execute(
+            "INSERT INTO players (nickname, wins) VALUES (?, ?) "
+            "ON CONFLICT (nickname) DO UPDATE SET wins = excluded.wins", (nickname, wins))
+        if row is not None:
+            self._index.add(row[0], -1)
+        self._index.add(wins, 1)
+        return True
+
+    def record(self, nickname: str, wins: int):
+        self.record_many([(nickname, wins)])
+
+    def record_many(self, results):
+        # После возврата результат переживет сбой (журнал); фиксацию в базе делает фоновый
+        # поток, и каждое изменение сверх первого в пачке поглощено ею
+        with self._lock:
+            changed = []
+            for nickname, wins in results:
+                self.results_recorded += 1
+                if self._upsert(nickname, wins):
+                    changed.append((nickname, wins))
+            if not changed:
+                return
+            self._append_journal(changed)
+            self.writes_coalesced += len(changed) if self._dirty else len(changed) - 1
+            self._dirty = True
+            self._last_change = time.monotonic()
+            self._ensure_thread()
+            self._wakeup.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._writer, name="leaderboard-writer", daemon=True)
+            self._thread.start()
+
+    def _writer(self):
+        with self._lock:
+            while not self._closed:
+                if not self._dirty:
+                    self._wakeup.wait()
+                    continue
+                remaining = self._last_change + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+                self._commit_locked()
+
+    def _commit_locked(self):
+        self._db.commit()
+        self.writes_issued += 1
+        self._dirty = False
+        # Все строки журнала уже в базе - журнал можно обнулить
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        open(self.journal_path, "w").close()
+
+    def import_json(self, path: str = "leaderboard.json") -> int:
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if not isinstance(data, list):
+            return 0
+        rows = [(item["nickname"], item["wins"]) for item in data
+                if isinstance(item, dict) and isinstance(item.get("nickname"), str)
+                and isinstance(item.get("wins"), int)]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO players (nickname, wins) VALUES (?, ?) "
+                "ON CONFLICT (nickname) DO UPDATE SET wins = max(wins, excluded.wins)", rows)
+            self._commit_locked()
+            self._rebuild_index()
+        return len(rows)
+
+    def wins_of(self, nickname: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT wins FROM players WHERE nickname = ?", (nickname,)).fetchone()
+        return row[0] if row else None
+
+    def rank_of_wins(self, wins: int) -> int:
+        return self._index.count_greater(wins) + 1
+
+    def rank_of(self, nickname: str) -> Optional[int]:
+        wins = self.wins_of(nickname)
+        return None if wins is None else self.rank_of_wins(wins)
+
+    def position_of(self, nickname: str) -> Optional[int]:
+        # Номер строки игрока (с нуля) в порядке top(): все, у кого больше побед,
+        # плюс равные ему, стоящие раньше по имени - диапазон того же индекса
+        wins = self.wins_of(nickname)
+        if wins is None:
+            return None
+        with self._lock:
+            before = self._db.execute("SELECT COUNT(*) FROM players WHERE wins = ? AND nickname < ?",
+                                      (wins, nickname)).fetchone()[0]
+        return self._index.count_greater(wins) + before
+
+    def _rows(self, query: str, params=()) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [{"nickname": nickname, "wins": wins, "rank": self.rank_of_wins(wins)}
+                for nickname, wins in rows]
+
+    def top(self, n: int = 10, offset: int = 0) -> List[Dict]:
+        return self._rows(
+            "SELECT nickname, wins FROM players ORDER BY wins DESC, nickname LIMIT ? OFFSET ?",
+            (n, offset))
+
+    def neighbours(self, nickname: str, k: int = 2) -> List[Dict]:
+        # Окно вокруг игрока по индексу: k строк выше, сам игрок и k строк ниже
+        wins = self.wins_of(nickname)
+        if wins is None:
+            return []
+        # Каждое условие - отдельный диапазон индекса; OR в одном запросе индекс не использует
+        above = self._rows(
+            "SELECT nickname, wins FROM players WHERE wins = ? AND nickname < ? "
+            "ORDER BY nickname DESC LIMIT ?", (wins, nickname, k))
+        if len(above) < k:
+            above += self._rows(
+                "SELECT nickname, wins FROM players WHERE wins > ? "
+                "ORDER BY wins ASC, nickname DESC LIMIT ?", (wins, k - len(above)))
+        below = self._rows(
+            "SELECT nickname, wins FROM players WHERE wins = ? AND nickname > ? "
+            "ORDER BY nickname LIMIT ?", (wins, nickname, k))
+        if len(below) < k:
+            below += self._rows(
+                "SELECT nickname, wins FROM players WHERE wins < ? "
+                "ORDER BY wins DESC, nickname LIMIT ?", (wins, k - len(below)))
+        me = {"nickname": nickname, "wins": wins, "rank": self.rank_of_wins(wins)}
+        return above[::-1] + [me] + below
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._commit_locked()
+
+    def close(self):
+        with self._lock:
+            if self._dirty:
+                self._commit_locked()
+            self._closed = True
+            self._wakeup.notify_all()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._db.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "results_recorded": self.results_recorded,
+            "writes_issued": self.writes_issued,
+            "writes_coalesced": self.writes_coalesced
+        }
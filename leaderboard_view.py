@@ -0,0 +1,296 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import pygame
+
+from text_cache import render_text
+
+# Прокручиваемая таблица лидеров любого размера. Из базы читаются только окна
+# (страницы по FETCH_ROWS строк, LIMIT/OFFSET по индексу рейтинга), на экране
+# рисуются только видимые строки. Страницы вокруг видимой догружает фоновый поток,
+# пока игрок листает; кадр базу не ждет - недогруженная строка на кадр-другой
+# показывается как "...". Строка таблицы отрисовывается в поверхность один раз
+# и переиспользуется при прокрутке, ключ - ее содержимое.
+# Таблица открывается на строке игрока: начало группы с тем же числом побед известно
+# сразу (дерево Фенвика), а точное место внутри группы - счет по индексу длиной в
+# группу - ищет тот же фоновый поток, и таблица доезжает до игрока, когда оно найдено.
+
+ROW_HEIGHT = 30
+FETCH_ROWS = 50
+# Сколько страниц выше и ниже видимых держать загруженными
+PREFETCH_PAGES = 2
+MAX_PAGES = 64
+MAX_ROW_SURFACES = 256
+# Строк за щелчок колеса; прокрутка догоняет цель плавно, SCROLL_RATE - доля пути за секунду
+WHEEL_ROWS = 3
+SCROLL_RATE = 15.0
+# Дальше скольких экранов прокрутка не анимируется
+JUMP_SCREENS = 3
+COLUMNS = (0, 200, 400)
+SCROLLBAR_WIDTH = 6
+
+
+class LeaderboardView:
+    def __init__(self, store, viewport: pygame.Rect, font, color, highlight_color):
+        self.store = store
+        self.viewport = pygame.Rect(viewport)
+        self.font = font
+        self.color = color
+        self.highlight_color = highlight_color
+        self.highlight: Optional[str] = None
+        self.total = 0
+        # Смещение в пикселях от первой строки: текущее и то, к которому едем
+        self.offset = 0.0
+        self.target = 0.0
+        self.last_time: Optional[float] = None
+
+        self._pages: "OrderedDict[int, List[Dict]]" = OrderedDict()
+        self._wanted: List[int] = []
+        self._loading: Optional[int] = None
+        # Игрок, чье точное место ищет фоновый поток, и найденное место (поколение, строка)
+        self._locate: Optional[str] = None
+        self._located: Optional[Tuple[int, int]] = None
+        # Куда таблица открылась: пока игрок не листал, найденное место двигает ее к себе
+        self._anchor: Optional[float] = None
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._rows: "OrderedDict[Hashable, pygame.Surface]" = OrderedDict()
+
+        # Счетчики: запросы окон, отрисованные строки, кадры с недогруженными строками
+        self.fetches = 0
+        self.row_renders = 0
+        self.row_hits = 0
+        self.missing_frames = 0
+
+    @property
+    def visible_rows(self) -> int:
+        return self.viewport.height // ROW_HEIGHT
+
+    @property
+    def max_offset(self) -> int:
+        return max(0, self.total * ROW_HEIGHT - self.viewport.height)
+
+    @property
+    def scrolling(self) -> bool:
+        return self.offset != self.target
+
+    def invalidate(self, highlight: Optional[str] = None):
+        # Таблица изменилась: окна перечитываются, готовые строки остаются (ключ - содержимое)
+        with self._cond:
+            self._generation += 1
+            self._pages.clear()
+            self._wanted = []
+            self._locate = None
+            self._located = None
+        self.highlight = highlight
+        self.total = len(self.store)
+        self.target = min(self.target, self.max_offset)
+        self.offset = min(self.offset, self.max_offset)
+
+    def open(self, highlight: Optional[str] = None):
+        # Вход на экран: если игрок ниже первого экрана, таблица открывается на нем
+        self.invalidate(highlight)
+        wins = self.store.wins_of(highlight) if highlight is not None else None
+        # Сразу - начало группы игрока; точное место внутри группы ищет фоновый поток
+        self.offset = self.target = self._centered(None if wins is None else self.store.rank_of_wins(wins) - 1)
+        self._anchor = self.target if wins is not None else None
+        # Первый кадр рисуется целиком: видимые окна читаются сразу, соседние - в фоне
+        for page in self._visible_pages():
+            self._store_page(self._generation, page, self._fetch(page))
+        if wins is not None:
+            with self._cond:
+                self._locate = highlight
+                self._ensure_thread()
+        self._request_pages()
+
+    def _centered(self, position: Optional[int]) -> float:
+        # Смещение, при котором строка position - по центру экрана (первый экран не сдвигается)
+        row = position - self.visible_rows // 2 if position is not None and position >= self.visible_rows else 0
+        return float(min(row * ROW_HEIGHT, self.max_offset))
+
+    def scroll(self, rows: float):
+        self.target = min(max(0.0, round(self.target + rows * ROW_HEIGHT)), float(self.max_offset))
+        self._request_pages()
+
+    def page(self, step: int):
+        self.scroll(step * (self.visible_rows - 1))
+
+    def home(self):
+        self.scroll(-self.total)
+
+    def end(self):
+        self.scroll(self.total)
+
+    def update(self, now: float):
+        dt = 0.0 if self.last_time is None else max(0.0, now - self.last_time)
+        self.last_time = now
+        with self._cond:
+            located, self._located = self._located, None
+        if located is not None and located[0] == self._generation and self.target == self._anchor:
+            # Место игрока найдено, а игрок еще не листал - едем к его строке
+            self.target = self._centered(located[1])
+            self._anchor = None
+            self._request_pages()
+        if self.scrolling:
+            # Дальний прыжок (HOME/END) не проезжает через тысячи строк: сразу на экран от цели
+            distance = self.target - self.offset
+            if abs(distance) > JUMP_SCREENS * self.viewport.height:
+                self.offset = self.target - (self.viewport.height if distance > 0 else -self.viewport.height)
+            self.offset += (self.target - self.offset) * min(1.0, dt * SCROLL_RATE)
+            if abs(self.target - self.offset) < 0.5:
+                self.offset = self.target
+            self._request_pages()
+        elif self.pending:
+            self._request_pages()
+
+    def _visible_range(self) -> Tuple[int, int]:
+        first = int(self.offset) // ROW_HEIGHT
+        return first, min(self.total, first + self.visible_rows + 1)
+
+    def _visible_pages(self) -> range:
+        first, last = self._visible_range()
+        return range(first // FETCH_ROWS, max(first, last - 1) // FETCH_ROWS + 1)
+
+    def _request_pages(self):
+        pages = self._visible_pages()
+        last_page = max(0, self.total - 1) // FETCH_ROWS
+        # Ближние к видимым - первыми; в сторону прокрутки - раньше, чем в обратную
+        forward = self.target >= self.offset
+        wanted = list(pages)
+        for distance in range(1, PREFETCH_PAGES + 1):
+            ahead, behind = pages.stop - 1 + distance, pages.start - distance
+            for page in ((ahead, behind) if forward else (behind, ahead)):
+                if 0 <= page <= last_page:
+                    wanted.append(page)
+        with self._cond:
+            for page in wanted:
+                if page in self._pages:
+                    self._pages.move_to_end(page)
+            wanted = [page for page in wanted if page not in self._pages and page != self._loading]
+            if wanted == self._wanted:
+                return
+            self._wanted = wanted
+            if wanted:
+                self._ensure_thread()
+
+    def _ensure_thread(self):
+        # Вызывается под self._cond
+        self._cond.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch, name="leaderboard-prefetch", daemon=True)
+            self._thread.start()
+
+    def _prefetch(self):
+        while True:
+            with self._cond:
+                while not self._wanted and self._locate is None:
+                    self._cond.wait()
+                generation = self._generation
+                # Запрос места снимается, только когда ответ готов: до тех пор экран ждет
+                nickname = self._locate
+                if nickname is None:
+                    page = self._loading = self._wanted.pop(0)
+            if nickname is not None:
+                # Счет внутри группы равных побед - длина группы, поэтому не в кадре
+                position = self.store.position_of(nickname)
+                with self._cond:
+                    if generation == self._generation:
+                        self._locate = None
+                        if position is not None:
+                            self._located = (generation, position)
+                continue
+            self._store_page(generation, page, self._fetch(page))
+            with self._cond:
+                self._loading = None
+
+    def _fetch(self, page: int) -> List[Dict]:
+        self.fetches += 1
+        return self.store.top(FETCH_ROWS, page * FETCH_ROWS)
+
+    def _store_page(self, generation: int, page: int, rows: List[Dict]):
+        with self._cond:
+            # Окно, прочитанное до изменения таблицы, уже устарело
+            if generation != self._generation:
+                return
+            self._pages[page] = rows
+            while len(self._pages) > MAX_PAGES:
+                self._pages.popitem(last=False)
+
+    def _record(self, row: int) -> Optional[Dict]:
+        with self._cond:
+            rows = self._pages.get(row // FETCH_ROWS)
+        if rows is None or row % FETCH_ROWS >= len(rows):
+            return None
+        return rows[row % FETCH_ROWS]
+
+    @property
+    def pending(self) -> bool:
+        # Видимые окна или место игрока еще не пришли из фонового потока
+        with self._cond:
+            if self._locate is not None or self._located is not None:
+                return True
+            return any(page not in self._pages for page in self._visible_pages())
+
+    def _row_surface(self, record: Dict) -> pygame.Surface:
+        highlighted = record["nickname"] == self.highlight
+        key = (record["rank"], record["nickname"], record["wins"], highlighted)
+        surface = self._rows.get(key)
+        if surface is not None:
+            self._rows.move_to_end(key)
+            self.row_hits += 1
+            return surface
+        self.row_renders += 1
+        color = self.highlight_color if highlighted else self.color
+        surface = pygame.Surface((self.viewport.width, ROW_HEIGHT), pygame.SRCALPHA)
+        for x, text in zip(COLUMNS, (str(record["rank"]), record["nickname"], str(record["wins"]))):
+            surface.blit(self.font.render(text, True, color), (x, 0))
+        self._rows[key] = surface
+        while len(self._rows) > MAX_ROW_SURFACES:
+            self._rows.popitem(last=False)
+        return surface
+
+    def draw(self, renderer, screen: pygame.Surface):
+        first, last = self._visible_range()
+        offset = int(self.offset)
+        records = [self._record(row) for row in range(first, last)]
+        if None in records:
+            self.missing_frames += 1
+        # Регион таблицы меняется только вместе со смещением или пришедшими строками
+        signature = (offset, self.highlight, tuple(None if record is None else (record["rank"], record["nickname"],
+                                                                                record["wins"])
+                                                   for record in records))
+        viewport = self.viewport
+
+        def draw_rows():
+            clip = screen.get_clip()
+            screen.set_clip(viewport)
+            y = viewport.y + first * ROW_HEIGHT - offset
+            for record in records:
+                if record is None:
+                    screen.blit(render_text(self.font, "...", True, self.color), (viewport.x, y))
+                else:
+                    screen.blit(self._row_surface(record), (viewport.x, y))
+                y += ROW_HEIGHT
+            screen.set_clip(clip)
+        renderer.add("leaderboard_rows", viewport, signature, draw_rows)
+
+        # Полоса прокрутки справа от таблицы
+        if self.max_offset:
+            height = max(10, viewport.height * viewport.height // (self.total * ROW_HEIGHT))
+            y = viewport.y + (viewport.height - height) * offset // self.max_offset
+            bar = pygame.Rect(viewport.right + 4, y, SCROLLBAR_WIDTH, height)
+            renderer.add("leaderboard_scrollbar", bar, None, lambda: pygame.draw.rect(screen, self.color, bar))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rows": self.total,
+            "offset": int(self.offset),
+            "pages_cached": len(self._pages),
+            "fetches": self.fetches,
+            "row_surfaces": len(self._rows),
+            "row_renders": self.row_renders,
+            "row_hits": self.row_hits,
+            "missing_frames": self.missing_frames
+        }
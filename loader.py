@@ -0,0 +1,103 @@
+import heapq
+import itertools
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Фоновая загрузка: задачи с приоритетами выполняются одним рабочим потоком
+# (меньше число - раньше; при равном приоритете - в порядке добавления).
+# Один поток дает задачам порядок без явных зависимостей. Прогресс считается
+# по весам обязательных задач, необязательные дорабатывают уже после перехода.
+
+
+class LoadTask:
+    def __init__(self, name: str, fn: Callable[[], None], priority: int, weight: float, required: bool):
+        self.name = name
+        self.fn = fn
+        self.priority = priority
+        self.weight = weight
+        self.required = required
+        self.duration: Optional[float] = None
+
+
+class BackgroundLoader:
+    def __init__(self):
+        self._queue: List[Tuple[int, int, LoadTask]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._failed_task: Optional[str] = None
+        self.tasks: List[LoadTask] = []
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], None], priority: int = 0,
+            weight: float = 1.0, required: bool = True):
+        task = LoadTask(name, fn, priority, weight, required)
+        with self._lock:
+            self.tasks.append(task)
+            heapq.heappush(self._queue, (priority, next(self._order), task))
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._work, name="loader", daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+                _, _, task = heapq.heappop(self._queue)
+            start = time.perf_counter()
+            try:
+                task.fn()
+            except BaseException as error:
+                with self._lock:
+                    self._error = error
+                    self._failed_task = task.name
+                return
+            task.duration = time.perf_counter() - start
+            with self._lock:
+                if self.ready_at is None and all(t.duration is not None for t in self.tasks if t.required):
+                    self.ready_at = time.perf_counter()
+
+    def _check(self):
+        # Ошибка в рабочем потоке поднимается в главном при следующем опросе
+        if self._error is not None:
+            raise RuntimeError(f"ошибка загрузки в задаче '{self._failed_task}'") from self._error
+
+    @property
+    def progress(self) -> float:
+        self._check()
+        with self._lock:
+            required = [task for task in self.tasks if task.required]
+            total = sum(task.weight for task in required)
+            done = sum(task.weight for task in required if task.duration is not None)
+        return done / total if total else 1.0
+
+    def ready(self) -> bool:
+        self._check()
+        return self.ready_at is not None or not any(task.required for task in self.tasks)
+
+    def done(self) -> bool:
+        self._check()
+        return all(task.duration is not None for task in self.tasks)
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        return {task.name: task.duration for task in self.tasks}
+
+
+def record_launch(path: str, time_to_interactive: float, timings: Dict[str, Optional[float]],
+                  phases: Optional[Dict[str, float]] = None):
+    entry = {
+        "time": time.time(),
+        "time_to_interactive": round(time_to_interactive, 4),
+        "tasks": {name: None if duration is None else round(duration, 4) for name, duration in timings.items()}
+    }
+    if phases is not None:
+        entry["phases"] = {name: round(duration, 4) for name, duration in phases.items()}
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from battle_core import WEAPONS
+from battle_server import DEFAULT_PORT, BattleServer
+from leaderboard_store import IndexedLeaderboard
+from roster import ROSTER_PATH, EnemyRoster
+
+# Нагрузочный генератор для сервера боев по петлевому интерфейсу. Каждый бот держит
+# одну сессию: hello, бой с противником из ростера, ходы по приходу "turn".
+# Задержка - время от отправки "act" до ответа "player". Без --connect сервер
+# поднимается в этом же процессе на свободном порту, и боты делят с ним цикл событий.
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.rounds = 0
+        self.battles = 0
+        self.wins = 0
+        self.errors = 0
+        self.connected = 0
+        self.peak_connected = 0
+        self.failed_connects = 0
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def _bot(index: int, host: str, port: int, enemies: List[str], deadline: float,
+               stats: LoadStats, seed: int):
+    rng = random.Random(seed * 1000003 + index)
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats.failed_connects += 1
+        return
+    stats.connected += 1
+    stats.peak_connected = max(stats.peak_connected, stats.connected)
+
+    async def request(message: Dict) -> Dict:
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await writer.drain()
+        return await expect()
+
+    async def expect(*events: str) -> Dict:
+        # Ждем нужное событие; ход врага ("enemy_attack", "enemy_damage") пропускаем
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("сервер закрыл соединение")
+            reply = json.loads(line)
+            if "error" in reply:
+                stats.errors += 1
+                raise ConnectionError(reply["error"])
+            if not events or reply["event"] in events:
+                return reply
+
+    try:
+        await request({"op": "hello", "nickname": f"BOT{index}"})
+        while time.perf_counter() < deadline:
+            await request({"op": "start", "enemy": rng.choice(enemies)})
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                reply = await request({"op": "act", "action": "attack", "weapon": rng.choice(list(WEAPONS))})
+                stats.latencies.append(time.perf_counter() - start)
+                stats.rounds += 1
+                if reply["player_hp"] <= 0 or reply["enemy_hp"] <= 0:
+                    outcome = await expect("over")
+                else:
+                    outcome = await expect("turn", "over")
+                if outcome["event"] == "over":
+                    stats.battles += 1
+                    stats.wins += outcome["won"]
+                    break
+        writer.write(b'{"op": "quit"}\n')
+        await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        stats.connected -= 1
+        writer.close()
+
+
+async def run_load(sessions: int, duration: float, host: Optional[str] = None, port: int = DEFAULT_PORT,
+                   speed: float = 1.0, ramp: float = 1.0, seed: int = 0, enemy_page: int = 6) -> Dict:
+    server = None
+    if host is None:
+        # Свой сервер с временной базой лидеров
+        db = IndexedLeaderboard(os.path.join(tempfile.mkdtemp(prefix="loadgen_"), "leaderboard.db"))
+        server = BattleServer(EnemyRoster.load(ROSTER_PATH), db, speed, seed=seed)
+        await server.start("127.0.0.1", 0)
+        host, port = "127.0.0.1", server.port
+    # Противники с первой страницы меню, как у большинства игроков
+    enemies = [definition.key for definition in EnemyRoster.load(ROSTER_PATH).page(0, enemy_page)]
+
+    stats = LoadStats()
+    start = time.perf_counter()
+    deadline = start + duration
+    bots = []
+    for index in range(sessions):
+        bots.append(asyncio.create_task(_bot(index, host, port, enemies, deadline, stats, seed)))
+        # Подключения растягиваются на ramp секунд, чтобы не упереться в очередь accept
+        if ramp > 0 and sessions > 1:
+            await asyncio.sleep(ramp / sessions)
+    held_at = time.perf_counter()
+    await asyncio.gather(*bots)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "sessions": sessions,
+        "peak_sessions": stats.peak_connected,
+        "failed_connects": stats.failed_connects,
+        "errors": stats.errors,
+        "rounds": stats.rounds,
+        "battles": stats.battles,
+        "wins": stats.wins,
+        "elapsed_s": elapsed,
+        "rounds_per_sec": stats.rounds / elapsed if elapsed else 0.0,
+        "ramp_s": held_at - start,
+        "latency_p50_ms": 1000 * stats.percentile(0.5),
+        "latency_p95_ms": 1000 * stats.percentile(0.95),
+        "latency_p99_ms": 1000 * stats.percentile(0.99),
+        "latency_max_ms": 1000 * max(stats.latencies, default=0.0)
+    }
+    if server is not None:
+        await server.close()
+        report["server"] = server.stats()
+        server.leaderboard.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера боев")
+    parser.add_argument("-n", "--sessions", type=int, default=1000)
+    parser.add_argument("-t", "--duration", type=float, default=10.0, help="длительность, с")
+    parser.add_argument("--connect", help="host:port работающего сервера; без него сервер в процессе")
+    parser.add_argument("--speed", type=float, default=1.0, help="скорость фаз врага у своего сервера")
+    parser.add_argument("--ramp", type=float, default=1.0, help="время подключения всех сессий, с")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    host, port = None, DEFAULT_PORT
+    if args.connect:
+        host, _, port_text = args.connect.rpartition(":")
+        port = int(port_text)
+    report = asyncio.run(run_load(args.sessions, args.duration, host, port, args.speed, args.ramp, args.seed))
+    print(f"сессий: {report['peak_sessions']} из {report['sessions']}, не подключились: "
+          f"{report['failed_connects']}, ошибок: {report['errors']}")
+    print(f"раундов: {report['rounds']} ({report['rounds_per_sec']:.0f}/с), боев: {report['battles']}, "
+          f"побед: {report['wins']} за {report['elapsed_s']:.1f} с")
+    print(f"задержка хода: p50 {report['latency_p50_ms']:.2f} мс, p95 {report['latency_p95_ms']:.2f} мс, "
+          f"p99 {report['latency_p99_ms']:.2f} мс, max {report['latency_max_ms']:.2f} мс")
+    if "server" in report:
+        print(f"сервер: {report['server']}")
@@ -0,0 +1,131 @@
+import time
+from typing import Dict, List, Optional
+
+import pygame
+
+# Адаптивный темп кадров. Пока на экране что-то движется (загрузка, ход врага, реплика
+# или текст с таймаутом, недавний ввод мыши), цикл работает с ограничением частоты
+# своего состояния. Когда ничего не меняется, цикл засыпает в pygame.event.wait до
+# следующего события или до редкого пробуждения idle_fps. Если фон движется сам по себе
+# (параллакс звезд), сразу уснуть нельзя - звезды прыгали бы на несколько пикселей за кадр;
+# такой простой идет с пониженной частотой ambient_fps, но не дольше ambient_linger секунд
+# после последнего ввода или анимации. Дальше фон замирает (frozen) и цикл спит, как без него.
+# Экономия процессора оценивается относительно прежнего цикла с постоянной частотой fps:
+# пропущенные кадры, умноженные на среднюю цену активного кадра, сводка по минутам.
+
+INPUT_EVENTS = {pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.KEYDOWN,
+                pygame.KEYUP, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED}
+
+
+class FramePacer:
+    def __init__(self, fps: int, state_caps: Optional[Dict[str, int]] = None, idle_fps: float = 2,
+                 linger: float = 0.25, adaptive: bool = True, verbose: bool = False, ambient_fps: float = 20,
+                 ambient_linger: float = 10.0):
+        self.fps = fps
+        self.ambient_fps = ambient_fps
+        self.ambient_linger = ambient_linger
+        # Фон стоит: кадр спал в ожидании событий, двигать его нельзя, иначе скачок
+        self.frozen = False
+        self.state_caps = state_caps or {}
+        self.idle_fps = idle_fps
+        self.linger = linger
+        self.adaptive = adaptive
+        self.verbose = verbose
+        self.frames = 0
+        self.idle_frames = 0
+        self.ambient_frames = 0
+        self.minutes: List[Dict] = []
+        self._last_input = 0.0
+        self._last_active = 0.0
+        self._active_cpu = 0.0
+        self._active_frames = 0
+        self._frame_cpu: Optional[float] = None
+        self._frame_start: Optional[float] = None
+        self._minute_start = time.perf_counter()
+        self._minute_cpu = time.process_time()
+        self._minute_frames = 0
+        self._minute_skipped = 0.0
+
+    def cap(self, state: str) -> int:
+        # Без адаптации - прежний постоянный темп
+        return self.state_caps.get(state, self.fps) if self.adaptive else self.fps
+
+    def next_frame(self, clock: pygame.time.Clock, state: str, animating: bool, limit: bool = True,
+                   ambient: bool = False) -> List:
+        # Ждет начала следующего кадра и возвращает события, накопившиеся к нему
+        self._finish_frame()
+        now = time.perf_counter()
+        active = not (self.adaptive and limit) or animating or now - self._last_input < self.linger
+        if active:
+            self._last_active = now
+        ambient = ambient and now - self._last_active < self.ambient_linger
+        self.frozen = not (active or ambient)
+        if active:
+            clock.tick(self.cap(state) if limit else 0)
+            events = pygame.event.get()
+        elif ambient:
+            # Движется только фон: плавно, но с частотой ниже состояния
+            clock.tick(min(self.cap(state), self.ambient_fps))
+            events = pygame.event.get()
+            self.ambient_frames += 1
+        else:
+            # Простой: спим до события, но не дольше периода idle_fps
+            first = pygame.event.wait(int(1000 / self.idle_fps))
+            events = [] if first.type == pygame.NOEVENT else [first]
+            events.extend(pygame.event.get())
+            clock.tick()
+            self.idle_frames += 1
+
+        # Сколько кадров сверх этого отрисовал бы цикл с постоянной частотой fps
+        now = time.perf_counter()
+        if self._frame_start is not None and limit:
+            self._minute_skipped += max(0.0, (now - self._frame_start) * self.fps - 1)
+        self._frame_start = now
+
+        if any(event.type in INPUT_EVENTS for event in events):
+            self._last_input = time.perf_counter()
+        self._frame_cpu = time.process_time() if active else None
+        self.frames += 1
+        self._minute_frames += 1
+        return events
+
+    def _finish_frame(self):
+        # Цена активного кадра - для оценки сэкономленного времени
+        if self._frame_cpu is not None:
+            self._active_cpu += time.process_time() - self._frame_cpu
+            self._active_frames += 1
+            self._frame_cpu = None
+        now = time.perf_counter()
+        if now - self._minute_start >= 60:
+            self.minutes.append(self._minute_summary(now))
+            if self.verbose:
+                print(self._format_minute(len(self.minutes), self.minutes[-1]))
+            self._minute_start = now
+            self._minute_cpu = time.process_time()
+            self._minute_frames = 0
+            self._minute_skipped = 0.0
+
+    def _minute_summary(self, now: float) -> Dict:
+        frame_cost = self._active_cpu / self._active_frames if self._active_frames else 0.0
+        elapsed = max(now - self._minute_start, 1e-9)
+        scale = 60 / elapsed
+        return {
+            "frames": self._minute_frames,
+            "cpu_s": (time.process_time() - self._minute_cpu) * scale,
+            "saved_cpu_s": self._minute_skipped * frame_cost * scale
+        }
+
+    @staticmethod
+    def _format_minute(index: int, minute: Dict) -> str:
+        return (f"  {index:>3}: кадров {minute['frames']:>5}  процессор {minute['cpu_s']:6.2f} с  "
+                f"сэкономлено ~{minute['saved_cpu_s']:6.2f} с")
+
+    def report(self) -> str:
+        # Незавершенная минута пересчитывается на минуту по прошедшему времени
+        minutes = self.minutes + [self._minute_summary(time.perf_counter())]
+        lines = ["ТЕМП КАДРОВ (на минуту):"]
+        lines.extend(self._format_minute(i + 1, minute) for i, minute in enumerate(minutes))
+        total = sum(minute["saved_cpu_s"] for minute in minutes) / len(minutes)
+        lines.append(f"  в среднем сэкономлено ~{total:.2f} с процессора в минуту, "
+                     f"кадров простоя {self.idle_frames}, фоновых {self.ambient_frames} из {self.frames}")
+        return "\n".join(lines)
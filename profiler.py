@@ -0,0 +1,182 @@
+import json
+import sys
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+import pygame
+
+# Покадровый профайлер. Замеряет фазы кадра (события, update, draw_*, present) и считает
+# вызовы font.render, transform.scale и blit. Счетчики собираются через sys.setprofile
+# по событиям c_call - это стоит времени, поэтому профайлер выключен, пока не нужен.
+# Данные показываются в оверлее и выгружаются в формате Chrome trace (chrome://tracing).
+
+OVERLAY_REFRESH_FRAMES = 15
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "FrameProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SECTION = _NullSection()
+
+
+class FrameProfiler:
+    def __init__(self, history: int = 600, trace_limit: int = 500000):
+        self.enabled = False
+        self.overlay = False
+        self.frame_times = deque(maxlen=history)
+        self.section_times: Dict[str, deque] = {}
+        self.counts = Counter()
+        self.frame_counts = Counter()
+        self.trace = deque(maxlen=trace_limit)
+        self.frame_index = 0
+        self._origin = time.perf_counter()
+        self._frame_start: Optional[float] = None
+        self._current: Dict[str, float] = {}
+        self._overlay_lines: List[str] = []
+        self._overlay_surface = None
+        # Профайлер включен оверлеем (а не --profile) - с оверлеем и выключается
+        self._started_by_overlay = False
+
+        self._scale_functions = {pygame.transform.scale, pygame.transform.smoothscale}
+
+    def start(self):
+        self.enabled = True
+        sys.setprofile(self._count_calls)
+
+    def stop(self):
+        self.enabled = False
+        sys.setprofile(None)
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay and not self.enabled:
+            self.start()
+            self._started_by_overlay = True
+        elif not self.overlay and self._started_by_overlay:
+            self.stop()
+            self._started_by_overlay = False
+
+    def _count_calls(self, frame, event, arg):
+        if event != "c_call":
+            return
+        owner = getattr(arg, "__self__", None)
+        name = arg.__name__
+        if name == "render" and isinstance(owner, pygame.font.Font):
+            self.frame_counts["font.render"] += 1
+        elif name in ("blit", "blits") and isinstance(owner, pygame.Surface):
+            self.frame_counts["blit"] += 1
+        elif arg in self._scale_functions:
+            self.frame_counts["transform.scale"] += 1
+
+    def section(self, name: str):
+        return _Section(self, name) if self.enabled else _NULL_SECTION
+
+    def _record(self, name: str, start: float, end: float):
+        self._current[name] = self._current.get(name, 0.0) + (end - start)
+        self.trace.append({
+            "name": name, "ph": "X", "pid": 1, "tid": 1,
+            "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6
+        })
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._frame_start = time.perf_counter()
+        self._current = {}
+        self.frame_counts = Counter()
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter()
+        self._record("frame", self._frame_start, end)
+        self.frame_times.append(end - self._frame_start)
+        for name, duration in self._current.items():
+            self.section_times.setdefault(name, deque(maxlen=self.frame_times.maxlen)).append(duration)
+        self.counts.update(self.frame_counts)
+        self.trace.append({
+            "name": "calls", "ph": "C", "pid": 1, "tid": 1,
+            "ts": (end - self._origin) * 1e6, "args": dict(self.frame_counts)
+        })
+        self.frame_index += 1
+        if self.frame_index % OVERLAY_REFRESH_FRAMES == 0:
+            self._overlay_lines = self.summary_lines()
+            self._overlay_surface = None
+
+    def summary(self) -> Dict:
+        frames = list(self.frame_times)
+        return {
+            "frames": len(frames),
+            "frame_ms": 1000 * frames[-1] if frames else 0.0,
+            "p50_ms": 1000 * _percentile(frames, 0.5),
+            "p99_ms": 1000 * _percentile(frames, 0.99),
+            "sections_p50_ms": {name: 1000 * _percentile(list(times), 0.5)
+                                for name, times in self.section_times.items() if name != "frame"},
+            "counts": dict(self.frame_counts)
+        }
+
+    def summary_lines(self) -> List[str]:
+        data = self.summary()
+        sections = sorted(data["sections_p50_ms"].items(), key=lambda item: item[1], reverse=True)
+        counts = data["counts"]
+        return [
+            f"КАДР {data['frame_ms']:.2f} МС  P50 {data['p50_ms']:.2f}  P99 {data['p99_ms']:.2f}",
+            "  ".join(f"{name} {ms:.2f}" for name, ms in sections[:4]),
+            f"RENDER {counts.get('font.render', 0)}  SCALE {counts.get('transform.scale', 0)}  "
+            f"BLIT {counts.get('blit', 0)}"
+        ]
+
+    def overlay_surface(self, font) -> pygame.Surface:
+        if self._overlay_surface is None:
+            lines = self._overlay_lines or ["ПРОФАЙЛЕР: СБОР ДАННЫХ..."]
+            rendered = [font.render(line, True, (255, 255, 0)) for line in lines]
+            width = max(surface.get_width() for surface in rendered) + 10
+            height = sum(surface.get_height() for surface in rendered) + 10
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 190))
+            y = 5
+            for line in rendered:
+                surface.blit(line, (5, y))
+                y += line.get_height()
+            self._overlay_surface = surface
+        return self._overlay_surface
+
+    def overlay_signature(self):
+        return tuple(self._overlay_lines)
+
+    def export_chrome_trace(self, path: str):
+        data = {"traceEvents": list(self.trace), "displayTimeUnit": "ms"}
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+# Общий профайлер игры
+profiler = FrameProfiler()
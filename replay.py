@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import pygame
+
+from search_ai import search_worker
+
+# Запись и воспроизведение игровых сессий. Запись - это зерно генератора случайных чисел
+# и поток событий pygame по кадрам вместе со временем кадра. Вся логика кадра читает
+# одно время (SpaceWarGame.frame_time), поэтому воспроизведение без окна и без пауз дает
+# те же броски кубиков, ходы врага и итоги боев. Для проверки в запись попадает сводка
+# состояния логики на каждом кадре, где она поменялась.
+#
+# Формат - JSON по строке: заголовок, затем кадры [время, события] или
+# [время, события, сводка], в конце {"end": сводка, "frames": число кадров}.
+
+FORMAT_VERSION = 1
+RECORDED_EVENTS = {pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.MOUSEWHEEL,
+                   pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED}
+
+
+def logic_signature(game) -> List:
+    # Только то, что определяет исход: отрисовка и таблица лидеров сюда не входят
+    player, enemy = game.player, game.current_enemy
+    return [
+        game.state, game.nickname, game.selected_weapon,
+        None if player is None else [player.name, player.current_hp, player.wins, player.turn],
+        None if enemy is None else [enemy.name, enemy.current_hp, enemy.turn]
+    ]
+
+
+def encode_event(event) -> List:
+    attrs = {}
+    for name, value in event.dict.items():
+        if isinstance(value, tuple):
+            attrs[name] = list(value)
+        elif isinstance(value, (int, float, str)):
+            attrs[name] = value
+    return [event.type, attrs]
+
+def decode_event(data: List):
+    event_type, attrs = data
+    return pygame.event.Event(event_type, {name: tuple(value) if isinstance(value, list) else value
+                                           for name, value in attrs.items()})
+
+
+class SessionRecorder:
+    def __init__(self, path: str, seed: Optional[int] = None):
+        self.path = path
+        self.seed = int.from_bytes(os.urandom(4), "little") if seed is None else seed
+        self.frames = 0
+        self._last_signature = None
+        self._file = open(path, "w")
+        self._file.write(json.dumps({"version": FORMAT_VERSION, "seed": self.seed,
+                                     "pygame": pygame.version.ver, "time": time.time()}) + "\n")
+
+    def record_frame(self, frame_time: float, events, signature: List):
+        frame = [frame_time, [encode_event(event) for event in events if event.type in RECORDED_EVENTS]]
+        if signature != self._last_signature:
+            frame.append(signature)
+            self._last_signature = signature
+        self._file.write(json.dumps(frame, ensure_ascii=False) + "\n")
+        self.frames += 1
+
+    def close(self, signature: List):
+        if self._file.closed:
+            return
+        self._file.write(json.dumps({"end": signature, "frames": self.frames}, ensure_ascii=False) + "\n")
+        self._file.close()
+
+
+class ReplayDivergence(Exception):
+    pass
+
+
+class SessionReplayer:
+    def __init__(self, path: str):
+        with open(path, "r") as f:
+            self.header = json.loads(f.readline())
+            if self.header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"неподдерживаемая версия записи: {self.header.get('version')}")
+            self.frames = []
+            self.end = None
+            for line in f:
+                entry = json.loads(line)
+                if isinstance(entry, dict):
+                    self.end = entry["end"]
+                else:
+                    self.frames.append(entry)
+
+    def _check(self, game, expected: List, index: int):
+        actual = logic_signature(game)
+        if actual != expected:
+            raise ReplayDivergence(f"кадр {index}: ожидалось {expected}, получено {actual}")
+
+    def run(self, render: bool = False) -> Dict:
+        # kks импортирует этот модуль, поэтому игра подключается только здесь
+        import kks
+
+        # Тактический поиск дожидаемся; в этом режиме его бюджет - число узлов, а не время
+        search_worker.blocking = True
+        game = kks.SpaceWarGame()
+        random.seed(self.header["seed"])
+
+        state = None
+        loaded = False
+        played = 0
+        start = time.perf_counter()
+        for index, frame in enumerate(self.frames):
+            frame_time, events = frame[0], [decode_event(data) for data in frame[1]]
+            if len(frame) > 2:
+                state = frame[2][0]
+            # Кадры экрана загрузки не влияют на логику: ждем загрузчик и переходим сразу
+            if state == "loading":
+                continue
+            if not loaded:
+                while not game.loader.ready():
+                    time.sleep(0.001)
+                game.update()
+                loaded = True
+
+            game.frame_time = frame_time
+            if len(frame) > 2:
+                self._check(game, frame[2], index)
+            running = game.handle_events(events)
+            game.update()
+            if render:
+                game.draw()
+                game.present()
+            played += 1
+            if not running:
+                break
+        elapsed = time.perf_counter() - start
+
+        if self.end is not None:
+            self._check(game, self.end, len(self.frames))
+        if game.leaderboard_store:
+            game.leaderboard_store.close()
+
+        recorded = self.frames[-1][0] - self.frames[0][0] if self.frames else 0.0
+        return {
+            "frames": played,
+            "recorded_s": recorded,
+            "replay_s": elapsed,
+            "frames_per_s": played / elapsed if elapsed else 0.0,
+            "speedup": recorded / elapsed if elapsed else 0.0
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воспроизведение записанной сессии без окна")
+    parser.add_argument("session", help="файл записи (kks.py --record)")
+    parser.add_argument("--render", action="store_true", help="рисовать кадры (нагрузка на отрисовку)")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    replayer = SessionReplayer(args.session)
+    # Игра пишет базу лидеров и журналы запуска в текущий каталог - уводим их во временный
+    os.chdir(tempfile.mkdtemp(prefix="replay_"))
+    try:
+        for _ in range(args.repeat):
+            result = replayer.run(args.render)
+            print(f"кадров: {result['frames']}, сессия {result['recorded_s']:.1f} с, "
+                  f"воспроизведение {result['replay_s'] * 1000:.1f} мс "
+                  f"({result['frames_per_s']:.0f} кадров/с, x{result['speedup']:.0f})")
+    except ReplayDivergence as error:
+        print(f"РАСХОЖДЕНИЕ: {error}")
+        sys.exit(1)
+    print("совпадает с записью")
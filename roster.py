@@ -0,0 +1,145 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+from typing import Iterator, List, Optional, Tuple
+
+from battle_core import ATTACK_TYPES, ENEMY_TYPES, AttackStrategy, WeightedAttackStrategy
+from search_ai import SearchAttackStrategy, SearchWorker, attacks_differ
+
+# Ростер противников из файла данных. Каждая строка - имя, HP, веса атак и спрайт
+# (рецепт из assets.py и оттенок). Загружаются только определения: объекты Enemy и
+# спрайты создаются, когда противника выбирают или показывают в меню.
+# Накопленные веса атак считаются один раз при загрузке.
+# Колонка ai: пусто - атака по весам, "search" - тактический противник (search_ai.py);
+# пока урон атак одинаков, поиску нечего выбирать, и такой противник тоже атакует по весам.
+
+# Файл ростера поставляется вместе с игрой, поэтому ищется рядом с модулем
+ROSTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "enemies.csv")
+FIELDS = ["key", "name", "max_hp"] + ATTACK_TYPES + ["sprite", "tint", "ai"]
+
+
+class EnemyDefinition:
+    __slots__ = ("key", "name", "max_hp", "weights", "cum_weights", "sprite", "tint", "ai")
+
+    def __init__(self, key: str, name: str, max_hp: int, weights: List[float], sprite: str,
+                 tint: Optional[Tuple[int, int, int]] = None, ai: str = ""):
+        self.key = key
+        self.name = name
+        self.max_hp = max_hp
+        self.weights = weights
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.sprite = sprite
+        self.tint = tint
+        self.ai = ai
+
+    @property
+    def tactical(self) -> bool:
+        return self.ai == "search" and attacks_differ()
+
+    def strategy(self, worker: Optional[SearchWorker] = None) -> AttackStrategy:
+        # worker - рабочий поток поиска; по умолчанию общий поток игры
+        if self.tactical:
+            return SearchAttackStrategy(self.max_hp, self.weights, self.cum_weights, worker=worker)
+        return WeightedAttackStrategy(self.weights, self.cum_weights)
+
+
+def _parse_tint(value: str) -> Optional[Tuple[int, int, int]]:
+    if not value:
+        return None
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+def _format_tint(tint: Optional[Tuple[int, int, int]]) -> str:
+    return "" if tint is None else "".join(f"{channel:02x}" for channel in tint)
+
+
+class EnemyRoster:
+    def __init__(self, definitions: List[EnemyDefinition]):
+        self.definitions = definitions
+        self._by_key = {definition.key: definition for definition in definitions}
+
+    @classmethod
+    def load(cls, path: str = ROSTER_PATH) -> "EnemyRoster":
+        definitions = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                definitions.append(EnemyDefinition(
+                    row["key"], row["name"], int(row["max_hp"]),
+                    [float(row[attack]) for attack in ATTACK_TYPES],
+                    row["sprite"], _parse_tint(row["tint"]), row.get("ai") or ""
+                ))
+        return cls(definitions)
+
+    def save(self, path: str = ROSTER_PATH):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(FIELDS)
+            for d in self.definitions:
+                writer.writerow([d.key, d.name, d.max_hp] + [f"{w:g}" for w in d.weights] +
+                                [d.sprite, _format_tint(d.tint), d.ai])
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    def __iter__(self) -> Iterator[EnemyDefinition]:
+        return iter(self.definitions)
+
+    def find(self, key: str) -> EnemyDefinition:
+        return self._by_key[key]
+
+    def pages(self, page_size: int) -> int:
+        return max(1, (len(self.definitions) + page_size - 1) // page_size)
+
+    def page(self, number: int, page_size: int) -> List[EnemyDefinition]:
+        start = number * page_size
+        return self.definitions[start:start + page_size]
+
+
+# Генератор ростера: два исходных противника и случайные корабли из классов и имен.
+# Дредноуты - тактические противники
+SHIP_CLASSES = [("КОРВЕТ", 80, 140, "enemy1", ""), ("ЭСМИНЕЦ", 100, 170, "enemy1", ""),
+                ("ФРЕГАТ", 120, 200, "enemy1", ""), ("КРЕЙСЕР", 160, 260, "enemy2", ""),
+                ("ЛИНКОР", 200, 320, "enemy2", ""), ("ДРЕДНОУТ", 260, 400, "enemy2", "search")]
+SHIP_NAMES = ["МОЛНИЯ", "ТИТАН", "ГРОЗА", "ВИХРЬ", "КОМЕТА", "ОРИОН", "СИРИУС", "ВЕГА", "ФЕНИКС",
+              "ГИДРА", "КРАКЕН", "ЦИКЛОН", "АТЛАС", "ЗЕНИТ", "РУБИН", "ИЗУМРУД", "СТРЕЛА", "ЯСТРЕБ",
+              "БУРАН", "МЕТЕОР", "ПУЛЬСАР", "КВАЗАР", "НОВА", "ТАЙФУН", "ГРАНИТ", "АНТАРЕС",
+              "ПЕГАС", "ДРАКОН", "ВОЛК", "МИРАЖ", "ШТОРМ", "АЛМАЗ", "ГЕРМЕС", "ПЛУТОН", "ТРИТОН",
+              "КЕНТАВР", "ГРИФОН", "ЯГУАР", "КОБРА", "ПАНТЕРА", "СОКОЛ", "БЕРКУТ", "ОБЕРОН",
+              "ТОРНАДО", "ЦЕРБЕР", "АРГУС", "ВУЛКАН", "ПРОТОН", "АЛЬТАИР", "ДЕНЕБ", "ПОЛЯРИС",
+              "ЭРИДАН", "КАСТОР", "ПОЛЛУКС"]
+
+def generate(count: int, seed: int = 0) -> EnemyRoster:
+    rng = random.Random(seed)
+    definitions = []
+    for key, enemy in ENEMY_TYPES.items():
+        sprite = "enemy1" if key == "fast" else "enemy2"
+        definitions.append(EnemyDefinition(key, enemy["name"], enemy["max_hp"],
+                                           list(enemy["strategy"].weights), sprite))
+    names = [(ship_class, name) for ship_class in SHIP_CLASSES for name in SHIP_NAMES]
+    rng.shuffle(names)
+    taken = {definition.name for definition in definitions}
+    for (ship_class, low, high, sprite, ai), name in names:
+        if len(definitions) >= count:
+            break
+        full_name = f"{ship_class} '{name}'"
+        if full_name in taken:
+            continue
+        raw = [rng.randint(1, 6) for _ in ATTACK_TYPES]
+        weights = [round(value / sum(raw), 2) for value in raw]
+        tint = tuple(rng.randint(120, 255) for _ in range(3))
+        definitions.append(EnemyDefinition(f"e{len(definitions):04d}", full_name,
+                                           rng.randrange(low, high + 1, 10), weights, sprite, tint, ai))
+    return EnemyRoster(definitions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация файла ростера противников")
+    parser.add_argument("-n", "--count", type=int, default=300)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=ROSTER_PATH)
+    args = parser.parse_args()
+
+    roster = generate(args.count, args.seed)
+    roster.save(args.output)
+    print(f"записано противников: {len(roster)} -> {args.output}")
@@ -0,0 +1,353 @@
+import argparse
+import bisect
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from battle_core import (
+    ACTIONS, ATTACK_TYPES, DODGE_FAIL_DAMAGE, ENEMY_DAMAGE, IGNORE_DAMAGE, PLAYER_HURT_RESULTS, PLAYER_MAX_HP,
+    POLICIES, WEAPONS, WeightedAttackStrategy, roll_player_action
+)
+from solver import CHOICES, SolvedBattle, solve
+
+# Тактический противник: атака выбирается поиском expectimax по правилам боя.
+# Враг максимизирует свой шанс победы, игрок отвечает лучшим для себя ходом, броски
+# урона - узлы ожидания. Глубина - число ходов врага вперед; листья оцениваются
+# таблицами точного решателя (solver.py). Значение позиции не зависит от того, как
+# мы в нее пришли, поэтому таблица транспозиций (hp игрока, hp врага, глубина)
+# живет в планировщике и переиспользуется между ходами и боями с тем же противником.
+# Урон атак - по правилам игры (ATTACK_DAMAGE), как и в таблицах листьев; равные по
+# значению атаки разыгрываются по весам ростера. Сейчас урон от типа атаки не зависит,
+# выбирать поиску нечего, и ростер дает таким противникам выбор по весам (attacks_differ).
+#
+# Поиск идет в рабочем потоке с бюджетом времени и итеративным углублением: у задачи
+# всегда есть лучший ход последней завершенной глубины. Игра только спрашивает
+# ready() и забирает результат - кадр поиска не ждет. Прогоны без окна (воспроизведение,
+# soak) ждут поиск, а бюджет у них - число узлов, а не время: результат один и тот же
+# при любой загрузке машины.
+
+SEARCH_BUDGET = 0.8
+MAX_DEPTH = 4
+NODE_BUDGET = 20000
+# Проверка бюджета раз в столько узлов
+CHECK_EVERY = 256
+# Атаки, чьи значения ближе этого, считаются равными
+TIE = 1e-9
+# Урон каждой атаки по правилам игры: сейчас у всех один ENEMY_DAMAGE
+ATTACK_DAMAGE = {attack: ENEMY_DAMAGE for attack in ATTACK_TYPES}
+# Таблица транспозиций чистится целиком, когда разрастается
+TRANSPOSITION_LIMIT = 400000
+
+
+class SearchAborted(Exception):
+    pass
+
+
+def _spread(low: int, high: int) -> Tuple[List[int], float]:
+    return list(range(low, high + 1)), 1.0 / (high - low + 1)
+
+
+def attacks_differ(damage: Dict[str, Tuple[int, int]] = ATTACK_DAMAGE) -> bool:
+    # Поиску есть из чего выбирать, только если исходы атак различаются
+    return len(set(damage.values())) > 1
+
+
+class PlanJob:
+    def __init__(self, planner_factory: Callable[[Dict], "ExpectimaxPlanner"], player_hp: int, enemy_hp: int,
+                 budget: float, max_depth: int, node_budget: Optional[int] = None):
+        self.planner_factory = planner_factory
+        self.player_hp = player_hp
+        self.enemy_hp = enemy_hp
+        self.max_depth = max_depth
+        # Бюджет - число узлов, если задан, иначе время от постановки задачи, включая ожидание в очереди
+        self.node_budget = node_budget
+        self.deadline = time.perf_counter() + budget
+        self.cancelled = False
+        self.done = threading.Event()
+        # Результат последней завершенной глубины: лучшая атака и значения всех атак
+        self.best: Optional[str] = None
+        self.value: Optional[float] = None
+        self.values: Dict[str, float] = {}
+        self.depth = 0
+        self.nodes = 0
+        self.elapsed = 0.0
+
+    def run(self, planners: Dict):
+        start = time.perf_counter()
+        try:
+            if not self.cancelled:
+                self.planner_factory(planners).search(self)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.done.set()
+
+    def over_budget(self) -> bool:
+        if self.cancelled:
+            return True
+        if self.node_budget is not None:
+            return self.nodes > self.node_budget
+        return time.perf_counter() > self.deadline
+
+
+class ExpectimaxPlanner:
+    # Исходы хода игрока, бросающего кубик урона по себе
+    _dodge = _spread(*DODGE_FAIL_DAMAGE)
+    _ignore = _spread(*IGNORE_DAMAGE)
+    _dodge_chance = ACTIONS["dodge"]["chance"]
+
+    def __init__(self, leaf: SolvedBattle):
+        self.leaf = leaf
+        self.attacks = [(attack, *_spread(*ATTACK_DAMAGE[attack])) for attack in ATTACK_TYPES]
+        self.enemy_table: Dict[Tuple[int, int, int], float] = {}
+        self.player_table: Dict[Tuple[int, int, int], float] = {}
+        self.hits = 0
+        self.searches = 0
+
+    def _attack_values(self, job: PlanJob, p: int, e: int, depth: int) -> List[float]:
+        # Ход врага: значение каждой атаки - среднее по броскам урона
+        return [chance * sum(1.0 if p <= d else self._player_value(job, p - d, e, depth - 1) for d in damages)
+                for attack, damages, chance in self.attacks]
+
+    def _enemy(self, job: PlanJob, p: int, e: int, depth: int) -> float:
+        key = (p, e, depth)
+        value = self.enemy_table.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        job.nodes += 1
+        if job.nodes % CHECK_EVERY == 0 and job.over_budget():
+            raise SearchAborted()
+        value = max(self._attack_values(job, p, e, depth))
+        self.enemy_table[key] = value
+        return value
+
+    def _player_value(self, job: PlanJob, p: int, e: int, depth: int) -> float:
+        # Ход игрока (значение - шанс победы врага): игрок выбирает лучший для себя ход
+        if depth == 0:
+            return 1.0 - self.leaf.win_probability(p, e)
+        key = (p, e, depth)
+        value = self.player_table.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        stay = self._enemy(job, p, e, depth)
+        dodge_damages, dodge_p = self._dodge
+        ignore_damages, ignore_p = self._ignore
+        value = 1.0
+        for action, weapon in CHOICES:
+            if action == "attack":
+                chance = WEAPONS[weapon]["chance"]
+                left = e - WEAPONS[weapon]["damage"]
+                hit = 0.0 if left <= 0 else self._enemy(job, p, left, depth)
+                option = chance * hit + (1 - chance) * stay
+            elif action == "dodge":
+                hurt = dodge_p * sum(1.0 if p <= d else self._enemy(job, p - d, e, depth) for d in dodge_damages)
+                option = self._dodge_chance * stay + (1 - self._dodge_chance) * hurt
+            else:
+                option = ignore_p * sum(1.0 if p <= d else self._enemy(job, p - d, e, depth) for d in ignore_damages)
+            value = min(value, option)
+        self.player_table[key] = value
+        return value
+
+    def search(self, job: PlanJob):
+        self.searches += 1
+        if len(self.enemy_table) + len(self.player_table) > TRANSPOSITION_LIMIT:
+            self.enemy_table.clear()
+            self.player_table.clear()
+        # Итеративное углубление: после каждой глубины у задачи есть готовый ход
+        for depth in range(1, job.max_depth + 1):
+            try:
+                values = self._attack_values(job, job.player_hp, job.enemy_hp, depth)
+            except SearchAborted:
+                return
+            job.value = max(values)
+            job.best = ATTACK_TYPES[values.index(job.value)]
+            job.values = dict(zip(ATTACK_TYPES, values))
+            job.depth = depth
+
+
+def planner_for(planners: Dict[int, ExpectimaxPlanner], enemy_max_hp: int) -> ExpectimaxPlanner:
+    planner = planners.get(enemy_max_hp)
+    if planner is None:
+        # Таблицы решателя те же, что игра берет для шанса победы, - обычно уже в памяти
+        planner = planners[enemy_max_hp] = ExpectimaxPlanner(solve(enemy_max_hp))
+    return planner
+
+
+class SearchWorker:
+    def __init__(self, supersede: bool = True):
+        self._cond = threading.Condition()
+        self._queue: Deque[PlanJob] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+        # Игра ведет один бой: новая задача отменяет еще не начатую. Сервер боев ставит
+        # задачи разных сессий в очередь и чужие не отменяет (supersede=False)
+        self.supersede = supersede
+        # Планировщики по hp противника; создаются и используются только потоком этого рабочего
+        self.planners: Dict[int, ExpectimaxPlanner] = {}
+        # Прогоны без окна (воспроизведение, soak) ждут поиск; бюджет у них - узлы, а не время
+        self.blocking = False
+
+    def submit(self, job: PlanJob):
+        with self._cond:
+            if self.supersede:
+                # Еще не начатая задача устарела: на ее место встает новая
+                for pending in self._queue:
+                    pending.cancelled = True
+                    pending.done.set()
+                self._queue.clear()
+            self._queue.append(job)
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="enemy-search", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+            try:
+                job.run(self.planners)
+            except Exception as e:
+                # Ошибка поиска не должна останавливать поток: задача закончится без хода
+                self.error = e
+
+
+# Общий рабочий поток поиска для всех тактических противников
+search_worker = SearchWorker()
+
+
+class SearchAttackStrategy(WeightedAttackStrategy):
+    def __init__(self, enemy_max_hp: int, weights: Optional[List[float]] = None,
+                 cum_weights: Optional[List[float]] = None, budget: float = SEARCH_BUDGET,
+                 max_depth: int = MAX_DEPTH, node_budget: int = NODE_BUDGET, worker: Optional[SearchWorker] = None):
+        # Веса разыгрывают равноценные атаки и остаются запасным выбором,
+        # если поиск не успел ни одной глубины
+        super().__init__(weights, cum_weights)
+        self.enemy_max_hp = enemy_max_hp
+        self.budget = budget
+        self.max_depth = max_depth
+        self.node_budget = node_budget
+        self.worker = worker or search_worker
+        self.job: Optional[PlanJob] = None
+        self.last_job: Optional[PlanJob] = None
+        self.fallbacks = 0
+
+    def _planner(self, planners: Dict) -> ExpectimaxPlanner:
+        return planner_for(planners, self.enemy_max_hp)
+
+    def plan(self, player_hp: int, enemy_hp: int):
+        self.job = PlanJob(self._planner, player_hp, enemy_hp, self.budget, self.max_depth,
+                           self.node_budget if self.worker.blocking else None)
+        self.worker.submit(self.job)
+
+    def ready(self) -> bool:
+        job = self.job
+        if job is None:
+            return True
+        if self.worker.blocking:
+            job.done.wait()
+        return job.done.is_set()
+
+    def choose_attack(self, rng=random) -> str:
+        job, self.job = self.job, None
+        if job is not None:
+            # Незаконченный поиск больше не нужен: освобождаем поток
+            job.cancelled = True
+            self.last_job = job
+            if job.best is not None:
+                return self._break_tie(job, rng)
+        self.fallbacks += 1
+        return super().choose_attack(rng)
+
+    def _break_tie(self, job: PlanJob, rng) -> str:
+        # Из равных по значению атак - по весам; одно случайное число, как у выбора по весам
+        tied = [i for i, attack in enumerate(ATTACK_TYPES) if job.values[attack] >= job.value - TIE]
+        if len(tied) == 1:
+            return ATTACK_TYPES[tied[0]]
+        cum_weights = list(itertools.accumulate(self.weights[i] for i in tied))
+        return ATTACK_TYPES[tied[bisect.bisect(cum_weights, rng.random() * cum_weights[-1])]]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def benchmark(battles: int, enemy_max_hp: int = 200, policy: str = "random", seed: int = 0,
+              budget: float = SEARCH_BUDGET, max_depth: int = MAX_DEPTH, node_budget: Optional[int] = None) -> Dict:
+    # Бои без отрисовки: тактический враг против врага с теми же атаками, но случайным выбором.
+    # Поиск зовется синхронно, как его выполнил бы рабочий поток
+    weights = [1 / 3] * len(ATTACK_TYPES)
+    planners = {}
+    results = {}
+    for mode in ("search", "weighted"):
+        rng = random.Random(seed)
+        strategy = SearchAttackStrategy(enemy_max_hp, weights, budget=budget, max_depth=max_depth)
+        wins = turns = 0
+        times, depths, nodes = [], [], []
+        for _ in range(battles):
+            player_hp, enemy_hp = PLAYER_MAX_HP, enemy_max_hp
+            while player_hp > 0 and enemy_hp > 0:
+                action, weapon = POLICIES[policy](player_hp, enemy_hp, rng)
+                result, damage = roll_player_action(action, weapon, rng=rng)
+                if result == "attack_success":
+                    enemy_hp = max(0, enemy_hp - damage)
+                elif result in PLAYER_HURT_RESULTS:
+                    player_hp = max(0, player_hp - damage)
+                if player_hp <= 0 or enemy_hp <= 0:
+                    break
+                if mode == "search":
+                    job = PlanJob(strategy._planner, player_hp, enemy_hp, budget, max_depth, node_budget)
+                    job.run(planners)
+                    strategy.job = job
+                    times.append(job.elapsed)
+                    depths.append(job.depth)
+                    nodes.append(job.nodes)
+                attack = strategy.choose_attack(rng)
+                player_hp = max(0, player_hp - strategy.roll_damage(attack, rng))
+                turns += 1
+            wins += player_hp <= 0
+        planner = strategy._planner(planners)
+        results[mode] = {
+            "battles": battles,
+            "enemy_win_rate": wins / battles,
+            "turns": turns,
+            "think_p50_ms": 1000 * _percentile(times, 0.5),
+            "think_p99_ms": 1000 * _percentile(times, 0.99),
+            "mean_depth": sum(depths) / len(depths) if depths else 0,
+            "nodes_p50": _percentile(nodes, 0.5),
+            "nodes_max": max(nodes, default=0),
+            "fallbacks": strategy.fallbacks if mode == "search" else None,
+            "transpositions": len(planner.enemy_table) + len(planner.player_table),
+            "cache_hits": planner.hits
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер тактического ИИ противника")
+    parser.add_argument("-n", "--battles", type=int, default=200)
+    parser.add_argument("--hp", type=int, default=200, help="hp противника")
+    parser.add_argument("-p", "--policy", choices=list(POLICIES), default="random")
+    parser.add_argument("-d", "--depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("-b", "--budget", type=float, default=SEARCH_BUDGET, help="бюджет хода, с")
+    parser.add_argument("-N", "--nodes", type=int, help="бюджет хода в узлах вместо времени")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not attacks_differ():
+        print("урон атак одинаков: в игре поиск не запускается, значения атак равны")
+    report = benchmark(args.battles, args.hp, args.policy, args.seed, args.budget, args.depth, args.nodes)
+    for mode, row in report.items():
+        line = f"{mode:<9} побед врага {100 * row['enemy_win_rate']:.1f}% за {row['battles']} боев"
+        if mode == "search":
+            line += (f", ход p50 {row['think_p50_ms']:.1f} мс, p99 {row['think_p99_ms']:.1f} мс, "
+                     f"глубина {row['mean_depth']:.2f}, узлов p50 {row['nodes_p50']:.0f}, max {row['nodes_max']}, "
+                     f"запасных ходов {row['fallbacks']}, "
+                     f"транспозиций {row['transpositions']}, попаданий в кэш {row['cache_hits']}")
+        print(line)
@@ -0,0 +1,45 @@
+import time
+from typing import Optional
+
+# Игровые часы. Все фазы (ход врага, таймауты текстов и реплик) считаются по времени
+# этих часов, а не по настенному. Режимы:
+#  - реальное время, умноженное на speed (speed=1 - обычная игра, 8 - перемотка);
+#  - фиксированный шаг: каждый кадр сдвигает время ровно на timestep * speed,
+#    независимо от того, сколько кадр шел на самом деле (детерминированные прогоны);
+#  - max_speed: фиксированный шаг без ограничения частоты кадров - цикл не спит,
+#    и прогон без окна идет так быстро, как позволяет процессор.
+
+
+class SimClock:
+    def __init__(self, speed: float = 1.0, timestep: Optional[float] = None,
+                 max_speed: bool = False, start: Optional[float] = None):
+        if speed <= 0:
+            raise ValueError(f"множитель скорости должен быть положительным: {speed}")
+        if max_speed and timestep is None:
+            raise ValueError("режиму max_speed нужен фиксированный шаг")
+        self.speed = speed
+        self.timestep = timestep
+        self.max_speed = max_speed
+        self.frames = 0
+        self._base = time.time() if start is None else start
+        self._wall = time.perf_counter()
+
+    def now(self) -> float:
+        if self.timestep is not None:
+            return self._base
+        return self._base + (time.perf_counter() - self._wall) * self.speed
+
+    def tick(self) -> float:
+        # Начало кадра: время, которое прочитает вся логика этого кадра
+        if self.timestep is not None and self.frames:
+            self._base += self.timestep * self.speed
+        self.frames += 1
+        return self.now()
+
+    def set_speed(self, speed: float):
+        if speed <= 0:
+            raise ValueError(f"множитель скорости должен быть положительным: {speed}")
+        # Перенос точки отсчета, чтобы время не прыгнуло при смене скорости
+        self._base = self.now()
+        self._wall = time.perf_counter()
+        self.speed = speed
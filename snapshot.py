@@ -0,0 +1,307 @@
+import argparse
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from battle_core import ATTACK_TYPES, WEAPONS
+
+# Снимок игры для приостановки, продолжения и восстановления после сбоя.
+# Двоичный формат: заголовок (сигнатура, версия, длина, CRC32 тела), затем тело -
+# поля фиксированной длины и строки с длиной впереди. Времена хранятся как "сколько
+# прошло" к моменту снимка: игровые часы после перезапуска идут от другой точки.
+# Снимок кодируется в кадре (микросекунды), а пишет его на диск рабочий поток:
+# временный файл + fsync + os.replace, из очереди берется только последний снимок.
+# Продолжать есть смысл только незаконченный бой: когда бой кончился или игрок вышел
+# из меню, тот же поток удаляет файл, и следующий запуск начинается с никнейма.
+
+SNAPSHOT_PATH = "snapshot.bin"
+MAGIC = b"KKSS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+# экран, оружие, страница меню, раунд, победы, hp игрока, hp врага, чей ход (игрок, враг),
+# фазы хода врага, атака, сколько прошло от хода игрока, от хода врага, от реплики врага
+BODY = struct.Struct("<BBHHIhhBBBbfff")
+LENGTH = struct.Struct("<H")
+
+# Экран в снимке; продолжается только "battle", "menu" остался для разбора старых файлов
+STATES = ("menu", "battle")
+WEAPON_CODES = tuple(WEAPONS)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class GameSnapshot:
+    __slots__ = ("state", "nickname", "wins", "weapon", "enemy_page", "round", "player_hp", "player_turn",
+                 "player_text", "player_age", "enemy", "enemy_hp", "enemy_turn", "phase", "attack",
+                 "enemy_text", "enemy_age", "speech_text", "speech_age")
+
+    def __init__(self, state: str = "menu", nickname: str = "", wins: int = 0, weapon: str = "laser",
+                 enemy_page: int = 0, round: int = 0, player_hp: int = 0, player_turn: bool = False,
+                 player_text: str = "", player_age: float = 0.0, enemy: str = "", enemy_hp: int = 0,
+                 enemy_turn: bool = False, phase: int = 0, attack: Optional[str] = None, enemy_text: str = "",
+                 enemy_age: float = 0.0, speech_text: str = "", speech_age: float = 0.0):
+        self.state = state
+        self.nickname = nickname
+        self.wins = wins
+        self.weapon = weapon
+        self.enemy_page = enemy_page
+        self.round = round
+        self.player_hp = player_hp
+        self.player_turn = player_turn
+        self.player_text = player_text
+        self.player_age = player_age
+        # Ключ противника в ростере; пустой - боя нет
+        self.enemy = enemy
+        self.enemy_hp = enemy_hp
+        self.enemy_turn = enemy_turn
+        self.phase = phase
+        self.attack = attack
+        self.enemy_text = enemy_text
+        self.enemy_age = enemy_age
+        self.speech_text = speech_text
+        self.speech_age = speech_age
+
+    def encode(self) -> bytes:
+        body = bytearray(BODY.pack(
+            STATES.index(self.state), WEAPON_CODES.index(self.weapon), self.enemy_page, self.round, self.wins,
+            self.player_hp, self.enemy_hp, self.player_turn, self.enemy_turn, self.phase,
+            -1 if self.attack is None else ATTACK_TYPES.index(self.attack),
+            self.player_age, self.enemy_age, self.speech_age))
+        for text in (self.nickname, self.enemy, self.player_text, self.enemy_text, self.speech_text):
+            data = text.encode("utf-8")
+            body += LENGTH.pack(len(data))
+            body += data
+        return HEADER.pack(MAGIC, VERSION, len(body), zlib.crc32(body)) + body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "GameSnapshot":
+        if len(data) < HEADER.size:
+            raise SnapshotError("снимок обрезан")
+        magic, version, length, checksum = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise SnapshotError("не файл снимка")
+        if version != VERSION:
+            raise SnapshotError(f"неизвестная версия снимка: {version}")
+        body = memoryview(data)[HEADER.size:]
+        if len(body) != length or zlib.crc32(body) != checksum:
+            raise SnapshotError("снимок поврежден")
+        try:
+            (state, weapon, enemy_page, round, wins, player_hp, enemy_hp, player_turn, enemy_turn, phase, attack,
+             player_age, enemy_age, speech_age) = BODY.unpack_from(body)
+            texts, offset = [], BODY.size
+            for _ in range(5):
+                size, = LENGTH.unpack_from(body, offset)
+                offset += LENGTH.size
+                texts.append(bytes(body[offset:offset + size]).decode("utf-8"))
+                offset += size
+            return cls(STATES[state], texts[0], wins, WEAPON_CODES[weapon], enemy_page, round, player_hp,
+                       bool(player_turn), texts[2], player_age, texts[1], enemy_hp, bool(enemy_turn), phase,
+                       None if attack < 0 else ATTACK_TYPES[attack], texts[3], enemy_age, texts[4], speech_age)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise SnapshotError(f"снимок поврежден: {e}")
+
+
+def capture(game) -> Optional[GameSnapshot]:
+    # Снимок текущей игры; до ввода никнейма сохранять нечего
+    player = game.player
+    if player is None:
+        return None
+    now = game.frame_time
+    snapshot = GameSnapshot("menu", player.name, player.wins, game.selected_weapon, game.enemy_page)
+    enemy = game.current_enemy
+    if game.state == "battle" and enemy is not None:
+        snapshot.state = "battle"
+        snapshot.round = game.battle_log.round if game.battle_log else 0
+        snapshot.player_hp = player.current_hp
+        snapshot.player_turn = player.turn
+        snapshot.player_text = player.action_text
+        snapshot.player_age = now - player.action_time
+        snapshot.enemy = game.enemy_definition.key
+        snapshot.enemy_hp = enemy.current_hp
+        snapshot.enemy_turn = enemy.turn
+        snapshot.phase = enemy.phase
+        snapshot.attack = enemy.attack
+        snapshot.enemy_text = enemy.action_text
+        snapshot.enemy_age = now - enemy.action_time
+        snapshot.speech_text = enemy.speech_text
+        snapshot.speech_age = now - enemy.speech_time
+    return snapshot
+
+
+def load(path: str = SNAPSHOT_PATH) -> Optional[GameSnapshot]:
+    # Нечитаемый или битый снимок - то же, что его отсутствие: игра начинается заново
+    try:
+        with open(path, "rb") as f:
+            return GameSnapshot.decode(f.read())
+    except (OSError, SnapshotError):
+        return None
+
+
+def write_file(path: str, data: bytes):
+    # Снимок на диске всегда целый: либо старый, либо новый
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def remove_file(path: str):
+    for name in (path, path + ".tmp"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotWriter:
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+        self._cond = threading.Condition()
+        self._pending: Optional[bytes] = None
+        self._writing = False
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+        # Счетчики: снимков сдано, записано на диск, удалено, заменено более свежим до записи
+        self.saves = 0
+        self.writes = 0
+        self.removes = 0
+        self.coalesced = 0
+
+    def save(self, snapshot: GameSnapshot):
+        self.saves += 1
+        self._submit(snapshot.encode())
+
+    def clear(self):
+        # Пустые данные - удалить файл; порядок с записями сохраняется, последнее слово за свежим
+        self._submit(b"")
+
+    def _submit(self, data: bytes):
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = data
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                data, self._pending = self._pending, None
+                self._writing = True
+            try:
+                if data:
+                    write_file(self.path, data)
+                    self.writes += 1
+                else:
+                    remove_file(self.path)
+                    self.removes += 1
+            except OSError as e:
+                # Не записался - следующий снимок попробует снова, игра продолжается
+                self.error = e
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def flush(self):
+        with self._cond:
+            while self._pending is not None or self._writing:
+                self._cond.wait()
+
+    def stats(self) -> Dict[str, int]:
+        return {"saves": self.saves, "writes": self.writes, "removes": self.removes, "coalesced": self.coalesced}
+
+
+def _sample() -> GameSnapshot:
+    # Середина хода врага: атака выбрана, урон еще нет
+    return GameSnapshot("battle", "ИГРОК", 7, "ion", 3, 4, 95, False, "ПРЯМОЙ УДАР ПРОШЕЛ УСПЕШНО! -25 HP", 1.2,
+                        "e0009", 140, True, 1, "laser", "ДРЕДНОУТ 'ГРОЗА' ИСПОЛЬЗУЕТ ЛАЗЕР!", 1.2,
+                        "ПОЛУЧАЙ ЛАЗЕРНЫЙ ЛУЧ!", 1.2)
+
+
+def benchmark(iterations: int, writes: int) -> Dict:
+    snapshot = _sample()
+    data = snapshot.encode()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        snapshot.encode()
+    encode_s = (time.perf_counter() - start) / iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        GameSnapshot.decode(data)
+    decode_s = (time.perf_counter() - start) / iterations
+
+    # Для сравнения - те же поля словарем через pickle
+    fields = {name: getattr(snapshot, name) for name in GameSnapshot.__slots__}
+    pickled = pickle.dumps(fields, pickle.HIGHEST_PROTOCOL)
+
+    directory = tempfile.mkdtemp(prefix="snapshot_")
+    path = os.path.join(directory, SNAPSHOT_PATH)
+    times = []
+    for _ in range(writes):
+        start = time.perf_counter()
+        write_file(path, data)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    start = time.perf_counter()
+    for _ in range(writes):
+        load(path)
+    load_s = (time.perf_counter() - start) / writes
+
+    # Цена сохранения для кадра: кодирование и передача потоку записи
+    writer = SnapshotWriter(path)
+    frame_times = []
+    for _ in range(writes):
+        start = time.perf_counter()
+        writer.save(snapshot)
+        frame_times.append(time.perf_counter() - start)
+    writer.flush()
+    frame_times.sort()
+    return {
+        "bytes": len(data),
+        "pickle_bytes": len(pickled),
+        "encode_us": 1e6 * encode_s,
+        "decode_us": 1e6 * decode_s,
+        "load_us": 1e6 * load_s,
+        "write_p50_ms": 1000 * times[len(times) // 2],
+        "write_p99_ms": 1000 * times[min(len(times) - 1, int(0.99 * len(times)))],
+        "save_in_frame_p50_us": 1e6 * frame_times[len(frame_times) // 2],
+        "save_in_frame_p99_us": 1e6 * frame_times[min(len(frame_times) - 1, int(0.99 * len(frame_times)))],
+        "writer": writer.stats()
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Снимки игры: размер и время сохранения и загрузки")
+    parser.add_argument("path", nargs="?", help="показать содержимое снимка вместо замера")
+    parser.add_argument("-n", "--iterations", type=int, default=100000)
+    parser.add_argument("-w", "--writes", type=int, default=200, help="записей на диск с fsync")
+    args = parser.parse_args()
+
+    if args.path:
+        snapshot = load(args.path)
+        if snapshot is None:
+            print(f"снимка нет: {args.path}")
+        else:
+            for name in GameSnapshot.__slots__:
+                print(f"{name:12s} {getattr(snapshot, name)!r}")
+    else:
+        report = benchmark(args.iterations, args.writes)
+        print(f"размер: {report['bytes']} байт (pickle тех же полей: {report['pickle_bytes']} байт)")
+        print(f"кодирование {report['encode_us']:.2f} мкс, разбор {report['decode_us']:.2f} мкс, "
+              f"чтение файла с разбором {report['load_us']:.1f} мкс")
+        print(f"запись с fsync: p50 {report['write_p50_ms']:.3f} мс, p99 {report['write_p99_ms']:.3f} мс")
+        print(f"сохранение в кадре (кодирование + передача потоку): p50 {report['save_in_frame_p50_us']:.1f} мкс, "
+              f"p99 {report['save_in_frame_p99_us']:.1f} мкс; {report['writer']}")
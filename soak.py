@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import kks
+from search_ai import search_worker
+from sim_clock import SimClock
+
+# Автоматический прогон игры без окна: бот проходит бои через обычные handle_click и
+# update, а игровое время идет по часам с фиксированным шагом без ожидания.
+# Паузы хода врага (1.5 и 2.5 с) проходят за несколько миллисекунд настенного времени.
+
+
+class AutoPlayer:
+    def __init__(self, battles: int, seed: int = 0, render: bool = False, timestep: float = 1 / kks.FPS):
+        self.battles = battles
+        self.seed = seed
+        self.render = render
+        self.timestep = timestep
+
+    def _click(self, game, rect):
+        game.handle_events([pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=rect.center, button=1)])
+
+    def _act(self, game, rng: random.Random):
+        if game.state == "nickname":
+            game.nickname = "SOAK"
+            game.handle_events([pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, unicode="\r", mod=0)])
+        elif game.state == "menu":
+            self._click(game, rng.choice([widget for widget in game.enemy_buttons if widget.enabled]).rect)
+        elif game.state == "battle" and game.player.turn:
+            self._click(game, rng.choice(game.weapon_buttons).rect)
+            # В основном прямой удар, иногда уворот или игнор
+            action = rng.choices(game.action_buttons, weights=[1, 8, 1])[0]
+            self._click(game, action.rect)
+        elif game.state == "game_over":
+            self._click(game, game.menu_button.rect)
+
+    def run(self) -> Dict:
+        random.seed(self.seed)
+        rng = random.Random(self.seed)
+        game = kks.SpaceWarGame()
+        # Игровое время летит без ожидания: тактический поиск дожидаемся, бюджет у него - узлы
+        search_worker.blocking = True
+        game.sim_clock = SimClock(timestep=self.timestep, max_speed=True)
+        while not game.loader.ready():
+            time.sleep(0.001)
+
+        battles = wins = frames = 0
+        sim_start = game.sim_clock.now()
+        start = time.perf_counter()
+        while battles < self.battles:
+            game.frame_time = game.sim_clock.tick()
+            previous = game.state
+            self._act(game, rng)
+            game.update()
+            if self.render:
+                game.draw()
+                game.present()
+            frames += 1
+            if game.state == "game_over" and previous != "game_over":
+                battles += 1
+                wins += game.player.is_alive()
+        elapsed = time.perf_counter() - start
+        simulated = game.sim_clock.now() - sim_start
+        game.leaderboard_store.close()
+        return {
+            "battles": battles,
+            "wins": wins,
+            "frames": frames,
+            "simulated_s": simulated,
+            "wall_s": elapsed,
+            "speedup": simulated / elapsed if elapsed else 0.0
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Прогон боев без окна на быстрых часах")
+    parser.add_argument("-n", "--battles", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render", action="store_true", help="рисовать кадры")
+    args = parser.parse_args()
+
+    # Игра пишет базу лидеров и журналы запуска в текущий каталог - уводим их во временный
+    os.chdir(tempfile.mkdtemp(prefix="soak_"))
+    result = AutoPlayer(args.battles, args.seed, args.render).run()
+    print(f"боев: {result['battles']}, побед: {result['wins']}, кадров: {result['frames']}")
+    print(f"игровое время {result['simulated_s']:.0f} с за {result['wall_s']:.2f} с "
+          f"(x{result['speedup']:.0f})")
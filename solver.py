@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from battle_core import (
+    ACTIONS, DODGE_FAIL_DAMAGE, ENEMY_DAMAGE, ENEMY_TYPES, IGNORE_DAMAGE,
+    PLAYER_MAX_HP, WEAPONS
+)
+
+# Точный решатель боя. Бой - конечная марковская цепь по состояниям
+# (hp игрока, hp врага, чей ход). Урон врага всегда 15-25 и не зависит от типа атаки,
+# поэтому веса стратегии на переходы не влияют: таблица одна на каждое hp врага.
+# Ход врага всегда уменьшает hp игрока, так что таблицы считаются снизу вверх
+# по hp игрока, а внутри - по hp врага, без итераций до сходимости.
+
+CACHE_DIR = ".solver_cache"
+FORMAT_VERSION = 1
+MAGIC = b"SWSV"
+
+# Уже решенные таблицы в памяти процесса, по тому же ключу, что и файлы кэша.
+# Блокировка не дает двум потокам (загрузчику и потоку решателя) считать и писать одно и то же.
+# Главный поток solve() не зовет: таблицы для боя просит у solve_worker и не ждет их.
+_solved: Dict[str, "SolvedBattle"] = {}
+_solve_lock = threading.Lock()
+
+# Варианты хода игрока; для уворота и игнорирования оружие не важно
+CHOICES: List[Tuple[str, Optional[str]]] = (
+    [("attack", weapon) for weapon in WEAPONS] + [("dodge", None), ("ignore", None)]
+)
+
+
+def _params(enemy_max_hp: int) -> Dict:
+    return {
+        "version": FORMAT_VERSION,
+        "player_max_hp": PLAYER_MAX_HP,
+        "enemy_max_hp": enemy_max_hp,
+        "weapons": WEAPONS,
+        "actions": ACTIONS,
+        "dodge_fail_damage": DODGE_FAIL_DAMAGE,
+        "ignore_damage": IGNORE_DAMAGE,
+        "enemy_damage": ENEMY_DAMAGE
+    }
+
+def params_hash(enemy_max_hp: int) -> str:
+    blob = json.dumps(_params(enemy_max_hp), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class SolvedBattle:
+    def __init__(self, player_max_hp: int, enemy_max_hp: int,
+                 player_turn: array, enemy_turn: array, best: array):
+        self.player_max_hp = player_max_hp
+        self.enemy_max_hp = enemy_max_hp
+        # Плоские таблицы размером (player_max_hp + 1) * (enemy_max_hp + 1)
+        self.player_turn = player_turn
+        self.enemy_turn = enemy_turn
+        self.best = best
+
+    def _index(self, player_hp: int, enemy_hp: int) -> int:
+        return player_hp * (self.enemy_max_hp + 1) + enemy_hp
+
+    def win_probability(self, player_hp: int, enemy_hp: int, player_turn: bool = True) -> float:
+        if enemy_hp <= 0:
+            return 1.0
+        if player_hp <= 0:
+            return 0.0
+        table = self.player_turn if player_turn else self.enemy_turn
+        return table[self._index(player_hp, enemy_hp)]
+
+    def best_choice(self, player_hp: int, enemy_hp: int) -> Tuple[str, Optional[str]]:
+        return CHOICES[self.best[self._index(max(player_hp, 0), max(enemy_hp, 0))]]
+
+    def to_bytes(self) -> bytes:
+        header = struct.pack("<4sHHH", MAGIC, FORMAT_VERSION, self.player_max_hp, self.enemy_max_hp)
+        body = self.player_turn.tobytes() + self.enemy_turn.tobytes() + self.best.tobytes()
+        return header + zlib.compress(body, 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SolvedBattle":
+        magic, version, player_max_hp, enemy_max_hp = struct.unpack_from("<4sHHH", data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("неизвестный формат таблиц решателя")
+        body = zlib.decompress(data[struct.calcsize("<4sHHH"):])
+        size = (player_max_hp + 1) * (enemy_max_hp + 1)
+        player_turn, enemy_turn, best = array("f"), array("f"), array("b")
+        float_bytes = size * player_turn.itemsize
+        player_turn.frombytes(body[:float_bytes])
+        enemy_turn.frombytes(body[float_bytes:2 * float_bytes])
+        best.frombytes(body[2 * float_bytes:])
+        if len(best) != size:
+            raise ValueError("таблицы решателя повреждены")
+        return cls(player_max_hp, enemy_max_hp, player_turn, enemy_turn, best)
+
+
+def _spread(low: int, high: int) -> Tuple[range, float]:
+    return range(low, high + 1), 1.0 / (high - low + 1)
+
+def compute(enemy_max_hp: int, player_max_hp: int = PLAYER_MAX_HP) -> SolvedBattle:
+    width = enemy_max_hp + 1
+    size = (player_max_hp + 1) * width
+    # V - вероятность победы на ходу игрока, W - на ходу врага; hp <= 0 обрабатывается явно
+    V = [0.0] * size
+    W = [0.0] * size
+    best = array("b", bytes(size))
+
+    enemy_range, enemy_p = _spread(*ENEMY_DAMAGE)
+    dodge_range, dodge_p = _spread(*DODGE_FAIL_DAMAGE)
+    ignore_range, ignore_p = _spread(*IGNORE_DAMAGE)
+    dodge_chance = ACTIONS["dodge"]["chance"]
+
+    for p in range(1, player_max_hp + 1):
+        row = p * width
+        # Ход врага ведет в состояния с меньшим hp игрока, они уже посчитаны
+        for e in range(1, width):
+            W[row + e] = enemy_p * sum(V[(p - d) * width + e] for d in enemy_range if p - d > 0)
+
+        for e in range(1, width):
+            stay = W[row + e]
+            values = []
+            for action, weapon in CHOICES:
+                if action == "attack":
+                    chance = WEAPONS[weapon]["chance"]
+                    left = e - WEAPONS[weapon]["damage"]
+                    hit = 1.0 if left <= 0 else W[row + left]
+                    values.append(chance * hit + (1 - chance) * stay)
+                elif action == "dodge":
+                    hurt = dodge_p * sum(W[(p - d) * width + e] for d in dodge_range if p - d > 0)
+                    values.append(dodge_chance * stay + (1 - dodge_chance) * hurt)
+                else:
+                    values.append(ignore_p * sum(W[(p - d) * width + e] for d in ignore_range if p - d > 0))
+            choice = max(range(len(values)), key=values.__getitem__)
+            V[row + e] = values[choice]
+            best[row + e] = choice
+
+    return SolvedBattle(player_max_hp, enemy_max_hp, array("f", V), array("f", W), best)
+
+def solve(enemy_max_hp: int, cache_dir: Optional[str] = CACHE_DIR) -> SolvedBattle:
+    with _solve_lock:
+        return _solve(enemy_max_hp, cache_dir)
+
+def _solve(enemy_max_hp: int, cache_dir: Optional[str]) -> SolvedBattle:
+    key = params_hash(enemy_max_hp)
+    if key in _solved:
+        return _solved[key]
+    if cache_dir is None:
+        return _solved.setdefault(key, compute(enemy_max_hp))
+
+    path = os.path.join(cache_dir, f"{key}.bin")
+    try:
+        with open(path, "rb") as f:
+            return _solved.setdefault(key, SolvedBattle.from_bytes(f.read()))
+    except (FileNotFoundError, ValueError, zlib.error, struct.error):
+        pass
+
+    solved = compute(enemy_max_hp)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(solved.to_bytes())
+    os.replace(tmp_path, path)
+    return _solved.setdefault(key, solved)
+
+def solved(enemy_max_hp: int) -> Optional[SolvedBattle]:
+    # Готовые таблицы без ожидания; чтение словаря под GIL атомарно
+    return _solved.get(params_hash(enemy_max_hp))
+
+
+class SolveWorker:
+    def __init__(self, cache_dir: Optional[str] = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._cond = threading.Condition()
+        self._queue: "deque[int]" = deque()
+        self._wanted = set()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+
+    def request(self, enemy_max_hp: int) -> Optional[SolvedBattle]:
+        # Таблицы, если уже готовы; иначе задача рабочему потоку и None - спросить в следующем кадре
+        ready = solved(enemy_max_hp)
+        if ready is not None:
+            return ready
+        with self._cond:
+            if enemy_max_hp not in self._wanted:
+                self._wanted.add(enemy_max_hp)
+                self._queue.append(enemy_max_hp)
+                self._cond.notify()
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="solver", daemon=True)
+                    self._thread.start()
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                enemy_max_hp = self._queue.popleft()
+            try:
+                solve(enemy_max_hp, self.cache_dir)
+            except Exception as e:
+                # Без таблиц бой идет без шанса победы; повторный запрос попробует снова
+                self.error = e
+            with self._cond:
+                self._wanted.discard(enemy_max_hp)
+
+
+solve_worker = SolveWorker()
+
+
+def solve_enemy(enemy_key: str, cache_dir: Optional[str] = CACHE_DIR) -> SolvedBattle:
+    enemy = ENEMY_TYPES[enemy_key]
+    return solve(enemy["max_hp"], cache_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Точные вероятности победы и оптимальная политика")
+    parser.add_argument("-e", "--enemy", action="append", choices=list(ENEMY_TYPES))
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    for enemy_key in args.enemy or list(ENEMY_TYPES):
+        solved = solve_enemy(enemy_key, None if args.no_cache else CACHE_DIR)
+        enemy_hp = ENEMY_TYPES[enemy_key]["max_hp"]
+        action, weapon = solved.best_choice(PLAYER_MAX_HP, enemy_hp)
+        print(f"{enemy_key}: шанс победы {100 * solved.win_probability(PLAYER_MAX_HP, enemy_hp):.3f}%, "
+              f"первый ход {action} {weapon or ''}".rstrip())
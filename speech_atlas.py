@@ -0,0 +1,123 @@
+import warnings
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pygame
+
+# Атлас облачков реплик. Все заранее известные реплики врагов переносятся по словам и
+# растеризуются один раз в общую текстуру; показ реплики - это готовая подповерхность
+# атласа. Реплики, известные только во время игры (например, "ПОБЕДА ЗА <ник>!"),
+# собираются тем же кодом и хранятся в небольшом LRU-кэше.
+# Перенос считает ширину каждого слова один раз и складывает ширины, а не меряет
+# растущую строку на каждом слове.
+
+BUBBLE_SIZE = (300, 100)
+BUBBLE_FILL = (50, 50, 100, 200)
+BUBBLE_BORDER = (0, 255, 255)
+TEXT_COLOR = (255, 255, 255)
+WRAP_WIDTH = 280
+MAX_LINES = 2
+LINE_STEP = 25
+PADDING = 10
+ATLAS_COLUMNS = 6
+DYNAMIC_CACHE_SIZE = 32
+
+
+def wrap_text(font: pygame.font.Font, text: str, width: int = WRAP_WIDTH) -> List[str]:
+    space = font.size(" ")[0]
+    lines = []
+    current: List[str] = []
+    current_width = 0
+    for word in text.split():
+        word_width = font.size(word)[0]
+        # Как и раньше, строка с пробелом на конце должна быть уже width
+        if current and current_width + word_width + space >= width:
+            lines.append(" ".join(current))
+            current, current_width = [], 0
+        current.append(word)
+        current_width += word_width + space
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+class SpeechAtlas:
+    def __init__(self):
+        self.font: Optional[pygame.font.Font] = None
+        self.atlas: Optional[pygame.Surface] = None
+        self.overflows: List[Tuple[str, List[str]]] = []
+        self._bubbles: Dict[str, pygame.Surface] = {}
+        self._dynamic: "OrderedDict[str, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.dynamic_hits = 0
+        self.dynamic_builds = 0
+
+    def _draw_bubble(self, target: pygame.Surface, origin: Tuple[int, int], lines: List[str]):
+        x, y = origin
+        rect = pygame.Rect(x, y, *BUBBLE_SIZE)
+        pygame.draw.rect(target, BUBBLE_FILL, rect, border_radius=10)
+        pygame.draw.rect(target, BUBBLE_BORDER, rect, 2, border_radius=10)
+        for i, line in enumerate(lines[:MAX_LINES]):
+            target.blit(self.font.render(line, True, TEXT_COLOR), (x + PADDING, y + PADDING + i * LINE_STEP))
+
+    def _layout(self, text: str) -> List[str]:
+        lines = wrap_text(self.font, text)
+        if len(lines) > MAX_LINES:
+            self.overflows.append((text, lines))
+        return lines
+
+    def build(self, font: pygame.font.Font, texts: Iterable[str]):
+        self.font = font
+        self.overflows = []
+        self._bubbles = {}
+        self._dynamic.clear()
+        unique = list(dict.fromkeys(texts))
+        columns = min(ATLAS_COLUMNS, max(1, len(unique)))
+        rows = (len(unique) + columns - 1) // columns
+        width, height = BUBBLE_SIZE
+        self.atlas = pygame.Surface((columns * width, max(1, rows) * height), pygame.SRCALPHA)
+        for index, text in enumerate(unique):
+            origin = ((index % columns) * width, (index // columns) * height)
+            self._draw_bubble(self.atlas, origin, self._layout(text))
+        if pygame.display.get_surface() is not None:
+            self.atlas = self.atlas.convert_alpha()
+        # Подповерхности делят пиксели с атласом - копий нет
+        for index, text in enumerate(unique):
+            origin = ((index % columns) * width, (index // columns) * height)
+            self._bubbles[text] = self.atlas.subsurface(pygame.Rect(origin, BUBBLE_SIZE))
+
+        for text, lines in self.overflows:
+            warnings.warn(f"реплика не помещается в {MAX_LINES} строки и будет обрезана: "
+                          f"{text!r} -> {lines}", stacklevel=2)
+
+    def bubble(self, text: str) -> pygame.Surface:
+        surface = self._bubbles.get(text)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        surface = self._dynamic.get(text)
+        if surface is not None:
+            self._dynamic.move_to_end(text)
+            self.dynamic_hits += 1
+            return surface
+
+        surface = pygame.Surface(BUBBLE_SIZE, pygame.SRCALPHA)
+        self._draw_bubble(surface, (0, 0), self._layout(text))
+        self.dynamic_builds += 1
+        self._dynamic[text] = surface
+        if len(self._dynamic) > DYNAMIC_CACHE_SIZE:
+            self._dynamic.popitem(last=False)
+        return surface
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "atlas_bubbles": len(self._bubbles),
+            "hits": self.hits,
+            "dynamic_hits": self.dynamic_hits,
+            "dynamic_builds": self.dynamic_builds,
+            "overflows": len(self.overflows)
+        }
+
+
+# Общий атлас игры; строится загрузчиком, когда шрифты уже есть
+speech_atlas = SpeechAtlas()
@@ -0,0 +1,152 @@
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pygame
+
+# Звездное небо с параллаксом. Позиции всех звезд - массивы NumPy, за кадр они
+# сдвигаются одним векторным шагом, а в экран пишутся через pygame.surfarray одной
+# операцией присваивания по индексам, без вызова pygame.draw на каждую звезду.
+# Звезды видны только на фоне статического слоя (черные пиксели) и не заходят под
+# регионы DirtyRenderer, поэтому рамки, кнопки и текст поверх них не перерисовываются.
+# На экран отправляются только пиксели сдвинувшихся звезд (старое и новое место).
+
+DEFAULT_STARS = 1500
+# Слои параллакса: (доля звезд, скорость в пикселях в секунду, яркость)
+PARALLAX_LAYERS: List[Tuple[float, float, int]] = [(0.6, 4.0, 90), (0.3, 12.0, 170), (0.1, 30.0, 255)]
+BACKGROUND = (0, 0, 0)
+FRAME_BUDGET_MS = 1000 / 60
+
+
+class Starfield:
+    def __init__(self, size: Tuple[int, int], count: int = DEFAULT_STARS, seed: Optional[int] = None,
+                 layers: Sequence[Tuple[float, float, int]] = PARALLAX_LAYERS):
+        rng = np.random.default_rng(seed)
+        self.width, self.height = size
+        shares = np.array([share for share, _, _ in layers])
+        counts = np.floor(shares / shares.sum() * count).astype(int)
+        counts[0] += count - counts.sum()
+
+        self.count = count
+        self.x = rng.uniform(0, self.width, count).astype(np.float32)
+        self.y = rng.integers(0, self.height, count)
+        self.speed = np.repeat([speed for _, speed, _ in layers], counts).astype(np.float32)
+        self.brightness = np.repeat([brightness for _, _, brightness in layers], counts)
+
+        # Буферы переиспользуются между кадрами, чтобы кадр не выделял память
+        self._px = self.x.astype(np.intp)
+        self._px_next = np.empty_like(self._px)
+        self._drawn = np.zeros(count, dtype=bool)
+        self._allowed_map = np.zeros(size, dtype=bool)
+        self._colors: Optional[np.ndarray] = None
+        self._layer: Optional[pygame.Surface] = None
+        self._layer_pixels: Optional[np.ndarray] = None
+        self._layer_background: Optional[np.ndarray] = None
+
+    def update(self, dt: float):
+        self.x -= self.speed * dt
+        np.mod(self.x, self.width, out=self.x)
+
+    def _prepare(self, screen: pygame.Surface, layer: pygame.Surface):
+        if self._colors is None:
+            self._colors = np.array([screen.map_rgb((b, b, b)) for b in self.brightness], dtype=np.uint32)
+        # Пиксели слоя и маска фона копируются один раз на слой
+        if layer is not self._layer:
+            self._layer = layer
+            self._layer_pixels = pygame.surfarray.array2d(layer)
+            self._layer_background = self._layer_pixels == layer.map_rgb(BACKGROUND)
+
+    def render(self, screen: pygame.Surface, layer: pygame.Surface, occupied: List[pygame.Rect],
+               full: bool) -> List[pygame.Rect]:
+        # Возвращает измененные пиксели; при полной перерисовке экран уходит целиком и так
+        self._prepare(screen, layer)
+        px, py = self._px_next, self.y
+        np.copyto(px, self.x, casting="unsafe")
+        # float32 после np.mod может дать ровно width - заворачиваем и целые
+        np.mod(px, self.width, out=px)
+        # Карта мест, где звезда видна: фон слоя без прямоугольников регионов
+        np.copyto(self._allowed_map, self._layer_background)
+        for rect in occupied:
+            clipped = rect.clip(0, 0, self.width, self.height)
+            self._allowed_map[clipped.left:clipped.right, clipped.top:clipped.bottom] = False
+        allowed = self._allowed_map[px, py]
+        moved = px != self._px
+
+        pixels = pygame.surfarray.pixels2d(screen)
+        erased = self._drawn & moved
+        if not full:
+            # Стираем прошлые точки сдвинувшихся звезд пикселями слоя
+            old_x, old_y = self._px[erased], py[erased]
+            pixels[old_x, old_y] = self._layer_pixels[old_x, old_y]
+        # Все видимые звезды пишутся каждый кадр: восстановление грязных
+        # прямоугольников могло стереть и неподвижные
+        pixels[px[allowed], py[allowed]] = self._colors[allowed]
+        del pixels
+
+        changed = []
+        if not full:
+            drawn = allowed & (moved | ~self._drawn)
+            changed = [pygame.Rect(x, y, 1, 1) for x, y in zip(self._px[erased].tolist(), py[erased].tolist())]
+            changed.extend(pygame.Rect(x, y, 1, 1) for x, y in zip(px[drawn].tolist(), py[drawn].tolist()))
+        self._px, self._px_next = px, self._px
+        self._drawn = allowed
+        return changed
+
+
+def _legacy_frame(screen: pygame.Surface, count: int, rng: np.random.Generator):
+    # Прежний способ: отдельный pygame.draw.circle на каждую звезду
+    for x, y in rng.integers(0, (screen.get_width(), screen.get_height()), (count, 2)).tolist():
+        pygame.draw.circle(screen, (255, 255, 255), (x, y), 1)
+
+
+def benchmark(counts: List[int], frames: int = 300, size: Tuple[int, int] = (800, 600)) -> List[Dict]:
+    screen = pygame.display.set_mode(size)
+    layer = pygame.Surface(size).convert()
+    layer.fill(BACKGROUND)
+    pygame.draw.rect(layer, (0, 200, 200), (50, 350, 700, 120), 2)
+    occupied = [pygame.Rect(100 + i * 60, 500, 50, 50) for i in range(10)]
+    results = []
+    for count in counts:
+        field = Starfield(size, count, seed=0)
+        screen.blit(layer, (0, 0))
+        field.render(screen, layer, occupied, True)
+        times = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            field.update(1 / 60)
+            field.render(screen, layer, occupied, False)
+            times.append(time.perf_counter() - start)
+        times.sort()
+
+        rng = np.random.default_rng(0)
+        legacy = []
+        for _ in range(max(10, frames // 10)):
+            start = time.perf_counter()
+            _legacy_frame(screen, count, rng)
+            legacy.append(time.perf_counter() - start)
+        legacy.sort()
+
+        results.append({
+            "stars": count,
+            "p50_ms": 1000 * times[len(times) // 2],
+            "p99_ms": 1000 * times[min(len(times) - 1, int(0.99 * len(times)))],
+            "legacy_p50_ms": 1000 * legacy[len(legacy) // 2]
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер звездного неба")
+    parser.add_argument("-c", "--count", type=int, action="append", help="число звезд (можно несколько)")
+    parser.add_argument("-n", "--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    counts = args.count or [500, 1500, 5000, 20000]
+    print(f"{'ЗВЕЗД':>7} {'P50 МС':>8} {'P99 МС':>8} {'DRAW.CIRCLE МС':>15}  БЮДЖЕТ {FRAME_BUDGET_MS:.1f} МС")
+    for row in benchmark(counts, args.frames):
+        verdict = "в бюджете" if row["p99_ms"] < FRAME_BUDGET_MS else "ПРЕВЫШЕН"
+        print(f"{row['stars']:>7} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['legacy_p50_ms']:>15.3f}  {verdict}")
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+# Быстрый старт: подсистемы pygame включаются по требованию, а пути к системным
+# шрифтам кэшируются на диске, чтобы SysFont не запускал сканирование fontconfig
+# при каждом запуске. StartupTimer собирает отметки фаз от запуска до первого кадра.
+
+FONT_CACHE_PATH = ".font_cache.json"
+
+
+def ensure_subsystems(*names: str):
+    # Вместо pygame.init(): только то, что нужно игре (без звука и джойстиков)
+    for name in names:
+        module = getattr(pygame, name)
+        if not module.get_init():
+            module.init()
+
+
+class FontResolver:
+    def __init__(self, path: str = FONT_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        try:
+            with open(path, "r") as f:
+                self._entries: Dict[str, Dict] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    @staticmethod
+    def _key(name: str, bold: bool, italic: bool) -> str:
+        return f"{name}|{int(bold)}|{int(italic)}"
+
+    def font(self, name: str, size: int, bold: bool = False, italic: bool = False) -> pygame.font.Font:
+        key = self._key(name, bold, italic)
+        entry = self._entries.get(key)
+        if entry is not None and (entry["path"] is None or os.path.exists(entry["path"])):
+            self.hits += 1
+            return self._construct(entry["path"], size, entry["set_bold"], entry["set_italic"])
+
+        # Промах: обычный SysFont, но запоминаем, какой файл и стили он выбрал
+        self.misses += 1
+        chosen = {}
+
+        def constructor(path, size, set_bold, set_italic):
+            chosen.update(path=path, set_bold=set_bold, set_italic=set_italic)
+            return self._construct(path, size, set_bold, set_italic)
+
+        font = pygame.font.SysFont(name, size, bold, italic, constructor=constructor)
+        self._entries[key] = chosen
+        self._dirty = True
+        return font
+
+    @staticmethod
+    def _construct(path: Optional[str], size: int, set_bold: bool, set_italic: bool) -> pygame.font.Font:
+        font = pygame.font.Font(path, size)
+        font.set_bold(set_bold)
+        font.set_italic(set_italic)
+        return font
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class StartupTimer:
+    def __init__(self, start: Optional[float] = None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        # Отметка конца фазы; повторные отметки одной фазы игнорируются
+        if all(name != phase for name, _ in self.marks):
+            self.marks.append((phase, time.perf_counter()))
+
+    def phases(self) -> Dict[str, float]:
+        result = {}
+        previous = self.start
+        for name, moment in self.marks:
+            result[name] = moment - previous
+            previous = moment
+        return result
+
+    def report(self) -> str:
+        lines = ["ФАЗЫ ЗАПУСКА:"]
+        for name, duration in self.phases().items():
+            lines.append(f"  {name:<18} {duration * 1000:8.1f} мс")
+        if self.marks:
+            lines.append(f"  {'ИТОГО':<18} {(self.marks[-1][1] - self.start) * 1000:8.1f} мс")
+        return "\n".join(lines)
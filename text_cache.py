@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+# Кэш отрисованного текста. Растеризация глифов - самая дорогая часть кадра,
+# а почти все строки (подписи кнопок, заголовки, строки таблицы) не меняются
+# между кадрами. Ключ - (шрифт, текст, цвет, сглаживание), вытеснение - LRU
+# по суммарному объему пикселей.
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+class TextCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Tuple[Hashable, ...], object]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _surface_bytes(surface) -> int:
+        return surface.get_pitch() * surface.get_height()
+
+    # Порядок аргументов как у font.render, чтобы вызовы заменялись один к одному
+    def render(self, font, text: str, antialias: bool, color):
+        key = (font, text, tuple(color), antialias)
+        surface = self._entries.get(key)
+        if surface is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        size = self._surface_bytes(surface)
+        if size > self.max_bytes:
+            return surface
+
+        self._entries[key] = surface
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= self._surface_bytes(evicted)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Общий кэш для всех экранов игры
+text_cache = TextCache()
+render_text = text_cache.render
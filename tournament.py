@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from battle_core import ENEMY_TYPES, POLICIES, HeadlessBattle
+
+# Турнир: миллионы headless-боев игрока против стратегий врагов на пуле процессов.
+# Каждый кусок работы получает собственный seed, поэтому итог воспроизводим
+# независимо от числа процессов.
+
+DEFAULT_CHUNK = 20000
+
+
+def _empty_stats() -> Dict:
+    return {"battles": 0, "wins": 0, "rounds": 0, "player_hp_left": 0, "enemy_hp_left": 0}
+
+def _run_chunk(task: Tuple[str, str, int, int]) -> Tuple[str, str, Dict]:
+    enemy_key, policy, seed, count = task
+    rng = random.Random(seed)
+    stats = _empty_stats()
+    for _ in range(count):
+        result = HeadlessBattle(enemy_key, policy, rng=rng).run()
+        stats["battles"] += 1
+        stats["rounds"] += result.rounds
+        if result.won:
+            stats["wins"] += 1
+            stats["player_hp_left"] += result.player_hp
+        else:
+            stats["enemy_hp_left"] += result.enemy_hp
+    return enemy_key, policy, stats
+
+def _make_tasks(battles: int, enemies: Iterable[str], policies: Iterable[str],
+                seed: int, chunk: int) -> List[Tuple[str, str, int, int]]:
+    tasks = []
+    index = 0
+    for enemy_key in enemies:
+        for policy in policies:
+            left = battles
+            while left > 0:
+                count = min(chunk, left)
+                tasks.append((enemy_key, policy, seed * 1000003 + index, count))
+                index += 1
+                left -= count
+    return tasks
+
+def run_tournament(battles: int, enemies: Iterable[str] = tuple(ENEMY_TYPES),
+                   policies: Iterable[str] = ("laser",), workers: int = None,
+                   seed: int = 0, chunk: int = DEFAULT_CHUNK) -> Dict:
+    # battles - число боев на каждую пару (противник, политика)
+    enemies, policies = list(enemies), list(policies)
+    tasks = _make_tasks(battles, enemies, policies, seed, chunk)
+    results = {(e, p): _empty_stats() for e in enemies for p in policies}
+
+    start = time.perf_counter()
+    if workers == 1:
+        for enemy_key, policy, stats in map(_run_chunk, tasks):
+            _merge(results[(enemy_key, policy)], stats)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for enemy_key, policy, stats in pool.map(_run_chunk, tasks):
+                _merge(results[(enemy_key, policy)], stats)
+    elapsed = time.perf_counter() - start
+
+    total = sum(stats["battles"] for stats in results.values())
+    return {
+        "results": results,
+        "battles": total,
+        "elapsed": elapsed,
+        "battles_per_sec": total / elapsed if elapsed > 0 else float("inf")
+    }
+
+def _merge(into: Dict, stats: Dict):
+    for key, value in stats.items():
+        into[key] += value
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'ПРОТИВНИК':<10} {'ПОЛИТИКА':<8} {'БОЕВ':>10} {'ПОБЕД %':>8} "
+             f"{'РАУНДОВ':>8} {'HP ИГРОКА':>10} {'HP ВРАГА':>9}"]
+    for (enemy_key, policy), stats in report["results"].items():
+        battles = stats["battles"] or 1
+        wins = stats["wins"]
+        losses = stats["battles"] - wins
+        lines.append(
+            f"{enemy_key:<10} {policy:<8} {stats['battles']:>10} "
+            f"{100.0 * wins / battles:>8.2f} {stats['rounds'] / battles:>8.2f} "
+            f"{stats['player_hp_left'] / (wins or 1):>10.1f} "
+            f"{stats['enemy_hp_left'] / (losses or 1):>9.1f}"
+        )
+    lines.append(f"Всего боев: {report['battles']} за {report['elapsed']:.2f} с "
+                 f"({report['battles_per_sec']:.0f} боев/с)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Турнир headless-боев")
+    parser.add_argument("-n", "--battles", type=int, default=100000,
+                        help="число боев на каждую пару противник/политика")
+    parser.add_argument("-e", "--enemy", action="append", choices=list(ENEMY_TYPES))
+    parser.add_argument("-p", "--policy", action="append", choices=list(POLICIES))
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    args = parser.parse_args()
+
+    report = run_tournament(args.battles, args.enemy or list(ENEMY_TYPES),
+                            args.policy or ["laser"], args.workers, args.seed, args.chunk)
+    print(format_report(report))
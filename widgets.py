@@ -0,0 +1,80 @@
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import pygame
+
+# Слой виджетов экрана. Кнопки хранятся один раз (а не пересоздаются на кадре) и
+# разложены по равномерной сетке ячеек: попадание мыши проверяется только среди
+# виджетов одной ячейки, обычно одного. Наведение меняется по событиям мыши, а не
+# опросом на каждом кадре; отрисовка берет готовое состояние hovered из виджета.
+
+GRID_CELL = 50
+
+
+class Widget:
+    __slots__ = ("id", "rect", "text", "on_click", "data", "enabled", "visible", "hovered")
+
+    def __init__(self, widget_id: Hashable, rect: pygame.Rect, text: str,
+                 on_click: Optional[Callable[[], None]] = None,
+                 visible: Optional[Callable[[], bool]] = None, **data):
+        self.id = widget_id
+        self.rect = pygame.Rect(rect)
+        self.text = text
+        self.on_click = on_click
+        self.data = data
+        self.enabled = True
+        # Условие видимости, проверяемое в момент клика (например, "ход игрока")
+        self.visible = visible
+        self.hovered = False
+
+    def active(self) -> bool:
+        return self.enabled and (self.visible is None or self.visible())
+
+
+class WidgetLayer:
+    def __init__(self, size: Tuple[int, int], cell: int = GRID_CELL):
+        self.cell = cell
+        self.columns = (size[0] + cell - 1) // cell
+        self.rows = (size[1] + cell - 1) // cell
+        self.widgets: List[Widget] = []
+        self._grid: Dict[Tuple[int, int], List[Widget]] = {}
+        self.hovered: Optional[Widget] = None
+
+    def add(self, widget_id: Hashable, rect, text: str = "", on_click: Optional[Callable[[], None]] = None,
+            visible: Optional[Callable[[], bool]] = None, **data) -> Widget:
+        widget = Widget(widget_id, rect, text, on_click, visible, **data)
+        self.widgets.append(widget)
+        left = max(0, widget.rect.left // self.cell)
+        right = min(self.columns - 1, (widget.rect.right - 1) // self.cell)
+        top = max(0, widget.rect.top // self.cell)
+        bottom = min(self.rows - 1, (widget.rect.bottom - 1) // self.cell)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                self._grid.setdefault((column, row), []).append(widget)
+        return widget
+
+    def hit(self, pos) -> Optional[Widget]:
+        x, y = pos
+        # Позже добавленный виджет лежит сверху
+        for widget in reversed(self._grid.get((x // self.cell, y // self.cell), ())):
+            if widget.rect.collidepoint(x, y) and widget.enabled:
+                return widget
+        return None
+
+    def mouse_move(self, pos) -> bool:
+        # True, если наведение сменилось
+        widget = self.hit(pos)
+        if widget is self.hovered:
+            return False
+        if self.hovered is not None:
+            self.hovered.hovered = False
+        if widget is not None:
+            widget.hovered = True
+        self.hovered = widget
+        return True
+
+    def click(self, pos) -> bool:
+        widget = self.hit(pos)
+        if widget is None or not widget.active() or widget.on_click is None:
+            return False
+        widget.on_click()
+        return True